@@ -5,6 +5,13 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Bajo ASGI las conexiones persistentes (CONN_MAX_AGE) no se reutilizan entre
+requests; con DB_POOL_TAMANO=<n> cada proceso toma sus conexiones de un pool
+compartido (ver settings.py y apiEcommerceComputerApp/pool.py).
+
+Las lecturas públicas del catálogo usan vistas async (urls_asgi.py);
+CATALOGO_ASYNC=0 vuelve a los ViewSet síncronos.
 """
 
 import os
@@ -12,5 +19,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'apiEcommerceComputer.settings')
+os.environ.setdefault('CATALOGO_ASYNC', '1')
 
 application = get_asgi_application()
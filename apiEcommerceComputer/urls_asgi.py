@@ -0,0 +1,9 @@
+"""
+URLconf para ASGI: las lecturas públicas del catálogo van a las vistas async
+(apiEcommerceComputerApp/vistas_async.py) y el resto igual que urls.py.
+settings.py la usa con CATALOGO_ASYNC=1, que asgi.py define por defecto.
+"""
+from apiEcommerceComputerApp.urls import rutas_catalogo_async
+from .urls import urlpatterns as urlpatterns_wsgi
+
+urlpatterns = [*rutas_catalogo_async, *urlpatterns_wsgi]
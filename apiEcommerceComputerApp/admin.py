@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Usuario, Producto, Categoria
+from .models import Usuario, Producto, Categoria, Order, OrderItem, ReservaStock, ReservaStockItem, Valoracion
 
 # Register your models here.
 # Registro sencillo para Categoria
@@ -19,3 +19,37 @@ class ProductoAdmin(admin.ModelAdmin):
     search_fields = ('nombre',) # Añade un buscador por nombre
 
 admin.site.register(Producto, ProductoAdmin)
+
+# Reservas de stock con sus líneas
+class ReservaStockItemInline(admin.TabularInline):
+    model = ReservaStockItem
+    extra = 0
+    raw_id_fields = ('producto',)
+
+class ReservaStockAdmin(admin.ModelAdmin):
+    list_display = ('token', 'usuario', 'estado', 'expira_en', 'created_at')
+    list_filter = ('estado',)
+    inlines = [ReservaStockItemInline]
+
+admin.site.register(ReservaStock, ReservaStockAdmin)
+
+# Pedidos con sus líneas
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ('producto',)
+
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'usuario', 'estado', 'total', 'created_at')
+    list_filter = ('estado',)
+    raw_id_fields = ('usuario', 'reserva')
+    inlines = [OrderItemInline]
+
+admin.site.register(Order, OrderAdmin)
+
+class ValoracionAdmin(admin.ModelAdmin):
+    list_display = ('producto', 'usuario', 'puntuacion', 'created_at')
+    list_filter = ('puntuacion',)
+    raw_id_fields = ('producto', 'usuario')
+
+admin.site.register(Valoracion, ValoracionAdmin)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiecommercecomputerappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apiEcommerceComputerApp'
+
+    def ready(self):
+        # Registra los receivers de señales (invalidación de cache, etc.)
+        from . import signals  # noqa: F401
@@ -0,0 +1,159 @@
+"""
+Autenticación JWT sin leer el usuario de la base en cada request.
+
+- `RefreshTokenUsuario.for_user` agrega al token los claims CLAIMS_USUARIO
+  (roles, is_staff, is_superuser, is_active) y `huella`, un HMAC con
+  SECRET_KEY de la sal del hash de la contraseña: el token no lleva nada
+  que permita atacar el hash guardado. La sal cambia con cada
+  set_password y se conserva al actualizar solo el costo del hash
+  (contrasenas.recodificar).
+- `JWTClaimsAuthentication` arma request.user desde esos claims: una
+  instancia de Usuario con el resto de los campos diferidos (como .only()),
+  así los permisos (roles, is_staff), los filtros por usuario y las FK
+  funcionan sin consultas. Si una vista lee un campo que no viene en el
+  token (email, password...) Django lo carga al acceder; las vistas de
+  perfil usan `cargar_usuario` para traer la fila completa de una vez.
+- Revocación: el estado del usuario (activo, roles, is_staff,
+  is_superuser, huella) se guarda en la cache por AUTENTICACION['TTL']
+  segundos y se borra al guardar o eliminar el usuario (signals.py). Si
+  el usuario ya no existe, se desactivó, cambió de permisos o de
+  contraseña, el token se rechaza y hay que iniciar sesión de nuevo.
+- Los tokens emitidos antes de estos claims usan el camino normal de
+  simplejwt (una consulta por request) hasta que vencen.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import salted_hmac
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .contrasenas import sal
+from .lista_negra import ListaNegraRapidaMixin
+from .models import Usuario
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    # Segundos que se confía en el estado cacheado del usuario
+    'TTL': 60,
+}
+
+CLAIMS_USUARIO = ('roles', 'is_staff', 'is_superuser', 'is_active')
+CLAIM_HUELLA = 'huella'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'AUTENTICACION', {})}
+
+
+def get_cache():
+    return caches[get_config()['ALIAS']]
+
+
+def huella_password(password):
+    """
+    Cambia cuando cambia la contraseña (sal nueva) pero no cuando solo se
+    actualiza el costo del hash; sin SECRET_KEY no dice nada del hash.
+    """
+    return salted_hmac(
+        'apiEcommerceComputerApp.autenticacion.huella_password', sal(password), algorithm='sha256',
+    ).hexdigest()
+
+
+class RefreshTokenUsuario(ListaNegraRapidaMixin, RefreshToken):
+    """
+    RefreshToken con los claims del usuario; el access token los copia.
+    La lista negra se consulta con el filtro en memoria de lista_negra.py.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in CLAIMS_USUARIO:
+            token[claim] = getattr(user, claim)
+        token[CLAIM_HUELLA] = huella_password(user.password)
+        return token
+
+# ===== Estado del usuario para revocación =====
+
+def _clave_estado(user_id):
+    return f'auth:usuario:{user_id}'
+
+
+def estado_usuario(user_id):
+    """
+    {claim: valor} actual del usuario o None si no existe, desde la cache
+    (una consulta por usuario cada TTL segundos).
+    """
+    cache = get_cache()
+    clave = _clave_estado(user_id)
+    estado = cache.get(clave)
+    if estado is None:
+        fila = Usuario.objects.filter(pk=user_id).values(*CLAIMS_USUARIO, 'password').first()
+        # False: el usuario no existe (también se cachea)
+        estado = False if fila is None else {
+            **{claim: fila[claim] for claim in CLAIMS_USUARIO},
+            CLAIM_HUELLA: huella_password(fila['password']),
+        }
+        cache.set(clave, estado, get_config()['TTL'])
+    return estado or None
+
+
+def invalidar_estado(user_id):
+    get_cache().delete(_clave_estado(user_id))
+
+# ===== Autenticación =====
+
+class JWTClaimsAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que arma el usuario desde los claims del token.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in (*CLAIMS_USUARIO, CLAIM_HUELLA)):
+            return super().get_user(validated_token)
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken('El token no identifica al usuario.')
+
+        estado = estado_usuario(user_id)
+        if estado is None:
+            raise AuthenticationFailed('El usuario no existe.', code='user_not_found')
+        if not estado['is_active']:
+            raise AuthenticationFailed('El usuario está inactivo.', code='user_inactive')
+        if estado[CLAIM_HUELLA] != validated_token[CLAIM_HUELLA]:
+            raise AuthenticationFailed('La contraseña del usuario cambió.', code='password_changed')
+        if any(estado[claim] != validated_token[claim] for claim in CLAIMS_USUARIO):
+            raise AuthenticationFailed(
+                'Los datos del usuario cambiaron; inicie sesión de nuevo.', code='token_desactualizado'
+            )
+        return usuario_desde_claims(user_id, validated_token)
+
+
+def usuario_desde_claims(user_id, claims):
+    """
+    Usuario "cargado" con solo el id y los claims; el resto de los campos
+    quedan diferidos y se leen de la base si se acceden.
+    """
+    valores = {'id': user_id, **{claim: claims[claim] for claim in CLAIMS_USUARIO}}
+    # from_db espera los valores en el orden de los campos del modelo
+    campos = [campo.attname for campo in Usuario._meta.concrete_fields if campo.attname in valores]
+    usuario = Usuario.from_db(DEFAULT_DB_ALIAS, campos, [valores[campo] for campo in campos])
+    usuario._desde_token = True
+    return usuario
+
+
+def cargar_usuario(request):
+    """
+    Usuario completo del request: el mismo objeto si vino de la base o una
+    sola consulta (memorizada en el request) si se armó desde el token.
+    """
+    usuario = request.user
+    if not getattr(usuario, '_desde_token', False):
+        return usuario
+    completo = getattr(request, '_usuario_completo', None)
+    if completo is None:
+        completo = request._usuario_completo = Usuario.objects.get(pk=usuario.pk)
+    return completo
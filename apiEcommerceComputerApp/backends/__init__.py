@@ -0,0 +1,3 @@
+"""
+Backends de base de datos con pool de conexiones en proceso (ver pool.py).
+"""
@@ -0,0 +1,8 @@
+from django.db.backends.mysql import base
+from apiEcommerceComputerApp.pool import PoolMixin
+
+
+class DatabaseWrapper(PoolMixin, base.DatabaseWrapper):
+    """
+    Backend MySQL de Django con las conexiones físicas de pool.py.
+    """
@@ -0,0 +1,20 @@
+from django.db.backends.sqlite3 import base
+from apiEcommerceComputerApp.pool import PoolMixin
+
+
+class DatabaseWrapper(PoolMixin, base.DatabaseWrapper):
+    """
+    Backend SQLite de Django con las conexiones físicas de pool.py
+    (desarrollo y pruebas del pool; SQLite no tiene handshake de red).
+    Las bases en memoria no usan el pool: Django nunca cierra sus conexiones.
+    """
+
+    def get_new_connection(self, conn_params):
+        if self.is_in_memory_db():
+            return base.DatabaseWrapper.get_new_connection(self, conn_params)
+        return super().get_new_connection(conn_params)
+
+    def _close(self):
+        if self.is_in_memory_db():
+            return base.DatabaseWrapper._close(self)
+        return super()._close()
@@ -0,0 +1,565 @@
+"""
+Utilidades compartidas por los comandos de benchmark (benchmark_*).
+"""
+import asyncio
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from contextlib import contextmanager
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import DatabaseError, connection, connections, reset_queries, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Max, Min
+from django.db.utils import load_backend
+from django.test.utils import CaptureQueriesContext
+from . import instrumentacion, pool
+from .cache import invalidar
+from .models import Categoria, Producto, Tipo_Producto, Usuario
+from .reservas import StockInsuficiente, agrupar_lineas, confirmar, liberar, reservar
+from .rollups import recalcular_conteo_categorias
+
+
+@contextmanager
+def datos_temporales():
+    """
+    Ejecuta el bloque dentro de una transacción que siempre se revierte,
+    para sembrar datos sintéticos sin dejar rastro en la base de datos.
+    """
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def sembrar_catalogo(productos, categorias=10, batch_size=5000, semilla=0):
+    """
+    Crea `categorias` categorías y `productos` productos sintéticos con
+    bulk_create. Retorna la lista de ids de las categorías creadas.
+    """
+    rnd = random.Random(semilla)
+    prefijo = f'benchmark-{semilla}-'
+    Categoria.objects.bulk_create(
+        [Categoria(nombre=f'{prefijo}{i}') for i in range(categorias)],
+        batch_size=batch_size
+    )
+    # MySQL no retorna los pk desde bulk_create
+    categoria_ids = list(
+        Categoria.objects.filter(nombre__startswith=prefijo).values_list('id', flat=True)
+    )
+    tipos = [tipo.value for tipo in Tipo_Producto]
+
+    creados = 0
+    while creados < productos:
+        lote = []
+        for i in range(creados, min(creados + batch_size, productos)):
+            total_reviews = rnd.randint(0, 50)
+            lote.append(Producto(
+                nombre=f'Producto {i:07d}',
+                descripcion=f'Descripción del producto sintético {i}',
+                precio=Decimal(rnd.randint(1000, 500000)) / 100,
+                categoria_id=rnd.choice(categoria_ids),
+                tipo=rnd.choice(tipos),
+                stock=rnd.randint(0, 50),
+                cantidad_vendida=rnd.randint(0, 200),
+                es_nuevo=rnd.random() < 0.2,
+                rating=round(rnd.uniform(1, 5), 2) if total_reviews else 0.0,
+                total_reviews=total_reviews,
+            ))
+        Producto.objects.bulk_create(lote, batch_size=batch_size)
+        creados += len(lote)
+    # bulk_create no envía señales: el contador por categoría se reconstruye
+    recalcular_conteo_categorias()
+    return categoria_ids
+
+
+def limpiar_catalogo(categoria_ids, batch_size=5000):
+    """
+    Borra lo creado por sembrar_catalogo fuera de datos_temporales(). Los
+    productos sintéticos no tienen imágenes, valoraciones ni pedidos: se
+    borran por lotes sin cargarlos ni enviar señales (con millones de filas,
+    .delete() haría un UPDATE del contador de categoría por producto).
+    """
+    productos = Producto.objects.filter(categoria_id__in=categoria_ids)
+    while True:
+        ids = list(productos.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        Producto.objects.filter(pk__in=ids)._raw_delete(productos.db)
+    Categoria.objects.filter(pk__in=categoria_ids)._raw_delete(productos.db)
+    invalidar('producto')
+    invalidar('categoria')
+
+
+def percentil(valores, p):
+    """
+    Percentil por el método nearest-rank sobre una lista de valores.
+    """
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(math.ceil(p / 100 * len(ordenados)) - 1, 0)
+    return ordenados[indice]
+
+
+def resumen(tiempos_ms):
+    """
+    Resume una lista de latencias en milisegundos.
+    """
+    return {
+        'n': len(tiempos_ms),
+        'media': sum(tiempos_ms) / len(tiempos_ms) if tiempos_ms else 0.0,
+        'p50': percentil(tiempos_ms, 50),
+        'p95': percentil(tiempos_ms, 95),
+        'p99': percentil(tiempos_ms, 99),
+    }
+
+
+def medir(funcion, repeticiones=20, calentamiento=2):
+    """
+    Ejecuta `funcion` varias veces y retorna el resumen de latencias (ms)
+    más la cantidad de consultas SQL de la última ejecución.
+    """
+    for _ in range(calentamiento):
+        funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    datos = resumen(tiempos)
+    # Conteo de consultas fuera de la medición (el cursor de debug agrega costo).
+    # Con el log lleno (9000 consultas) CaptureQueriesContext contaría 0
+    reset_queries()
+    with CaptureQueriesContext(connection) as contexto:
+        funcion()
+    datos['consultas'] = len(contexto.captured_queries)
+    return datos
+
+
+def estresar_reservas(producto_ids, hilos=8, intentos=200, semilla=0):
+    """
+    Lanza `hilos` hilos (cada uno con su propia conexión) que reservan a la
+    vez de 1 a 3 líneas al azar sobre `producto_ids`; cada reserva lograda
+    se libera (30%) o se confirma. Los datos deben estar confirmados en la
+    base: no sirve dentro de datos_temporales().
+    Retorna los contadores y `retenido` ({producto_id: unidades reservadas
+    sin liberar}), con el que se verifica que no hubo sobreventa.
+    """
+    barrera = threading.Barrier(hilos)
+    lock = threading.Lock()
+    totales, retenido = Counter(), Counter()
+
+    def trabajar(indice):
+        rnd = random.Random(semilla + indice)
+        contadores, unidades = Counter(), Counter()
+        try:
+            barrera.wait()
+            for _ in range(intentos):
+                lineas = [(rnd.choice(producto_ids), rnd.randint(1, 3)) for _ in range(rnd.randint(1, 3))]
+                try:
+                    reserva = reservar(lineas)
+                except StockInsuficiente:
+                    contadores['rechazadas'] += 1
+                    continue
+                except DatabaseError:
+                    # p. ej. "database is locked" de SQLite bajo contención
+                    contadores['errores'] += 1
+                    continue
+                contadores['reservas'] += 1
+                try:
+                    if rnd.random() < 0.3:
+                        liberar(reserva)
+                        contadores['liberadas'] += 1
+                        continue
+                    confirmar(reserva)
+                    contadores['confirmadas'] += 1
+                except DatabaseError:
+                    contadores['errores'] += 1
+                # Confirmada, o activa si falló la transición: retiene el stock
+                unidades.update(agrupar_lineas(lineas))
+        finally:
+            connections.close_all()
+            with lock:
+                totales.update(contadores)
+                retenido.update(unidades)
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajar, args=(indice,)) for indice in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    duracion = time.perf_counter() - inicio
+
+    resultado = {
+        clave: totales[clave]
+        for clave in ('reservas', 'rechazadas', 'liberadas', 'confirmadas', 'errores')
+    }
+    resultado['duracion_s'] = round(duracion, 3)
+    resultado['reservas_por_segundo'] = round(resultado['reservas'] / duracion, 1) if duracion else 0.0
+    resultado['retenido'] = dict(retenido)
+    return resultado
+
+
+# ===== Endpoints de la API: cliente de pruebas y carga HTTP =====
+
+CLAVE_BENCHMARK = 'Benchmark-Clave-2024'
+
+
+def crear_usuario_benchmark(semilla=0):
+    """
+    Usuario con el que los escenarios de login se autentican.
+    """
+    return Usuario.objects.create_user(
+        email=f'benchmark-{semilla}-login@example.com', password=CLAVE_BENCHMARK,
+        nombre='Benchmark', apellido='Login',
+    )
+
+
+def limpiar_usuarios_benchmark(semilla=0):
+    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+    usuarios = Usuario.objects.filter(email__startswith=f'benchmark-{semilla}-')
+    OutstandingToken.objects.filter(user__in=usuarios).delete()
+    usuarios.delete()
+
+
+def muestrear_productos(cantidad=500, semilla=0):
+    """
+    Hasta `cantidad` ids de producto al azar sin ORDER BY RAND() (que ordena
+    toda la tabla): cada muestra es el primer id desde un valor al azar entre
+    el mínimo y el máximo, una búsqueda por la clave primaria.
+    """
+    limites = Producto.objects.aggregate(minimo=Min('id'), maximo=Max('id'))
+    if limites['minimo'] is None:
+        return []
+    rnd = random.Random(semilla)
+    ids = {}
+    for _ in range(cantidad):
+        desde = rnd.randint(limites['minimo'], limites['maximo'])
+        ids[Producto.objects.filter(id__gte=desde).order_by('id').values_list('id', flat=True).first()] = None
+    return list(ids)
+
+
+def escenarios_api(producto_ids, semilla=0):
+    """
+    {nombre: función(i) -> (método, ruta, cuerpo JSON o None)} de los
+    endpoints medidos. `i` distingue cada request: detalle recorre los
+    productos y registro usa un correo nuevo por request.
+    """
+    base = '/ecommerce/api/v1'
+    correo_login = f'benchmark-{semilla}-login@example.com'
+    # Correos únicos también entre hilos y fases
+    registros = itertools.count()
+    return {
+        'productos_lista': lambda i: ('GET', f'{base}/productos/?page_size=12', None),
+        'productos_detalle': lambda i: ('GET', f'{base}/productos/{producto_ids[i % len(producto_ids)]}/', None),
+        'productos_nuevos': lambda i: ('GET', f'{base}/productos/nuevos/', None),
+        'productos_mas_vendidos': lambda i: ('GET', f'{base}/productos/mas_vendidos/', None),
+        'categorias_lista': lambda i: ('GET', f'{base}/categorias/', None),
+        'login': lambda i: ('POST', f'{base}/login/', {'email': correo_login, 'password': CLAVE_BENCHMARK}),
+        'registro': lambda i: ('POST', f'{base}/registro/', {
+            'email': f'benchmark-{semilla}-{next(registros)}@example.com',
+            'password': CLAVE_BENCHMARK, 'nombre': 'Benchmark', 'apellido': 'Registro',
+        }),
+    }
+
+
+def _consultas_por_request():
+    """
+    Consultas promedio por request según InstrumentacionMiddleware (cuenta
+    también los requests atendidos por otros hilos de este proceso).
+    """
+    datos = instrumentacion.estadisticas()
+    requests = sum(vista['requests'] for vista in datos.values())
+    if not requests:
+        return None
+    return round(sum(vista['consultas_media'] * vista['requests'] for vista in datos.values()) / requests, 2)
+
+
+def medir_cliente(cliente, escenario, repeticiones=50, calentamiento=3):
+    """
+    Ejecuta el escenario en serie con el cliente de pruebas de Django (sin
+    red; pasa por todos los middlewares). Retorna el resumen de latencias,
+    requests/s, errores (status >= 400) y consultas por request.
+    """
+    def llamar(i):
+        metodo, ruta, cuerpo = escenario(i)
+        if metodo == 'GET':
+            return cliente.get(ruta)
+        return cliente.generic(metodo, ruta, json.dumps(cuerpo), content_type='application/json')
+
+    for i in range(calentamiento):
+        llamar(i)
+    instrumentacion.reiniciar_estadisticas()
+    tiempos, errores = [], 0
+    inicio = time.perf_counter()
+    for i in range(calentamiento, calentamiento + repeticiones):
+        antes = time.perf_counter()
+        respuesta = llamar(i)
+        tiempos.append((time.perf_counter() - antes) * 1000)
+        errores += respuesta.status_code >= 400
+    duracion = time.perf_counter() - inicio
+    datos = resumen(tiempos)
+    datos['requests_por_segundo'] = round(repeticiones / duracion, 1) if duracion else 0.0
+    datos['errores'] = errores
+    datos['consultas'] = _consultas_por_request()
+    return datos
+
+
+class _ManejadorSilencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def servidor_local():
+    """
+    Sirve la aplicación en un puerto libre de 127.0.0.1 con el servidor
+    WSGI de Django (un hilo por conexión) y retorna su URL base. Los hilos
+    del servidor usan sus propias conexiones: los datos deben estar
+    confirmados (no sirve dentro de datos_temporales()).
+    """
+    servidor = ThreadedWSGIServer(('127.0.0.1', 0), _ManejadorSilencioso, allow_reuse_address=False)
+    servidor.set_app(WSGIHandler())
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield 'http://127.0.0.1:{}'.format(servidor.server_address[1])
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        hilo.join()
+
+
+def cargar_http(url_base, escenario, hilos=8, requests_por_hilo=50, timeout=30):
+    """
+    Generador de carga: `hilos` clientes HTTP en lazo cerrado (cada uno
+    envía su siguiente request al recibir la respuesta anterior). Retorna
+    el resumen de latencias, requests/s sobre el tiempo total y errores
+    (status >= 400 o fallas de conexión). Las consultas por request solo
+    se conocen si el servidor corre en este proceso (servidor_local).
+    """
+    barrera = threading.Barrier(hilos)
+    lock = threading.Lock()
+    tiempos, errores = [], Counter()
+
+    def trabajar(indice):
+        propios, fallas = [], Counter()
+        barrera.wait()
+        for n in range(requests_por_hilo):
+            metodo, ruta, cuerpo = escenario(indice * requests_por_hilo + n)
+            request = urllib.request.Request(
+                url_base + ruta, method=metodo,
+                data=json.dumps(cuerpo).encode() if cuerpo is not None else None,
+                headers={'Content-Type': 'application/json'} if cuerpo is not None else {},
+            )
+            antes = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as respuesta:
+                    respuesta.read()
+            except urllib.error.HTTPError as error:
+                fallas[str(error.code)] += 1
+            except OSError as error:
+                fallas[type(error).__name__] += 1
+            propios.append((time.perf_counter() - antes) * 1000)
+        with lock:
+            tiempos.extend(propios)
+            errores.update(fallas)
+
+    instrumentacion.reiniciar_estadisticas()
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajar, args=(indice,)) for indice in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    duracion = time.perf_counter() - inicio
+
+    datos = resumen(tiempos)
+    datos['requests_por_segundo'] = round(len(tiempos) / duracion, 1) if duracion else 0.0
+    datos['errores'] = sum(errores.values())
+    datos['detalle_errores'] = dict(errores)
+    datos['consultas'] = _consultas_por_request()
+    return datos
+
+
+def cargar_asgi(aplicacion, escenario, concurrencia=32, requests=500, host='localhost'):
+    """
+    Generador de carga en proceso para una aplicación ASGI (sin red ni
+    servidor): `concurrencia` clientes en lazo cerrado sobre un event loop,
+    como un worker de uvicorn con ese número de conexiones. Retorna lo mismo
+    que cargar_http. Los datos deben estar confirmados: las vistas síncronas
+    consultan desde el hilo de sync_to_async.
+    """
+    async def llamar(metodo, ruta, cuerpo):
+        ruta, _, query = ruta.partition('?')
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else b''
+        headers = [(b'host', host.encode())]
+        if cuerpo is not None:
+            headers.append((b'content-type', b'application/json'))
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': metodo,
+            'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(), 'query_string': query.encode(),
+            'root_path': '', 'headers': headers, 'client': ('127.0.0.1', 0), 'server': (host, 80),
+        }
+        terminado = asyncio.Event()
+        estado = {}
+        pendiente = [{'type': 'http.request', 'body': datos, 'more_body': False}]
+
+        async def recibir():
+            if pendiente:
+                return pendiente.pop()
+            # Django escucha la desconexión mientras atiende el request
+            await terminado.wait()
+            return {'type': 'http.disconnect'}
+
+        async def enviar(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                estado['status'] = mensaje['status']
+            elif not mensaje.get('more_body'):
+                terminado.set()
+
+        await aplicacion(scope, recibir, enviar)
+        return estado.get('status', 500)
+
+    async def principal():
+        siguiente = itertools.count()
+        tiempos, errores = [], Counter()
+
+        async def cliente():
+            while (i := next(siguiente)) < requests:
+                antes = time.perf_counter()
+                try:
+                    status = await llamar(*escenario(i))
+                except Exception as error:
+                    errores[type(error).__name__] += 1
+                else:
+                    if status >= 400:
+                        errores[str(status)] += 1
+                tiempos.append((time.perf_counter() - antes) * 1000)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+        duracion = time.perf_counter() - inicio
+        # Conexiones abiertas por el hilo de sync_to_async
+        await sync_to_async(connections.close_all)()
+        return tiempos, errores, duracion
+
+    instrumentacion.reiniciar_estadisticas()
+    tiempos, errores, duracion = asyncio.run(principal())
+    datos = resumen(tiempos)
+    datos['requests_por_segundo'] = round(len(tiempos) / duracion, 1) if duracion else 0.0
+    datos['errores'] = sum(errores.values())
+    datos['detalle_errores'] = dict(errores)
+    datos['consultas'] = _consultas_por_request()
+    return datos
+
+
+def comparar_resultados(base, actual, tolerancia=0.2):
+    """
+    Compara dos corridas de benchmark_api ({'resultados': {escenario:
+    {modo: datos}}}) y retorna la lista de regresiones: p95 más de
+    `tolerancia` peor, requests/s más de `tolerancia` menor, más consultas
+    por request o errores nuevos.
+    """
+    regresiones = []
+    for escenario, modos in actual['resultados'].items():
+        for modo, datos in modos.items():
+            anterior = base['resultados'].get(escenario, {}).get(modo)
+            if anterior is None:
+                continue
+            nombre = f'{escenario}/{modo}'
+            if anterior['p95'] and datos['p95'] > anterior['p95'] * (1 + tolerancia):
+                regresiones.append(f'{nombre}: p95 {anterior["p95"]:.2f} -> {datos["p95"]:.2f} ms')
+            if datos['requests_por_segundo'] < anterior['requests_por_segundo'] * (1 - tolerancia):
+                regresiones.append(
+                    f'{nombre}: {anterior["requests_por_segundo"]} -> {datos["requests_por_segundo"]} requests/s'
+                )
+            if None not in (anterior['consultas'], datos['consultas']) and datos['consultas'] > anterior['consultas']:
+                regresiones.append(f'{nombre}: consultas {anterior["consultas"]} -> {datos["consultas"]}')
+            if datos['errores'] > anterior['errores']:
+                regresiones.append(f'{nombre}: errores {anterior["errores"]} -> {datos["errores"]}')
+    return regresiones
+
+
+# ===== Conexiones: sin persistencia, persistentes y pool =====
+
+def medir_conexiones(settings_dict, alias, hilos=8, requests=200, hilo_por_request=False, consulta='SELECT 1'):
+    """
+    Simula el ciclo de conexión de `hilos` hilos que atienden `requests`
+    requests cada uno con `settings_dict` (ENGINE, CONN_MAX_AGE, POOL):
+    close_if_unusable_or_obsolete al empezar y terminar (como
+    request_started / request_finished) y una consulta en medio.
+    Con hilo_por_request cada request usa un DatabaseWrapper nuevo, como
+    los hilos de las vistas síncronas bajo ASGI.
+    Retorna el resumen de latencias por request, requests/s, conexiones
+    físicas abiertas y errores.
+    """
+    backend = load_backend(settings_dict['ENGINE'])
+    barrera = threading.Barrier(hilos)
+    lock = threading.Lock()
+    tiempos, totales = [], Counter()
+
+    def contar(sender, connection, **kwargs):
+        if connection.alias == alias:
+            with lock:
+                totales['conexiones'] += 1
+
+    def trabajar():
+        propios, errores, wrappers = [], 0, []
+        barrera.wait()
+        for _ in range(requests):
+            if hilo_por_request or not wrappers:
+                wrappers.append(backend.DatabaseWrapper(dict(settings_dict), alias))
+            wrapper = wrappers[-1]
+            inicio = time.perf_counter()
+            try:
+                wrapper.close_if_unusable_or_obsolete()
+                with wrapper.cursor() as cursor:
+                    cursor.execute(consulta)
+                    cursor.fetchall()
+                wrapper.close_if_unusable_or_obsolete()
+            except DatabaseError:
+                errores += 1
+            propios.append((time.perf_counter() - inicio) * 1000)
+        # Al terminar el hilo se cierran las conexiones que quedaron abiertas
+        # (bajo ASGI quedan colgadas hasta que el recolector las libera)
+        for wrapper in wrappers:
+            wrapper.close()
+        with lock:
+            tiempos.extend(propios)
+            totales['errores'] += errores
+
+    connection_created.connect(contar, weak=False)
+    try:
+        inicio = time.perf_counter()
+        trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+        duracion = time.perf_counter() - inicio
+    finally:
+        connection_created.disconnect(contar)
+
+    datos = resumen(tiempos)
+    datos['requests_por_segundo'] = round(len(tiempos) / duracion, 1) if duracion else 0.0
+    datos['errores'] = totales['errores']
+    usa_pool = issubclass(backend.DatabaseWrapper, pool.PoolMixin)
+    if usa_pool:
+        estadisticas = pool.estadisticas().get(f'{alias}/{settings_dict["NAME"]}', {})
+        # Con pool, connection_created cuenta préstamos; las físicas las cuenta el pool
+        datos['conexiones'] = estadisticas.get('creadas', 0)
+        datos['esperas_pool'] = estadisticas.get('esperas', 0)
+        pool.cerrar_pools(alias)
+    else:
+        datos['conexiones'] = totales['conexiones']
+    return datos
@@ -0,0 +1,360 @@
+"""
+Búsqueda de texto sobre nombre/descripcion de Producto.
+
+SearchFilter compila `?search=` a LIKE '%termino%', que no puede usar índices.
+Aquí la búsqueda se delega a un backend intercambiable (settings.BUSQUEDA):
+
+- `BusquedaFullText` (MySQL): índice FULLTEXT (nombre, descripcion), ver la
+  migración 0005. Ordena por la relevancia de MATCH ... AGAINST. MySQL
+  mantiene el índice solo.
+- `IndiceInvertido` (cualquier base, p. ej. SQLite en tests y desarrollo):
+  índice invertido en memoria del proceso, construido al primer uso y
+  actualizado de forma incremental al guardar/borrar productos (signals.py)
+  y, antes de cada búsqueda, con los productos de id mayor al último
+  indexado (altas por bulk_create, que no envían señales).
+  Cada worker tiene su propia copia: no es para producción con varios
+  procesos. Retorna a lo sumo MAX_RESULTADOS productos (los de mayor
+  relevancia); si recorta, el listado lo indica con `busqueda_limitada`.
+
+Ambos comparten la tokenización: minúsculas, sin tildes ("portátil" ->
+"portatil") y sin palabras vacías del español. Todas las palabras de la
+búsqueda deben aparecer (como prefijo) y la coincidencia en el nombre pesa
+más que en la descripción.
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Func, Max, Q, Value, When
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+from .models import Producto
+from .pagination import iterar_por_keyset
+
+DEFAULTS = {
+    # Ruta del backend; None lo elige según la base de datos
+    'BACKEND': None,
+    # Máximo de resultados que retorna IndiceInvertido (los de mayor
+    # relevancia); los listados recortados incluyen `busqueda_limitada`
+    'MAX_RESULTADOS': 1000,
+}
+
+CAMPOS = ('nombre', 'descripcion')
+PESOS = {'nombre': 2.0, 'descripcion': 1.0}
+
+PALABRAS_VACIAS = frozenset({
+    'a', 'al', 'con', 'de', 'del', 'e', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'se', 'sin', 'su', 'u', 'un', 'una', 'y',
+})
+PATRON_TOKEN = re.compile(r'\w+')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BUSQUEDA', {})}
+
+
+def normalizar(texto):
+    """
+    Minúsculas y sin marcas diacríticas: "Cámara Ñandú" -> "camara nandu".
+    """
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+
+
+def tokenizar(texto):
+    """
+    Divide el texto normalizado en palabras, sin palabras vacías.
+    """
+    return [
+        token for token in PATRON_TOKEN.findall(normalizar(texto or ''))
+        if token not in PALABRAS_VACIAS
+    ]
+
+
+def sin_relevancia(queryset):
+    return queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+
+def filtro_like(queryset, termino):
+    """
+    Comportamiento de SearchFilter; se usa cuando el término no deja palabras
+    indexables (solo palabras vacías o demasiado cortas).
+    """
+    condicion = Q()
+    for palabra in termino.split():
+        condicion &= Q(nombre__icontains=palabra) | Q(descripcion__icontains=palabra)
+    return sin_relevancia(queryset.filter(condicion))
+
+
+class BackendBusqueda:
+    """
+    Interfaz de los backends. `buscar` retorna el queryset filtrado y anotado
+    con `relevancia` (mayor es mejor), sin cambiar su ordenamiento.
+    """
+
+    def buscar(self, queryset, termino):
+        raise NotImplementedError
+
+    def buscar_acotado(self, queryset, termino):
+        """
+        buscar() más el tope de resultados si recortó las coincidencias,
+        o None si retorna todas.
+        """
+        return self.buscar(queryset, termino), None
+
+    def indexar(self, producto):
+        """Agrega o reemplaza un producto en el índice."""
+
+    def eliminar(self, producto_id):
+        """Quita un producto del índice."""
+
+    def invalidar(self):
+        """Descarta el índice tras escrituras masivas que no envían señales."""
+
+# ===== MySQL FULLTEXT =====
+
+class Coincidencia(Func):
+    """
+    MATCH (campos) AGAINST (consulta IN BOOLEAN MODE); solo MySQL.
+    """
+    output_field = FloatField()
+
+    def __init__(self, *campos, consulta):
+        super().__init__(*campos, Value(consulta))
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        *campos, consulta = self.get_source_expressions()
+        sql_campos, params = [], []
+        for campo in campos:
+            sql, campo_params = compiler.compile(campo)
+            sql_campos.append(sql)
+            params.extend(campo_params)
+        sql_consulta, params_consulta = compiler.compile(consulta)
+        return (
+            'MATCH ({}) AGAINST ({} IN BOOLEAN MODE)'.format(', '.join(sql_campos), sql_consulta),
+            [*params, *params_consulta],
+        )
+
+
+class BusquedaFullText(BackendBusqueda):
+    # innodb_ft_min_token_size: InnoDB no indexa palabras más cortas
+    largo_minimo = 3
+
+    def consulta_booleana(self, termino):
+        """
+        "Portátil gamer" -> "+portatil* +gamer*": todas las palabras, como prefijo.
+        Las collations *_ci de MySQL ya ignoran las tildes.
+        """
+        tokens = [token for token in tokenizar(termino) if len(token) >= self.largo_minimo]
+        return ' '.join(f'+{token}*' for token in tokens)
+
+    def buscar(self, queryset, termino):
+        consulta = self.consulta_booleana(termino)
+        if not consulta:
+            return filtro_like(queryset, termino)
+        return queryset.annotate(
+            relevancia=Coincidencia(*CAMPOS, consulta=consulta)
+        ).filter(relevancia__gt=0)
+
+# ===== Índice invertido en memoria =====
+
+class IndiceInvertido(BackendBusqueda):
+    """
+    postings: término -> {producto_id: frecuencia ponderada (nombre x2)}
+    La relevancia es TF-IDF sumada sobre las palabras de la búsqueda; cada
+    palabra se expande a todos los términos del vocabulario con ese prefijo.
+    """
+
+    def __init__(self, max_resultados=None):
+        self.max_resultados = max_resultados or get_config()['MAX_RESULTADOS']
+        self.lock = threading.RLock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self.lock:
+            self.postings = defaultdict(dict)
+            self.terminos_documento = {}
+            self.vocabulario = []  # ordenado, para expandir prefijos con bisect
+            self.ultimo_id = 0
+            self.construido = False
+
+    def invalidar(self):
+        self.reiniciar()
+
+    def indexar_desde(self, ultimo_id):
+        """
+        Indexa los productos con id > ultimo_id leyendo por bloques (keyset).
+        """
+        queryset = Producto.objects.filter(pk__gt=ultimo_id).order_by('id').values('id', *CAMPOS)
+        for fila in iterar_por_keyset(queryset):
+            self._agregar(fila['id'], fila)
+
+    def sincronizar(self):
+        """
+        Construye el índice al primer uso; después solo agrega las altas
+        que no pasaron por las señales (una consulta MAX(id) por búsqueda).
+        """
+        with self.lock:
+            if not self.construido:
+                self.indexar_desde(0)
+                self.construido = True
+                return
+            ultimo_id = Producto.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+            if ultimo_id > self.ultimo_id:
+                self.indexar_desde(self.ultimo_id)
+
+    @staticmethod
+    def frecuencias(datos):
+        frecuencias = defaultdict(float)
+        for campo in CAMPOS:
+            for token in tokenizar(datos.get(campo)):
+                frecuencias[token] += PESOS[campo]
+        return frecuencias
+
+    def _agregar(self, producto_id, datos):
+        frecuencias = self.frecuencias(datos)
+        for termino, frecuencia in frecuencias.items():
+            if termino not in self.postings:
+                bisect.insort(self.vocabulario, termino)
+            self.postings[termino][producto_id] = frecuencia
+        self.terminos_documento[producto_id] = set(frecuencias)
+        self.ultimo_id = max(self.ultimo_id, producto_id)
+
+    def _quitar(self, producto_id):
+        for termino in self.terminos_documento.pop(producto_id, ()):
+            documentos = self.postings[termino]
+            documentos.pop(producto_id, None)
+            if not documentos:
+                del self.postings[termino]
+                indice = bisect.bisect_left(self.vocabulario, termino)
+                del self.vocabulario[indice]
+
+    def indexar(self, producto):
+        with self.lock:
+            if not self.construido:
+                # Se indexará completo en la primera búsqueda
+                return
+            self._quitar(producto.pk)
+            self._agregar(producto.pk, {campo: getattr(producto, campo) for campo in CAMPOS})
+
+    def eliminar(self, producto_id):
+        with self.lock:
+            if self.construido:
+                self._quitar(producto_id)
+
+    def expandir(self, prefijo):
+        inicio = bisect.bisect_left(self.vocabulario, prefijo)
+        for termino in self.vocabulario[inicio:]:
+            if not termino.startswith(prefijo):
+                break
+            yield termino
+
+    def puntajes(self, termino):
+        """
+        {producto_id: relevancia} de todas las coincidencias, o None si el
+        término no deja palabras indexables.
+        """
+        tokens = tokenizar(termino)
+        if not tokens:
+            return None
+        with self.lock:
+            self.sincronizar()
+            total = len(self.terminos_documento) or 1
+            # Por palabra: [(postings del término expandido, idf)]
+            grupos = []
+            for token in dict.fromkeys(tokens):
+                grupo = [
+                    (self.postings[expandido], math.log(1 + total / len(self.postings[expandido])))
+                    for expandido in self.expandir(token)
+                ]
+                if not grupo:
+                    return {}
+                grupos.append(grupo)
+
+            # Los candidatos salen de la palabra menos frecuente; las demás
+            # solo se consultan para esos candidatos (todas deben aparecer)
+            grupos.sort(key=lambda grupo: sum(len(documentos) for documentos, _ in grupo))
+            puntajes = defaultdict(float)
+            for documentos, idf in grupos[0]:
+                for producto_id, frecuencia in documentos.items():
+                    puntajes[producto_id] += frecuencia * idf
+            for grupo in grupos[1:]:
+                siguientes = {}
+                for producto_id, puntaje in puntajes.items():
+                    extra = sum(
+                        documentos[producto_id] * idf
+                        for documentos, idf in grupo if producto_id in documentos
+                    )
+                    if extra:
+                        siguientes[producto_id] = puntaje + extra
+                puntajes = siguientes
+        return puntajes
+
+    def buscar(self, queryset, termino):
+        return self.buscar_acotado(queryset, termino)[0]
+
+    def buscar_acotado(self, queryset, termino):
+        puntajes = self.puntajes(termino)
+        if puntajes is None:
+            return filtro_like(queryset, termino), None
+        if not puntajes:
+            return sin_relevancia(queryset).none(), None
+        # [(producto_id, relevancia)] de mayor a menor, a lo sumo max_resultados
+        ranking = heapq.nsmallest(self.max_resultados, puntajes.items(), key=lambda item: (-item[1], item[0]))
+        limite = self.max_resultados if len(puntajes) > len(ranking) else None
+        return queryset.filter(pk__in=[producto_id for producto_id, _ in ranking]).annotate(
+            relevancia=Case(
+                *[When(pk=producto_id, then=Value(puntaje)) for producto_id, puntaje in ranking],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        ), limite
+
+# ===== Backend activo y filtro de DRF =====
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def obtener_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                ruta = get_config()['BACKEND']
+                if ruta:
+                    _backend = import_string(ruta)()
+                elif connection.vendor == 'mysql':
+                    _backend = BusquedaFullText()
+                else:
+                    _backend = IndiceInvertido()
+    return _backend
+
+
+class BusquedaTextoFilter(SearchFilter):
+    """
+    Reemplazo de SearchFilter que usa el backend de búsqueda. Sin ?ordering=
+    ordena por relevancia; debe ir después de OrderingFilter en
+    filter_backends. La vista puede desactivar el orden por relevancia con
+    `ordenar_por_relevancia = False` (p. ej. con paginación por cursor, que
+    solo ordena por campos del modelo).
+    Si el backend recorta las coincidencias guarda el tope en
+    `request.busqueda_limitada` (ver pagination.limite_busqueda).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        termino = ' '.join(self.get_search_terms(request))
+        if not termino:
+            return queryset
+        queryset, limite = obtener_backend().buscar_acotado(queryset, termino)
+        if limite is not None:
+            request.busqueda_limitada = limite
+        ordering_param = getattr(view, 'ordering_param', 'ordering')
+        if request.query_params.get(ordering_param) or not getattr(view, 'ordenar_por_relevancia', True):
+            return queryset
+        return queryset.order_by('-relevancia', 'id')
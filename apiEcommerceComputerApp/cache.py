@@ -0,0 +1,236 @@
+"""
+Cache de respuestas para los endpoints públicos de lectura del catálogo.
+
+- Backend: cualquier cache de Django (settings.CACHES). Por defecto LocMemCache;
+  con REDIS_URL se usa django.core.cache.backends.redis.RedisCache.
+- Clave: vista + acción + pk + host + query params normalizados + versión de
+  cada modelo del que depende la respuesta.
+- Invalidación: guardar o borrar un Producto/Categoria/ImagenProducto
+  incrementa el contador de versión del modelo (ver signals.py), así todas las
+  claves anteriores quedan huérfanas y expiran solas por TTL. El incremento
+  se hace al confirmar la transacción: antes, un lector concurrente cachearía
+  las filas viejas bajo la versión nueva.
+- Fallos simultáneos de la misma clave se coalescen (coalescencia.py): uno
+  calcula y el resto responde con su resultado (X-Cache: COALESCED).
+- La respuesta indica X-Cache: HIT/MISS/COALESCED y se registran aciertos/fallos.
+"""
+import hashlib
+import threading
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+from .coalescencia import vuelos
+from .metricas import CACHE_RESPUESTAS
+
+DEFAULTS = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'KEY_PREFIX': 'respuesta',
+    # Fallos idénticos en curso esperan al primero (ver coalescencia.py)
+    'COALESCER': True,
+    'ESPERA_COALESCER_S': 10,
+}
+
+# Modelos de los que dependen las respuestas del catálogo
+MODELOS_CATALOGO = ('producto', 'categoria', 'imagenproducto')
+
+HEADER = 'X-Cache'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+def get_cache():
+    return caches[get_config()['ALIAS']]
+
+# ===== Versiones por modelo =====
+
+def _clave_version(modelo):
+    return '{}:version:{}'.format(get_config()['KEY_PREFIX'], modelo)
+
+
+def versiones(modelos):
+    """
+    Retorna las versiones actuales de los modelos en una sola lectura.
+    """
+    cache = get_cache()
+    claves = {modelo: _clave_version(modelo) for modelo in modelos}
+    actuales = cache.get_many(claves.values())
+    resultado = []
+    for modelo, clave in claves.items():
+        version = actuales.get(clave)
+        if version is None:
+            # Las versiones no expiran; add evita pisar otra inicialización
+            cache.add(clave, 1, timeout=None)
+            version = cache.get(clave, 1)
+        resultado.append(version)
+    return resultado
+
+
+async def aversiones(modelos):
+    """
+    versiones() con la API async de la cache (vistas_async.py).
+    """
+    cache = get_cache()
+    claves = {modelo: _clave_version(modelo) for modelo in modelos}
+    actuales = await cache.aget_many(claves.values())
+    resultado = []
+    for modelo, clave in claves.items():
+        version = actuales.get(clave)
+        if version is None:
+            await cache.aadd(clave, 1, timeout=None)
+            version = await cache.aget(clave, 1)
+        resultado.append(version)
+    return resultado
+
+
+def invalidar(modelo):
+    """
+    Incrementa la versión del modelo: invalida todas las respuestas que dependen de él.
+    """
+    cache = get_cache()
+    clave = _clave_version(modelo)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # La clave no existía (cache reiniciado): cualquier versión nueva sirve
+        cache.add(clave, 2, timeout=None)
+
+
+def invalidar_al_confirmar(modelo):
+    """
+    invalidar() cuando se confirme la transacción en curso (en autocommit, ya).
+    """
+    transaction.on_commit(lambda: invalidar(modelo))
+
+# ===== Métricas de aciertos =====
+
+_lock = threading.Lock()
+_estadisticas = {}
+
+
+def registrar_resultado(nombre, acierto, coalescida=False):
+    """
+    coalescida: fallo que reutilizó el cálculo de otro request en curso.
+    """
+    resultado = 'hit' if acierto else 'coalesced' if coalescida else 'miss'
+    with _lock:
+        datos = _estadisticas.setdefault(nombre, {'hits': 0, 'misses': 0, 'coalesced': 0})
+        datos[{'hit': 'hits', 'miss': 'misses'}.get(resultado, resultado)] += 1
+    CACHE_RESPUESTAS.inc(endpoint=nombre, resultado=resultado)
+
+
+def estadisticas():
+    """
+    Retorna aciertos, fallos, fallos coalescidos y tasa de aciertos por
+    endpoint en este proceso.
+    """
+    with _lock:
+        resultado = {}
+        for nombre, datos in _estadisticas.items():
+            total = datos['hits'] + datos['misses'] + datos['coalesced']
+            resultado[nombre] = {**datos, 'hit_rate': datos['hits'] / total if total else 0.0}
+        return resultado
+
+
+def reiniciar_estadisticas():
+    with _lock:
+        _estadisticas.clear()
+
+# ===== Claves y decorador =====
+
+def normalizar_params(query_params):
+    """
+    Query params ordenados, sin valores vacíos y con valores múltiples
+    ordenados: ?b=2&a=1 y ?a=1&b=2 generan la misma clave.
+    """
+    normalizados = []
+    for clave in sorted(query_params.keys()):
+        valores = sorted(valor for valor in query_params.getlist(clave) if valor != '')
+        if valores:
+            normalizados.append((clave, valores))
+    return normalizados
+
+
+def _armar_clave(nombre, request, kwargs, versiones_actuales):
+    contenido = repr((
+        sorted(kwargs.items()),
+        request.get_host(),
+        normalizar_params(request.query_params),
+        versiones_actuales,
+    ))
+    resumen = hashlib.sha1(contenido.encode()).hexdigest()
+    return '{}:{}:{}'.format(get_config()['KEY_PREFIX'], nombre, resumen)
+
+
+def clave_respuesta(nombre, request, kwargs, modelos):
+    """
+    Construye la clave de cache de una respuesta.
+    """
+    return _armar_clave(nombre, request, kwargs, versiones(modelos))
+
+
+async def aclave_respuesta(nombre, request, kwargs, modelos):
+    """
+    La misma clave que clave_respuesta: las vistas async y los ViewSet
+    comparten las respuestas cacheadas.
+    """
+    return _armar_clave(nombre, request, kwargs, await aversiones(modelos))
+
+
+def datos_compartibles(respuesta):
+    """
+    Lo que se cachea y se comparte con los requests coalescidos.
+    """
+    return respuesta.data if respuesta.status_code == 200 else None
+
+
+def cachear_respuesta(modelos=MODELOS_CATALOGO):
+    """
+    Decorador para acciones de lectura de un ViewSet/APIView.
+    Solo cachea GET con status 200; guarda response.data (no el render), así
+    la negociación de contenido sigue funcionando. En un fallo, los requests
+    con la misma clave ya en curso en este proceso esperan el resultado del
+    primero en lugar de calcularlo otra vez.
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            config = get_config()
+            if not config['ENABLED'] or request.method != 'GET':
+                return metodo(self, request, *args, **kwargs)
+
+            nombre = '{}.{}'.format(type(self).__name__, metodo.__name__)
+            cache = get_cache()
+            clave = clave_respuesta(nombre, request, kwargs, modelos)
+            datos = cache.get(clave)
+            if datos is not None:
+                registrar_resultado(nombre, acierto=True)
+                respuesta = Response(datos)
+                respuesta[HEADER] = 'HIT'
+                return respuesta
+
+            def calcular():
+                respuesta = metodo(self, request, *args, **kwargs)
+                datos = datos_compartibles(respuesta)
+                if datos is not None:
+                    cache.set(clave, datos, config['TIMEOUT'])
+                return respuesta
+
+            if config['COALESCER']:
+                respuesta, coalescida = vuelos.ejecutar(
+                    clave, calcular, datos_compartibles, config['ESPERA_COALESCER_S'],
+                )
+            else:
+                respuesta, coalescida = calcular(), False
+            registrar_resultado(nombre, acierto=False, coalescida=coalescida)
+            if coalescida:
+                respuesta = Response(respuesta)
+            respuesta[HEADER] = 'COALESCED' if coalescida else 'MISS'
+            return respuesta
+        return envoltura
+    return decorador
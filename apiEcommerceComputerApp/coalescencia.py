@@ -0,0 +1,101 @@
+"""
+Coalescencia de requests idénticos en curso ("single flight").
+
+Cuando la cache de respuestas no tiene una clave (expiró o se invalidó con
+un cambio del catálogo), todos los requests que llegan a la vez para esa
+misma clave calcularían la misma respuesta: N consultas idénticas a la
+base. Con coalescencia el primero (líder) calcula y los demás (seguidores)
+esperan su resultado hasta `timeout` segundos.
+
+- Si el líder falla, no comparte nada (None) o tarda más que `timeout`,
+  cada seguidor calcula por su cuenta: nunca se responde peor que sin
+  coalescencia.
+- Es por proceso: con varios workers, cada uno calcula una vez por clave.
+- Los vuelos de código síncrono (`vuelos`) y los del event loop
+  (`vuelos_async`, vistas_async.py) van por separado: cada seguidor espera
+  a un líder de su mismo tipo, y un request síncrono nunca bloquea su hilo
+  esperando a una corrutina.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+
+class VueloUnico:
+    """
+    Vuelos en curso por clave; cada vuelo es un Future con lo que el líder
+    comparte.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.vuelos = {}
+
+    def _unirse(self, clave):
+        with self.lock:
+            vuelo = self.vuelos.get(clave)
+            if vuelo is not None:
+                return vuelo, False
+            vuelo = self.vuelos[clave] = Future()
+            return vuelo, True
+
+    def _aterrizar(self, clave, vuelo, compartido):
+        with self.lock:
+            self.vuelos.pop(clave, None)
+        vuelo.set_result(compartido)
+
+    def en_curso(self):
+        with self.lock:
+            return len(self.vuelos)
+
+    def ejecutar(self, clave, calcular, compartir=None, timeout=10):
+        """
+        Retorna (resultado, coalescido). El líder y quien calcula por su
+        cuenta reciben calcular(); los seguidores, compartir(resultado del
+        líder) con coalescido en True.
+        """
+        vuelo, lider = self._unirse(clave)
+        if not lider:
+            try:
+                compartido = vuelo.result(timeout)
+            except FutureTimeoutError:
+                compartido = None
+            if compartido is not None:
+                return compartido, True
+            return calcular(), False
+
+        compartido = None
+        try:
+            resultado = calcular()
+            compartido = compartir(resultado) if compartir else resultado
+            return resultado, False
+        finally:
+            self._aterrizar(clave, vuelo, compartido)
+
+    async def aejecutar(self, clave, calcular, compartir=None, timeout=10):
+        """
+        ejecutar() para corrutinas: `calcular` retorna un awaitable y los
+        seguidores esperan sin bloquear el event loop.
+        """
+        vuelo, lider = self._unirse(clave)
+        if not lider:
+            try:
+                # shield: si este seguidor se cancela no cancela el vuelo
+                compartido = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(vuelo)), timeout)
+            except asyncio.TimeoutError:
+                compartido = None
+            if compartido is not None:
+                return compartido, True
+            return await calcular(), False
+
+        compartido = None
+        try:
+            resultado = await calcular()
+            compartido = compartir(resultado) if compartir else resultado
+            return resultado, False
+        finally:
+            self._aterrizar(clave, vuelo, compartido)
+
+
+vuelos = VueloUnico()
+vuelos_async = VueloUnico()
@@ -0,0 +1,184 @@
+"""
+Hash de contraseñas con costo configurable, calculado fuera del hilo del
+request.
+
+`PBKDF2ConfigurableHasher` (primero en PASSWORD_HASHERS) es el PBKDF2-SHA256
+de Django con:
+  - iteraciones tomadas de CONTRASENAS['ITERACIONES'], ajustables por
+    entorno (variable PASSWORD_ITERACIONES). El formato y el nombre del
+    algoritmo no cambian: los hashes existentes siguen siendo válidos y,
+    como must_update compara las iteraciones, check_password (login y
+    cambio de contraseña) vuelve a calcular y guarda el hash con el costo
+    actual la próxima vez que el usuario inicia sesión;
+  - el PBKDF2 se ejecuta en un ProcessPoolExecutor de
+    CONTRASENAS['PROCESOS'] procesos. set_password/check_password (login,
+    registro, cambio de contraseña, createsuperuser) no cambian: el hilo
+    del request espera el resultado sin ocupar CPU ni el GIL. Como mucho
+    MAX_PENDIENTES hashes esperan en el pool; el resto espera su turno en
+    el hilo (contrapresión en lugar de una cola sin límite).
+Con gunicorn cada worker tiene su propio pool: PROCESOS × workers no
+debería superar los núcleos disponibles. PROCESOS = 0 calcula el hash en
+el mismo hilo.
+
+Al actualizar solo el costo (mismo algoritmo), Usuario.check_password
+recodifica con la misma sal (`recodificar`); la huella de los tokens sale
+de la sal (autenticacion.py), así cambiar PASSWORD_ITERACIONES no cierra
+las otras sesiones de cada usuario que inicia sesión. Cambiar la
+contraseña (set_password) genera otra sal y sí las cierra.
+"""
+import base64
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher, get_hasher, identify_hasher, make_password, must_update_salt,
+)
+from django.utils.encoding import force_bytes
+from .metricas import BUCKETS_SEGUNDOS, Histograma
+
+DEFAULTS = {
+    'ITERACIONES': 1_000_000,
+    # Procesos del pool por worker; None = núcleos disponibles, 0 = sin pool
+    'PROCESOS': None,
+    # Hashes enviados al pool a la vez; None = 2 por proceso
+    'MAX_PENDIENTES': None,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'CONTRASENAS', {})}
+
+
+DURACION_HASH = Histograma(
+    'password_hash_seconds', 'Duración de cada PBKDF2 (incluye la espera por el pool).',
+    ('modo',), BUCKETS_SEGUNDOS,
+)
+
+
+def _pbkdf2(password, salt, iteraciones, algoritmo):
+    # Corre en los procesos del pool: solo usa hashlib
+    return hashlib.pbkdf2_hmac(algoritmo, password, salt, iteraciones)
+
+# ===== Pool de procesos =====
+
+class PoolHash:
+    """
+    ProcessPoolExecutor creado al primer uso (y de nuevo tras un fork o si
+    un proceso muere) con un semáforo que limita los hashes pendientes.
+    Los procesos se inician con "spawn": no heredan los hilos ni las
+    conexiones del worker.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ejecutor = None
+        self.cupos = None
+        self.pid = None
+        self.procesos = None
+
+    def _obtener(self, procesos, max_pendientes):
+        with self.lock:
+            if self.ejecutor is None or self.pid != os.getpid() or self.procesos != procesos:
+                if self.ejecutor is not None and self.pid == os.getpid():
+                    self.ejecutor.shutdown(wait=False)
+                self.ejecutor = ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context('spawn'))
+                self.cupos = threading.BoundedSemaphore(max_pendientes or 2 * procesos)
+                self.pid, self.procesos = os.getpid(), procesos
+            return self.ejecutor, self.cupos
+
+    def calcular(self, procesos, max_pendientes, *argumentos):
+        ejecutor, cupos = self._obtener(procesos, max_pendientes)
+        with cupos:
+            try:
+                return ejecutor.submit(_pbkdf2, *argumentos).result()
+            except BrokenProcessPool:
+                with self.lock:
+                    if self.ejecutor is ejecutor:
+                        self.ejecutor = None
+                return _pbkdf2(*argumentos)
+
+    def cerrar(self):
+        with self.lock:
+            if self.ejecutor is not None and self.pid == os.getpid():
+                self.ejecutor.shutdown()
+            self.ejecutor = None
+
+
+_pool = PoolHash()
+
+
+def derivar(password, salt, iteraciones, algoritmo='sha256'):
+    """
+    PBKDF2-HMAC en el pool de procesos (o en este hilo con PROCESOS = 0).
+    """
+    config = get_config()
+    procesos = config['PROCESOS']
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    argumentos = (force_bytes(password), force_bytes(salt), iteraciones, algoritmo)
+    inicio = time.perf_counter()
+    if procesos > 0:
+        resultado = _pool.calcular(procesos, config['MAX_PENDIENTES'], *argumentos)
+    else:
+        resultado = _pbkdf2(*argumentos)
+    DURACION_HASH.observe(time.perf_counter() - inicio, modo='proceso' if procesos > 0 else 'local')
+    return resultado
+
+
+def cerrar_pool():
+    _pool.cerrar()
+
+# ===== Actualización del hash =====
+
+def sal(codificado):
+    """
+    Sal de un hash guardado; el valor completo si no se reconoce (p. ej.
+    contraseña inutilizable).
+    """
+    try:
+        return identify_hasher(codificado).decode(codificado).get('salt') or codificado
+    except ValueError:
+        return codificado
+
+
+def recodificar(password, codificado):
+    """
+    Hash nuevo de `password` cuando check_password pide actualizar el
+    guardado. Con el mismo algoritmo que el hasher preferido (solo cambió
+    el costo) conserva la sal, salvo que sea demasiado corta; si no, sal
+    nueva como set_password.
+    """
+    preferido = get_hasher('default')
+    try:
+        actual = identify_hasher(codificado)
+    except ValueError:
+        return make_password(password)
+    anterior = sal(codificado)
+    if actual.algorithm == preferido.algorithm and not must_update_salt(anterior, preferido.salt_entropy):
+        return make_password(password, anterior)
+    return make_password(password)
+
+# ===== Hasher =====
+
+class PBKDF2ConfigurableHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2PasswordHasher con iteraciones de CONTRASENAS y el cálculo en el
+    pool de procesos. Mismo algoritmo ("pbkdf2_sha256"), así que no debe
+    listarse junto al PBKDF2PasswordHasher de Django.
+    """
+
+    @property
+    def iterations(self):
+        return get_config()['ITERACIONES']
+
+    def encode(self, password, salt, iterations=None):
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        hash = derivar(password, salt, iterations, self.digest().name)
+        hash = base64.b64encode(hash).decode('ascii').strip()
+        return '%s$%d$%s$%s' % (self.algorithm, iterations, salt, hash)
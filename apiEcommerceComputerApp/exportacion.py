@@ -0,0 +1,58 @@
+"""
+Exportación del catálogo en streaming (NDJSON o arreglo JSON).
+"""
+import json
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+FORMATOS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'json': ('application/json', 'json'),
+}
+
+
+def _codificar(item):
+    # Mismo formato que JSONRenderer de DRF (UNICODE_JSON, COMPACT_JSON)
+    return json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+
+def _por_bloques(items, tamano):
+    bloque = []
+    for item in items:
+        bloque.append(_codificar(item))
+        if len(bloque) >= tamano:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def generar_ndjson(items, tamano_bloque=500):
+    """
+    Un objeto JSON por línea.
+    """
+    for bloque in _por_bloques(items, tamano_bloque):
+        yield '\n'.join(bloque) + '\n'
+
+
+def generar_json(items, tamano_bloque=500):
+    """
+    Un único arreglo JSON emitido de forma incremental.
+    """
+    yield '['
+    separador = ''
+    for bloque in _por_bloques(items, tamano_bloque):
+        yield separador + ','.join(bloque)
+        separador = ','
+    yield ']'
+
+
+def respuesta_streaming(items, formato, nombre_archivo):
+    """
+    StreamingHttpResponse con los items en `formato` ('ndjson' o 'json').
+    """
+    content_type, extension = FORMATOS[formato]
+    generador = generar_ndjson(items) if formato == 'ndjson' else generar_json(items)
+    respuesta = StreamingHttpResponse(generador, content_type=f'{content_type}; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.{extension}"'
+    return respuesta
@@ -0,0 +1,74 @@
+"""
+Conteos de facetas del catálogo (categoría, tipo, rango de precio y stock)
+para el conjunto de productos filtrado actual.
+
+Se resuelven con dos consultas agrupadas, sin importar cuántos valores
+tenga cada faceta:
+  1. GROUP BY categoria (con el nombre por JOIN)
+  2. GROUP BY tipo, rango de precio, disponible -> a lo sumo
+     tipos x rangos x 2 filas, que se suman en Python para cada faceta.
+"""
+from collections import Counter
+from decimal import Decimal
+from django.db.models import BooleanField, Case, Count, IntegerField, Value, When
+from .models import Tipo_Producto
+
+# Límites de los rangos de precio: [0, 100), [100, 500), ..., [5000, ∞)
+RANGOS_PRECIO = (0, 100, 500, 1000, 2000, 5000)
+
+
+def rango_precio(limites):
+    """
+    Expresión con el índice del rango de precio de cada producto.
+    """
+    return Case(
+        *[When(precio__lt=Decimal(limite), then=Value(indice - 1))
+          for indice, limite in enumerate(limites) if indice > 0],
+        default=Value(len(limites) - 1),
+        output_field=IntegerField(),
+    )
+
+
+def calcular_facetas(queryset, limites=RANGOS_PRECIO):
+    queryset = queryset.order_by().prefetch_related(None)
+
+    categorias = (
+        queryset.values('categoria_id', 'categoria__nombre')
+        .annotate(cantidad=Count('id'))
+        .order_by('-cantidad', 'categoria__nombre')
+    )
+
+    tipos, rangos, stock = Counter(), Counter(), Counter()
+    filas = (
+        queryset.annotate(
+            rango=rango_precio(limites),
+            disponible=Case(When(stock__gt=0, then=Value(True)), default=Value(False), output_field=BooleanField()),
+        )
+        .values('tipo', 'rango', 'disponible')
+        .annotate(cantidad=Count('id'))
+    )
+    for fila in filas:
+        tipos[fila['tipo']] += fila['cantidad']
+        rangos[fila['rango']] += fila['cantidad']
+        stock[fila['disponible']] += fila['cantidad']
+
+    return {
+        'total': sum(tipos.values()),
+        'categoria': [
+            {'id': fila['categoria_id'], 'nombre': fila['categoria__nombre'], 'cantidad': fila['cantidad']}
+            for fila in categorias
+        ],
+        'tipo': [
+            {'valor': tipo.value, 'nombre': tipo.label, 'cantidad': tipos[tipo.value]}
+            for tipo in Tipo_Producto
+        ],
+        'precio': [
+            {
+                'desde': desde,
+                'hasta': limites[indice + 1] if indice + 1 < len(limites) else None,
+                'cantidad': rangos[indice],
+            }
+            for indice, desde in enumerate(limites)
+        ],
+        'stock': {'disponible': stock[True], 'agotado': stock[False]},
+    }
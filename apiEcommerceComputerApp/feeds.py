@@ -0,0 +1,279 @@
+"""
+Feeds materializados de la página de inicio: `nuevos` y `mas_vendidos`.
+
+Cada feed guarda en cache, por ámbito (global y por categoría), los ids de
+los TAMANO primeros productos junto con sus claves de orden:
+  - nuevos:        created_at, id                  (descendente)
+  - mas_vendidos:  cantidad_vendida, rating, id    (descendente)
+Así /productos/nuevos/ y /productos/mas_vendidos/ leen una clave en lugar
+de ordenar la tabla en cada request.
+
+Mantenimiento:
+  - incremental: altas/cambios/bajas de productos y valoraciones
+    (signals.py) y ventas (rollups.registrar_venta / registrar_ventas),
+    al confirmar la transacción de la escritura.
+    Con las claves guardadas se decide sin consultas si el producto entra
+    al feed; solo si un producto sale de un feed lleno se recalcula ese
+    ámbito (una consulta por índice).
+  - completo: `reconstruir` (comando `reconstruir_feeds`, programado con cron).
+  - perezoso: si un ámbito no está en cache (o tras `invalidar`, que usa la
+    importación masiva) se calcula al leerlo.
+La escritura incremental es leer-modificar-escribir sin lock: la
+reconstrucción programada corrige cualquier carrera entre workers.
+"""
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from .metricas import REFRESCO_FEEDS
+from .models import Categoria, Producto
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'KEY_PREFIX': 'feed',
+    # Productos guardados por ámbito; `limit` mayores se resuelven con la consulta directa
+    'TAMANO': 24,
+}
+
+GLOBAL = 'global'
+
+# `limit` máximo de /productos/nuevos/ y /productos/mas_vendidos/
+LIMITE_MAXIMO = 50
+
+# feed -> campos de orden (todos descendentes, el último es el id)
+FEEDS = {
+    'nuevos': ('created_at', 'id'),
+    'mas_vendidos': ('cantidad_vendida', 'rating', 'id'),
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'FEEDS', {})}
+
+
+def get_cache():
+    return caches[get_config()['ALIAS']]
+
+
+def clave_feed(nombre, ambito):
+    return '{}:{}:{}'.format(get_config()['KEY_PREFIX'], nombre, ambito)
+
+
+def orden(nombre):
+    return ['-' + campo for campo in FEEDS[nombre]]
+
+
+def leer_limite(valor, defecto=6):
+    """
+    ?limit= como entero acotado a LIMITE_MAXIMO, o None si no es un entero
+    positivo.
+    """
+    if valor is None:
+        return defecto
+    if not (valor.isascii() and valor.isdigit()) or int(valor) < 1:
+        return None
+    return min(int(valor), LIMITE_MAXIMO)
+
+
+def vigentes(nombre, queryset):
+    """
+    Restringe `queryset` a los productos que pueden salir en el feed:
+    `nuevos` solo los creados en los últimos DIAS_PRODUCTO_NUEVO días (como
+    ?es_nuevo y ProductosNuevosViewSet); el feed guardado no vence solo.
+    """
+    return queryset.nuevos() if nombre == 'nuevos' else queryset
+
+# ===== Métricas =====
+
+_lock = threading.Lock()
+_metricas = {
+    'reconstrucciones': 0,
+    'reconstruccion_ms': 0.0,
+    'ultima_reconstruccion': None,
+    'actualizaciones': 0,
+    'actualizacion_ms_total': 0.0,
+    'recalculos_ambito': 0,
+}
+
+
+def _registrar(**valores):
+    with _lock:
+        for clave, valor in valores.items():
+            if clave in ('reconstruccion_ms', 'ultima_reconstruccion'):
+                _metricas[clave] = valor
+            else:
+                _metricas[clave] += valor
+
+
+def metricas():
+    """
+    Métricas de este proceso más la edad (segundos desde el último cálculo
+    completo) de cada feed global.
+    """
+    with _lock:
+        resultado = dict(_metricas)
+    ahora = time.time()
+    guardados = get_cache().get_many([clave_feed(nombre, GLOBAL) for nombre in FEEDS])
+    resultado['edad_s'] = {
+        nombre: ahora - guardados[clave_feed(nombre, GLOBAL)]['generado']
+        if clave_feed(nombre, GLOBAL) in guardados else None
+        for nombre in FEEDS
+    }
+    return resultado
+
+
+def reiniciar_metricas():
+    with _lock:
+        for clave in _metricas:
+            _metricas[clave] = None if clave == 'ultima_reconstruccion' else 0
+
+# ===== Cálculo y lectura =====
+
+def entrada(nombre, producto):
+    """
+    Clave de orden del producto en el feed (tupla terminada en el id).
+    """
+    return tuple(getattr(producto, campo) for campo in FEEDS[nombre])
+
+
+def calcular(nombre, ambito=GLOBAL):
+    """
+    Calcula un ámbito con una consulta top-N por índice y lo guarda.
+    """
+    inicio = time.perf_counter()
+    queryset = Producto.objects.all()
+    if ambito != GLOBAL:
+        queryset = queryset.filter(categoria_id=ambito)
+    entradas = list(queryset.order_by(*orden(nombre)).values_list(*FEEDS[nombre])[:get_config()['TAMANO']])
+    datos = {'entradas': entradas, 'generado': time.time()}
+    get_cache().set(clave_feed(nombre, ambito), datos, timeout=None)
+    REFRESCO_FEEDS.observe(time.perf_counter() - inicio, feed=nombre, tipo='ambito')
+    return datos
+
+
+def leer(nombre, ambito=GLOBAL):
+    datos = get_cache().get(clave_feed(nombre, ambito))
+    if datos is None:
+        datos = calcular(nombre, ambito)
+    return datos
+
+
+def ids(nombre, ambito=GLOBAL, limite=None):
+    """
+    Ids del feed en orden, o None si `limite` supera el tamaño del feed.
+    """
+    if limite is not None and limite > get_config()['TAMANO']:
+        return None
+    entradas = leer(nombre, ambito)['entradas']
+    return [item[-1] for item in entradas[:limite]]
+
+
+def ambitos():
+    return [GLOBAL, *Categoria.objects.order_by('id').values_list('id', flat=True)]
+
+
+def invalidar():
+    """
+    Descarta todos los feeds (p. ej. tras escrituras masivas); cada ámbito
+    se recalcula al leerlo.
+    """
+    get_cache().delete_many([clave_feed(nombre, ambito) for ambito in ambitos() for nombre in FEEDS])
+
+
+def reconstruir(nombres=None):
+    """
+    Recalcula todos los ámbitos (global y cada categoría) de los feeds.
+    Retorna la cantidad de ámbitos calculados.
+    """
+    inicio = time.perf_counter()
+    todos = ambitos()
+    calculados = 0
+    for nombre in nombres or FEEDS:
+        inicio_feed = time.perf_counter()
+        for ambito in todos:
+            calcular(nombre, ambito)
+            calculados += 1
+        REFRESCO_FEEDS.observe(time.perf_counter() - inicio_feed, feed=nombre, tipo='completo')
+    _registrar(
+        reconstrucciones=1,
+        reconstruccion_ms=(time.perf_counter() - inicio) * 1000,
+        ultima_reconstruccion=time.time(),
+    )
+    return calculados
+
+# ===== Actualización incremental =====
+
+def _actualizar_ambito(nombre, ambito, nueva=None, producto_id=None):
+    """
+    Inserta/reubica `nueva` o, sin ella, quita `producto_id` del ámbito.
+    Los ámbitos que no están en cache se ignoran (se calcularán al leerlos).
+    """
+    cache = get_cache()
+    clave = clave_feed(nombre, ambito)
+    datos = cache.get(clave)
+    if datos is None:
+        return
+    producto_id = nueva[-1] if nueva is not None else producto_id
+    entradas = datos['entradas']
+    lleno = len(entradas) >= get_config()['TAMANO']
+    minimo = entradas[-1] if entradas else None
+    presente = any(item[-1] == producto_id for item in entradas)
+    restantes = [item for item in entradas if item[-1] != producto_id]
+
+    if nueva is not None and (not lleno or nueva >= minimo):
+        # Con el feed incompleto están todos los productos del ámbito
+        entradas = sorted([*restantes, nueva], reverse=True)[:get_config()['TAMANO']]
+    elif presente and lleno:
+        # Salió de un feed lleno: el reemplazo puede estar fuera del feed
+        _registrar(recalculos_ambito=1)
+        calcular(nombre, ambito)
+        return
+    elif presente:
+        entradas = restantes
+    else:
+        return
+    cache.set(clave, {**datos, 'entradas': entradas}, timeout=None)
+
+
+def producto_guardado(producto, categoria_anterior=None):
+    """
+    Actualiza los feeds tras guardar un producto. `categoria_anterior` es la
+    categoría previa si cambió.
+    """
+    inicio = time.perf_counter()
+    for nombre in FEEDS:
+        nueva = entrada(nombre, producto)
+        if categoria_anterior is not None:
+            _actualizar_ambito(nombre, categoria_anterior, producto_id=producto.pk)
+        _actualizar_ambito(nombre, GLOBAL, nueva)
+        _actualizar_ambito(nombre, producto.categoria_id, nueva)
+    _registrar(actualizaciones=1, actualizacion_ms_total=(time.perf_counter() - inicio) * 1000)
+
+
+def producto_eliminado(producto_id, categoria_id):
+    inicio = time.perf_counter()
+    for nombre in FEEDS:
+        _actualizar_ambito(nombre, GLOBAL, producto_id=producto_id)
+        _actualizar_ambito(nombre, categoria_id, producto_id=producto_id)
+    _registrar(actualizaciones=1, actualizacion_ms_total=(time.perf_counter() - inicio) * 1000)
+
+
+def venta_registrada(producto_id):
+    """
+    Reubica el producto en mas_vendidos tras un UPDATE de cantidad_vendida
+    o rating (una consulta para leer los valores actualizados).
+    """
+    ventas_registradas([producto_id])
+
+
+def ventas_registradas(producto_ids):
+    """
+    Igual que venta_registrada para varios productos, con una sola consulta.
+    """
+    inicio = time.perf_counter()
+    filas = Producto.objects.filter(pk__in=producto_ids).values_list('categoria_id', *FEEDS['mas_vendidos'])
+    for fila in filas:
+        categoria_id, nueva = fila[0], tuple(fila[1:])
+        _actualizar_ambito('mas_vendidos', GLOBAL, nueva)
+        _actualizar_ambito('mas_vendidos', categoria_id, nueva)
+    _registrar(actualizaciones=len(filas), actualizacion_ms_total=(time.perf_counter() - inicio) * 1000)
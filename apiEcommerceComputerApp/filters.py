@@ -0,0 +1,25 @@
+import django_filters
+from .models import Producto, fecha_limite_nuevo
+
+
+class ProductoFilter(django_filters.FilterSet):
+    """
+    Filtros del catálogo. `es_nuevo` se resuelve con un rango sobre el índice
+    de created_at (Producto.objects.nuevos) en lugar del flag guardado, que
+    solo se actualiza una vez al día (barrer_es_nuevo).
+    """
+    es_nuevo = django_filters.BooleanFilter(method='filtrar_es_nuevo')
+
+    class Meta:
+        model = Producto
+        fields = {
+            'categoria': ['exact'],
+            'tipo': ['exact'],
+            'precio': ['gte', 'lte'],
+            'stock': ['gte', 'lte'],
+        }
+
+    def filtrar_es_nuevo(self, queryset, name, value):
+        if value:
+            return queryset.nuevos()
+        return queryset.filter(created_at__lt=fecha_limite_nuevo())
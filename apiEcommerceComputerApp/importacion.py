@@ -0,0 +1,201 @@
+"""
+Importación masiva de productos desde CSV o NDJSON.
+
+- Las categorías se resuelven (por nombre o id) con una sola consulta al inicio.
+- Las filas se validan por lotes con las mismas reglas del modelo
+  (Field.clean) y de ProductoDetailSerializer (precio > 0, stock >= 0).
+- Cada lote se escribe en su propia transacción con bulk_create (filas sin
+  id) y bulk_update (filas con id existente).
+- Las filas inválidas no se importan y se reportan con su número de línea.
+"""
+import csv
+import json
+import time
+from collections import Counter
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from . import feeds
+from .busqueda import obtener_backend
+from .cache import invalidar
+from .models import Categoria, Producto
+from .rollups import ajustar_conteo_categoria
+
+FORMATOS = ('csv', 'ndjson')
+CAMPOS = ('nombre', 'descripcion', 'precio', 'tipo', 'stock')
+# bulk_update no aplica auto_now: updated_at se asigna a mano
+CAMPOS_ACTUALIZABLES = [*CAMPOS, 'categoria', 'updated_at']
+# Máximo de errores detallados en el resultado (el total siempre se informa)
+MAX_ERRORES_REPORTADOS = 1000
+
+
+def formato_desde_nombre(nombre, por_defecto='csv'):
+    """
+    Deduce el formato a partir de la extensión del archivo.
+    """
+    extension = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    return por_defecto
+
+
+def leer_filas(archivo, formato):
+    """
+    Genera (número de línea, dict) desde un archivo de texto.
+    En NDJSON una línea inválida genera (número, None).
+    """
+    if formato == 'csv':
+        # La línea 1 es el encabezado
+        yield from enumerate(csv.DictReader(archivo), start=2)
+        return
+    for numero, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+        except ValueError:
+            datos = None
+        yield numero, datos if isinstance(datos, dict) else None
+
+
+class ImportadorProductos:
+    """
+    Uso:
+        resultado = ImportadorProductos(usuario=request.user).importar(leer_filas(archivo, 'csv'))
+    """
+
+    def __init__(self, usuario=None, batch_size=2000):
+        self.usuario = usuario
+        self.batch_size = batch_size
+        self.campos = {nombre: Producto._meta.get_field(nombre) for nombre in CAMPOS}
+        # Una sola consulta para todas las categorías: {nombre en minúsculas: id}
+        self.categorias = {
+            nombre.lower(): categoria_id
+            for categoria_id, nombre in Categoria.objects.values_list('id', 'nombre')
+        }
+        self.ids_categorias = set(self.categorias.values())
+        self.resultado = {
+            'filas': 0,
+            'creados': 0,
+            'actualizados': 0,
+            'total_errores': 0,
+            'errores': [],
+        }
+
+    def importar(self, filas):
+        inicio = time.perf_counter()
+        filas = iter(filas)
+        while True:
+            lote = list(islice(filas, self.batch_size))
+            if not lote:
+                break
+            self.procesar_lote(lote)
+
+        if self.resultado['creados'] or self.resultado['actualizados']:
+            # bulk_create/bulk_update no envían señales
+            invalidar('producto')
+            invalidar('categoria')
+            obtener_backend().invalidar()
+            feeds.invalidar()
+
+        duracion = time.perf_counter() - inicio
+        self.resultado['duracion_s'] = round(duracion, 3)
+        self.resultado['filas_por_segundo'] = round(self.resultado['filas'] / duracion, 1) if duracion else 0.0
+        return self.resultado
+
+    # ===== Validación =====
+
+    def registrar_error(self, numero, errores):
+        self.resultado['total_errores'] += 1
+        if len(self.resultado['errores']) < MAX_ERRORES_REPORTADOS:
+            self.resultado['errores'].append({'fila': numero, 'errores': errores})
+
+    def validar(self, datos):
+        """
+        Retorna (valores limpios, errores por campo) de una fila.
+        """
+        valores, errores = {}, {}
+        for nombre, campo in self.campos.items():
+            valor = datos.get(nombre)
+            if isinstance(valor, str):
+                valor = valor.strip()
+            if valor in (None, '') and campo.has_default():
+                valor = campo.get_default()
+            try:
+                valores[nombre] = campo.clean(valor, None)
+            except ValidationError as error:
+                errores[nombre] = error.messages
+
+        # Mismas reglas que ProductoDetailSerializer
+        if 'precio' in valores and valores['precio'] <= 0:
+            errores['precio'] = ['El precio debe ser mayor a 0.']
+        if 'stock' in valores and valores['stock'] < 0:
+            errores['stock'] = ['El stock no puede ser negativo.']
+
+        categoria = str(datos.get('categoria') or '').strip()
+        if categoria.isdigit() and int(categoria) in self.ids_categorias:
+            valores['categoria_id'] = int(categoria)
+        elif categoria.lower() in self.categorias:
+            valores['categoria_id'] = self.categorias[categoria.lower()]
+        else:
+            errores['categoria'] = [f'La categoría "{categoria}" no existe.']
+
+        producto_id = str(datos.get('id') or '').strip()
+        if producto_id:
+            if producto_id.isdigit():
+                valores['id'] = int(producto_id)
+            else:
+                errores['id'] = ['El id debe ser un número entero.']
+        return valores, errores
+
+    # ===== Escritura =====
+
+    def procesar_lote(self, lote):
+        validas = []
+        for numero, datos in lote:
+            self.resultado['filas'] += 1
+            if datos is None:
+                self.registrar_error(numero, {'fila': ['JSON inválido.']})
+                continue
+            valores, errores = self.validar(datos)
+            if errores:
+                self.registrar_error(numero, errores)
+            else:
+                validas.append((numero, valores))
+
+        existentes = Producto.objects.in_bulk(
+            [valores['id'] for _, valores in validas if 'id' in valores]
+        )
+        nuevos, actualizados = [], []
+        conteo_categorias = Counter()
+        ahora = timezone.now()
+        for numero, valores in validas:
+            producto_id = valores.pop('id', None)
+            if producto_id is None:
+                nuevos.append(Producto(**valores, es_nuevo=True, creado_por=self.usuario))
+                conteo_categorias[valores['categoria_id']] += 1
+                continue
+            producto = existentes.get(producto_id)
+            if producto is None:
+                self.registrar_error(numero, {'id': [f'No existe un producto con id {producto_id}.']})
+                continue
+            if producto.categoria_id != valores['categoria_id']:
+                conteo_categorias[producto.categoria_id] -= 1
+                conteo_categorias[valores['categoria_id']] += 1
+            for nombre, valor in valores.items():
+                setattr(producto, nombre, valor)
+            producto.updated_at = ahora
+            actualizados.append(producto)
+
+        with transaction.atomic():
+            Producto.objects.bulk_create(nuevos, batch_size=self.batch_size)
+            if actualizados:
+                Producto.objects.bulk_update(actualizados, CAMPOS_ACTUALIZABLES, batch_size=self.batch_size)
+            for categoria_id, delta in conteo_categorias.items():
+                if delta:
+                    ajustar_conteo_categoria(categoria_id, delta)
+        self.resultado['creados'] += len(nuevos)
+        self.resultado['actualizados'] += len(actualizados)
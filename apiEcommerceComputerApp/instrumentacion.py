@@ -0,0 +1,244 @@
+"""
+Instrumentación por request: cantidad de consultas, tiempo en la base de
+datos, tiempo de serialización, de render y total, agrupados por vista y
+acción resuelta (p. ej. "ProductoViewSet.mas_vendidos").
+
+- InstrumentacionMiddleware (middleware.py) abre una `Medicion` por request
+  y cuenta las consultas con un execute_wrapper (funciona sin DEBUG)
+  instalado una vez en cada conexión. El wrapper suma a la medición del
+  contextvar, así también cuenta las consultas que las vistas async
+  ejecutan en otro hilo (sync_to_async copia el contexto).
+- El código de la vista suma fases con `medir('serializacion')`.
+- Con SERVER_TIMING la respuesta lleva el header Server-Timing, que las
+  herramientas de desarrollo del navegador muestran por request.
+- `estadisticas()` retorna los histogramas de este proceso (buckets fijos
+  de latencia) y los requests y consultas que superan los umbrales se
+  registran en el logger "apiEcommerceComputerApp.instrumentacion".
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Header Server-Timing en las respuestas (expone tiempos internos)
+    'SERVER_TIMING': False,
+    # Requests más lentos que esto se registran como warning (None desactiva)
+    'UMBRAL_LENTO_MS': 500,
+    # Consultas SQL más lentas que esto se registran con su SQL (None desactiva)
+    'UMBRAL_CONSULTA_LENTA_MS': 100,
+}
+
+# Límites superiores (ms) de los buckets del histograma de latencia; el
+# último bucket (sin límite) cuenta el resto
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Largo máximo del SQL en el log de consultas lentas
+LARGO_SQL_LOG = 500
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'INSTRUMENTACION', {})}
+
+# ===== Medición del request actual =====
+
+class Medicion:
+    __slots__ = ('request', 'consultas', 'db_ms', 'fases', 'umbral_consulta_ms')
+
+    def __init__(self, request=None, umbral_consulta_ms=None):
+        self.request = request
+        self.consultas = 0
+        self.db_ms = 0.0
+        self.fases = defaultdict(float)
+        self.umbral_consulta_ms = umbral_consulta_ms
+
+
+_actual = contextvars.ContextVar('medicion', default=None)
+
+
+def medicion_actual():
+    return _actual.get()
+
+
+@contextmanager
+def medir(fase):
+    """
+    Suma la duración del bloque a `fase` en la medición del request actual,
+    sin las consultas ejecutadas dentro (ya cuentan en db; p. ej. querysets
+    que se evalúan al serializar). Fuera de un request instrumentado no hace nada.
+    """
+    medicion = _actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio, db_inicial = time.perf_counter(), medicion.db_ms
+    try:
+        yield
+    finally:
+        duracion = (time.perf_counter() - inicio) * 1000 - (medicion.db_ms - db_inicial)
+        medicion.fases[fase] += duracion
+
+
+def contar_consulta(execute, sql, params, many, context):
+    """
+    execute_wrapper que suma consultas y tiempo de base de datos a la
+    medición del contexto actual (si hay una).
+    """
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracion = (time.perf_counter() - inicio) * 1000
+        medicion.consultas += 1
+        medicion.db_ms += duracion
+        if medicion.umbral_consulta_ms is not None and duracion >= medicion.umbral_consulta_ms:
+            logger.warning(
+                'Consulta lenta (%.1f ms) en %s: %s',
+                duracion, nombre_vista(medicion.request), sql[:LARGO_SQL_LOG]
+            )
+
+
+def instalar_contador(conexion):
+    """
+    Agrega contar_consulta a la conexión (una sola vez). Va primero en la
+    lista: los execute_wrapper() temporales agregan y sacan del final.
+    """
+    if contar_consulta not in conexion.execute_wrappers:
+        conexion.execute_wrappers.insert(0, contar_consulta)
+
+
+@contextmanager
+def instrumentar(request, config=None):
+    """
+    Activa una Medicion para el bloque. Las conexiones de otros hilos
+    reciben el contador al conectarse (signals.py).
+    """
+    config = config or get_config()
+    for alias in connections:
+        instalar_contador(connections[alias])
+    medicion = Medicion(request, config['UMBRAL_CONSULTA_LENTA_MS'])
+    token = _actual.set(medicion)
+    try:
+        yield medicion
+    finally:
+        _actual.reset(token)
+
+
+def nombre_vista(request):
+    """
+    "Clase.accion" de la vista resuelta: la acción del ViewSet para el
+    método del request o el método HTTP en APIView; "sin_ruta" si no resolvió.
+    """
+    coincidencia = getattr(request, 'resolver_match', None)
+    if coincidencia is None:
+        return 'sin_ruta'
+    # Las vistas async del catálogo se informan como su vista DRF (vistas_async.py)
+    vista = getattr(coincidencia.func, 'respaldo', coincidencia.func)
+    clase = getattr(vista, 'cls', None) or getattr(vista, 'view_class', None)
+    if clase is None:
+        return coincidencia.view_name or getattr(vista, '__name__', 'vista')
+    acciones = getattr(vista, 'actions', None) or {}
+    metodo = request.method.lower()
+    return '{}.{}'.format(clase.__name__, acciones.get(metodo, metodo))
+
+
+def server_timing(medicion, total_ms):
+    """
+    Valor del header Server-Timing, p. ej.:
+    db;dur=3.1;desc="4 consultas", serializacion;dur=1.2, total;dur=6.0
+    """
+    partes = ['db;dur={:.1f};desc="{} consultas"'.format(medicion.db_ms, medicion.consultas)]
+    partes += ['{};dur={:.1f}'.format(fase, duracion) for fase, duracion in medicion.fases.items()]
+    partes.append('total;dur={:.1f}'.format(total_ms))
+    return ', '.join(partes)
+
+# ===== Histogramas del proceso =====
+
+_lock = threading.Lock()
+_estadisticas = {}
+
+
+def registrar(vista, medicion, total_ms, lento=False):
+    with _lock:
+        datos = _estadisticas.get(vista)
+        if datos is None:
+            datos = _estadisticas[vista] = {
+                'requests': 0,
+                'lentos': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'db_ms': 0.0,
+                'consultas': 0,
+                'max_consultas': 0,
+                'fases_ms': defaultdict(float),
+                'buckets': [0] * (len(BUCKETS_MS) + 1),
+            }
+        datos['requests'] += 1
+        datos['lentos'] += lento
+        datos['total_ms'] += total_ms
+        datos['max_ms'] = max(datos['max_ms'], total_ms)
+        datos['db_ms'] += medicion.db_ms
+        datos['consultas'] += medicion.consultas
+        datos['max_consultas'] = max(datos['max_consultas'], medicion.consultas)
+        for fase, duracion in medicion.fases.items():
+            datos['fases_ms'][fase] += duracion
+        datos['buckets'][bisect.bisect_left(BUCKETS_MS, total_ms)] += 1
+
+
+def percentil_buckets(buckets, p, maximo):
+    """
+    Estimación del percentil p: límite superior del bucket que lo contiene
+    (el máximo observado para el último bucket).
+    """
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    objetivo = p / 100 * total
+    acumulado = 0
+    for indice, cantidad in enumerate(buckets):
+        acumulado += cantidad
+        if acumulado >= objetivo:
+            return float(BUCKETS_MS[indice]) if indice < len(BUCKETS_MS) else maximo
+    return maximo
+
+
+def estadisticas():
+    """
+    Por vista: requests, lentos, promedios (ms y consultas), máximo de
+    consultas, percentiles estimados y los buckets del histograma.
+    """
+    with _lock:
+        resultado = {}
+        for vista, datos in _estadisticas.items():
+            requests = datos['requests']
+            resultado[vista] = {
+                'requests': requests,
+                'lentos': datos['lentos'],
+                'media_ms': datos['total_ms'] / requests,
+                'db_media_ms': datos['db_ms'] / requests,
+                'consultas_media': datos['consultas'] / requests,
+                'max_consultas': datos['max_consultas'],
+                'fases_media_ms': {fase: total / requests for fase, total in datos['fases_ms'].items()},
+                'p50_ms': percentil_buckets(datos['buckets'], 50, datos['max_ms']),
+                'p95_ms': percentil_buckets(datos['buckets'], 95, datos['max_ms']),
+                'p99_ms': percentil_buckets(datos['buckets'], 99, datos['max_ms']),
+                'max_ms': datos['max_ms'],
+                'buckets': dict(zip([*BUCKETS_MS, 'inf'], datos['buckets'])),
+            }
+        return resultado
+
+
+def reiniciar_estadisticas():
+    with _lock:
+        _estadisticas.clear()
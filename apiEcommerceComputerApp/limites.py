@@ -0,0 +1,225 @@
+"""
+Límite de requests por IP o usuario con cubetas de tokens (token bucket).
+
+Cada alcance de LIMITES['REGLAS'] tiene una cubeta por cliente (el usuario
+autenticado o, si no hay, la IP que DRF toma de REMOTE_ADDR / X-Forwarded-For
+según NUM_PROXIES) con RAFAGA tokens que se recargan a TASA tokens por
+segundo; cada request consume uno y sin tokens responde 429 con Retry-After
+(Throttled de DRF).
+
+Backends:
+  - 'memoria': cubetas en este proceso (OrderedDict con lock y a lo sumo
+    MAX_CLAVES clientes, se descartan los más antiguos). Con varios workers
+    cada uno limita por separado.
+  - 'cache': cubetas en la cache de Django LIMITES['ALIAS'] (Redis con
+    REDIS_URL), compartidas por todos los workers. Leer y guardar no es
+    atómico: requests simultáneos del mismo cliente en workers distintos
+    pueden pasar de más por un instante.
+
+Se aplica con las clases de throttle de DRF (catálogo, login y registro) y
+en las vistas async del catálogo (vistas_async.py) con `aconsumir`.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+from .metricas import Contador
+
+DEFAULTS = {
+    'ENABLED': True,
+    # 'memoria' (por proceso) o 'cache' (compartido entre workers)
+    'BACKEND': 'memoria',
+    'ALIAS': 'default',
+    'KEY_PREFIX': 'limite',
+    # Clientes distintos que recuerda el backend en memoria
+    'MAX_CLAVES': 100000,
+    # Por alcance: tokens por segundo y tamaño de la cubeta
+    'REGLAS': {
+        'catalogo': {'TASA': 20, 'RAFAGA': 100},
+        'login': {'TASA': 5 / 60, 'RAFAGA': 5},
+        'registro': {'TASA': 1 / 60, 'RAFAGA': 3},
+    },
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'LIMITES', {})}
+
+
+RECHAZADOS = Contador(
+    'throttled_requests_total', 'Requests rechazados con 429 por límite de tasa.', ('alcance',),
+)
+
+
+def recargar(estado, ahora, tasa, rafaga):
+    """
+    Consume un token de la cubeta `estado` (tokens, instante) o None si es
+    nueva. Retorna (nuevo estado, segundos de espera o 0 si se permitió).
+    """
+    if estado is None:
+        tokens = rafaga
+    else:
+        tokens, anterior = estado
+        tokens = min(rafaga, tokens + max(0.0, ahora - anterior) * tasa)
+    if tokens >= 1:
+        return (tokens - 1, ahora), 0
+    return (tokens, ahora), (1 - tokens) / tasa
+
+# ===== Backends =====
+
+class CubetasMemoria:
+    """
+    Cubetas de este proceso; las menos usadas se descartan al pasar de
+    MAX_CLAVES (volver a empezar con la cubeta llena).
+    """
+
+    def __init__(self, max_claves, reloj=time.monotonic):
+        self.lock = threading.Lock()
+        self.cubetas = OrderedDict()
+        self.max_claves = max_claves
+        self.reloj = reloj
+
+    def consumir(self, clave, tasa, rafaga):
+        with self.lock:
+            estado, espera = recargar(self.cubetas.get(clave), self.reloj(), tasa, rafaga)
+            self.cubetas[clave] = estado
+            self.cubetas.move_to_end(clave)
+            while len(self.cubetas) > self.max_claves:
+                self.cubetas.popitem(last=False)
+        return espera
+
+    async def aconsumir(self, clave, tasa, rafaga):
+        # Sin E/S: no hace falta salir del event loop
+        return self.consumir(clave, tasa, rafaga)
+
+    def reiniciar(self):
+        with self.lock:
+            self.cubetas.clear()
+
+
+class CubetasCache:
+    """
+    Cubetas en una cache de Django, con hora de reloj (compartida entre
+    procesos). Expiran cuando ya se habrían vuelto a llenar.
+    """
+
+    def __init__(self, alias, reloj=time.time):
+        self.alias = alias
+        self.reloj = reloj
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def timeout(tasa, rafaga):
+        return math.ceil(rafaga / tasa) + 1
+
+    def consumir(self, clave, tasa, rafaga):
+        estado, espera = recargar(self.cache.get(clave), self.reloj(), tasa, rafaga)
+        self.cache.set(clave, estado, self.timeout(tasa, rafaga))
+        return espera
+
+    async def aconsumir(self, clave, tasa, rafaga):
+        estado, espera = recargar(await self.cache.aget(clave), self.reloj(), tasa, rafaga)
+        await self.cache.aset(clave, estado, self.timeout(tasa, rafaga))
+        return espera
+
+    def reiniciar(self):
+        pass
+
+
+_memoria = None
+_lock = threading.Lock()
+
+
+def get_backend(config=None):
+    global _memoria
+    config = config or get_config()
+    if config['BACKEND'] == 'cache':
+        return CubetasCache(config['ALIAS'])
+    with _lock:
+        if _memoria is None or _memoria.max_claves != config['MAX_CLAVES']:
+            _memoria = CubetasMemoria(config['MAX_CLAVES'])
+        return _memoria
+
+
+def reiniciar():
+    """
+    Vacía las cubetas en memoria de este proceso (tests y benchmarks).
+    """
+    with _lock:
+        if _memoria is not None:
+            _memoria.reiniciar()
+
+# ===== Throttles de DRF =====
+
+class ThrottleCubeta(BaseThrottle):
+    """
+    Throttle de DRF con la cubeta de LIMITES['REGLAS'][alcance] por usuario
+    o IP. Sin regla para el alcance (o con ENABLED en False) no limita.
+    """
+    alcance = None
+
+    def __init__(self):
+        self.espera = None
+
+    def regla(self, config):
+        if not config['ENABLED']:
+            return None
+        return config['REGLAS'].get(self.alcance)
+
+    def clave(self, request, config):
+        usuario = getattr(request, 'user', None)
+        if usuario is not None and usuario.is_authenticated:
+            cliente = 'usuario:{}'.format(usuario.pk)
+        else:
+            cliente = 'ip:{}'.format(self.get_ident(request))
+        return '{}:{}:{}'.format(config['KEY_PREFIX'], self.alcance, cliente)
+
+    def allow_request(self, request, view):
+        config = get_config()
+        regla = self.regla(config)
+        if regla is None:
+            return True
+        verificado = getattr(request, 'limite_verificado', None)
+        if verificado is not None and verificado[0] == self.alcance:
+            # La vista async ya verificó la cubeta antes de delegar: sin consumir otra vez
+            self.espera = verificado[1]
+        else:
+            self.espera = get_backend(config).consumir(self.clave(request, config), regla['TASA'], regla['RAFAGA'])
+        if self.espera:
+            RECHAZADOS.inc(alcance=self.alcance)
+            return False
+        return True
+
+    async def apermitir(self, request):
+        """
+        allow_request para las vistas async. No cuenta el rechazo: la vista
+        guarda (alcance, espera) en `request.limite_verificado` y delega en
+        la de DRF, que responde el 429 con esa espera.
+        """
+        config = get_config()
+        regla = self.regla(config)
+        if regla is None:
+            return True
+        self.espera = await get_backend(config).aconsumir(self.clave(request, config), regla['TASA'], regla['RAFAGA'])
+        return not self.espera
+
+    def wait(self):
+        return self.espera
+
+
+class CatalogoThrottle(ThrottleCubeta):
+    alcance = 'catalogo'
+
+
+class LoginThrottle(ThrottleCubeta):
+    alcance = 'login'
+
+
+class RegistroThrottle(ThrottleCubeta):
+    alcance = 'registro'
@@ -0,0 +1,235 @@
+"""
+Consulta de la lista negra de refresh tokens (token_blacklist de simplejwt)
+sin ir a la base en cada verificación.
+
+Cada proceso mantiene:
+  - un filtro de Bloom con los jti de BlacklistedToken: si el jti no está
+    en el filtro, el token no está en la lista negra (sin falsos negativos);
+  - un LRU de los jti consultados recientemente con su resultado, para los
+    positivos del filtro (reales o falsos positivos) que sí van a la base.
+El filtro se sincroniza con una consulta incremental por id cada
+LISTA_NEGRA['SINCRONIZAR_S'] segundos: un token que otro worker agregó a la
+lista negra puede aceptarse en este proceso durante ese intervalo. Los
+agregados por este proceso (logout) cuentan de inmediato.
+La base asigna el id autoincremental al insertar, no al confirmar: una fila
+puede hacerse visible después de otra con id mayor. Por eso cada
+sincronización vuelve a leer las últimas VENTANA_IDS filas ya vistas.
+Un filtro de Bloom no permite borrar: cada RECONSTRUIR_S segundos (o al
+superar la capacidad) se reconstruye solo con los tokens no vencidos, así
+los que purgó purgar_tokens dejan de dar falsos positivos.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from .metricas import Contador
+
+DEFAULTS = {
+    # Tokens en lista negra previstos; el filtro crece al reconstruirse si se supera
+    'CAPACIDAD': 100000,
+    'TASA_FALSOS_POSITIVOS': 0.01,
+    'TAMANO_LRU': 10000,
+    'SINCRONIZAR_S': 5,
+    'RECONSTRUIR_S': 3600,
+    # Ids bajo el último visto que se releen al sincronizar (commits tardíos)
+    'VENTANA_IDS': 1000,
+    # Filas por consulta al cargar el filtro
+    'CHUNK_SIZE': 5000,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'LISTA_NEGRA', {})}
+
+
+CONSULTAS_LISTA_NEGRA = Contador(
+    'jwt_blacklist_checks_total',
+    'Verificaciones de la lista negra de tokens por resultado (bloom, lru o base de datos).',
+    ('resultado',),
+)
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sobre un bytearray; las k posiciones salen de un hash
+    blake2b con doble hashing (Kirsch-Mitzenmacher).
+    """
+
+    def __init__(self, capacidad, tasa_falsos_positivos=0.01):
+        capacidad = max(capacidad, 1)
+        self.bits = max(8, math.ceil(-capacidad * math.log(tasa_falsos_positivos) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacidad * math.log(2)))
+        self.capacidad = capacidad
+        self.elementos = 0
+        self.datos = bytearray((self.bits + 7) // 8)
+
+    def _posiciones(self, valor):
+        digest = hashlib.blake2b(valor.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def agregar(self, valor):
+        for posicion in self._posiciones(valor):
+            self.datos[posicion >> 3] |= 1 << (posicion & 7)
+        self.elementos += 1
+
+    def __contains__(self, valor):
+        return all(self.datos[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(valor))
+
+
+class ListaNegra:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self.lock:
+            self.filtro = None
+            self.recientes = OrderedDict()
+            self.ultimo_id = 0
+            self.sincronizado_en = 0.0
+            self.reconstruido_en = 0.0
+
+    # ----- Sincronización con la base -----
+
+    def _reconstruir(self, config):
+        """
+        Filtro nuevo con los tokens en lista negra que aún no vencen.
+        """
+        vigentes = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).order_by('id')
+        filtro = FiltroBloom(max(config['CAPACIDAD'], 2 * vigentes.count()), config['TASA_FALSOS_POSITIVOS'])
+        ultimo_id = BlacklistedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        desde = 0
+        while True:
+            filas = list(
+                vigentes.filter(id__gt=desde, id__lte=ultimo_id)
+                .values_list('id', 'token__jti')[:config['CHUNK_SIZE']]
+            )
+            if not filas:
+                break
+            for _, jti in filas:
+                filtro.agregar(jti)
+            desde = filas[-1][0]
+        self.filtro, self.ultimo_id = filtro, ultimo_id
+        # Solo se conservan los positivos confirmados
+        self.recientes = OrderedDict((jti, True) for jti, negro in self.recientes.items() if negro)
+        self.reconstruido_en = time.monotonic()
+
+    def _sincronizar(self, config):
+        """
+        Agrega las filas con id mayor a `ultimo_id - VENTANA_IDS`; las de la
+        ventana ya agregadas no vuelven a contar en el filtro.
+        """
+        nuevas = list(
+            BlacklistedToken.objects.filter(id__gt=self.ultimo_id - config['VENTANA_IDS'])
+            .order_by('id').values_list('id', 'token__jti')
+        )
+        for token_id, jti in nuevas:
+            if jti not in self.filtro:
+                self.filtro.agregar(jti)
+            if jti in self.recientes:
+                self.recientes[jti] = True
+            self.ultimo_id = max(self.ultimo_id, token_id)
+
+    def _actualizar_si_corresponde(self):
+        config = get_config()
+        ahora = time.monotonic()
+        if (self.filtro is None or ahora - self.reconstruido_en >= config['RECONSTRUIR_S']
+                or self.filtro.elementos > self.filtro.capacidad):
+            self._reconstruir(config)
+        elif ahora - self.sincronizado_en >= config['SINCRONIZAR_S']:
+            self._sincronizar(config)
+        else:
+            return
+        self.sincronizado_en = ahora
+
+    def _recordar(self, jti, negro):
+        self.recientes[jti] = negro
+        self.recientes.move_to_end(jti)
+        while len(self.recientes) > get_config()['TAMANO_LRU']:
+            self.recientes.popitem(last=False)
+
+    # ----- Consultas -----
+
+    def contiene(self, jti):
+        with self.lock:
+            self._actualizar_si_corresponde()
+            if jti not in self.filtro:
+                resultado = 'bloom'
+                negro = False
+            elif jti in self.recientes:
+                resultado = 'lru'
+                negro = self.recientes[jti]
+                self.recientes.move_to_end(jti)
+            else:
+                resultado = 'db'
+                negro = None
+        if negro is None:
+            negro = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            with self.lock:
+                self._recordar(jti, negro)
+        CONSULTAS_LISTA_NEGRA.inc(resultado=resultado)
+        return negro
+
+    def agregar(self, jti):
+        with self.lock:
+            if self.filtro is not None:
+                self.filtro.agregar(jti)
+            self._recordar(jti, True)
+
+
+_lista = ListaNegra()
+
+
+def esta_en_lista_negra(jti):
+    return _lista.contiene(jti)
+
+
+def agregar(jti):
+    _lista.agregar(jti)
+
+
+def reiniciar():
+    _lista.reiniciar()
+
+
+def purgar_vencidos(chunk_size=5000, ahora=None):
+    """
+    Borra los OutstandingToken vencidos y sus BlacklistedToken por bloques
+    de `chunk_size`, un DELETE por tabla y bloque en su propia transacción
+    (flushexpiredtokens de simplejwt los carga y borra todos de una vez).
+    Retorna (outstanding, blacklisted) borrados.
+    """
+    ahora = ahora or timezone.now()
+    vencidos = OutstandingToken.objects.filter(expires_at__lte=ahora).order_by('id')
+    totales = [0, 0]
+    while True:
+        ids = list(vencidos.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return tuple(totales)
+        with transaction.atomic():
+            totales[1] += BlacklistedToken.objects.filter(token_id__in=ids)._raw_delete(vencidos.db)
+            totales[0] += OutstandingToken.objects.filter(pk__in=ids)._raw_delete(vencidos.db)
+
+
+class ListaNegraRapidaMixin:
+    """
+    Para tokens con BlacklistMixin: verifica la lista negra con el filtro de
+    este proceso y registra en él los tokens que se agregan.
+    """
+
+    def check_blacklist(self):
+        if esta_en_lista_negra(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError('El token está en la lista negra.')
+
+    def blacklist(self):
+        resultado = super().blacklist()
+        agregar(self.payload[api_settings.JTI_CLAIM])
+        return resultado
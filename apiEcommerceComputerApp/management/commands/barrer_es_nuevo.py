@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from apiEcommerceComputerApp.rollups import barrer_es_nuevo
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py barrer_es_nuevo [--chunk-size 1000]
+    Actualiza es_nuevo de los productos que cruzaron el límite de días de
+    novedad. Pensado para ejecutarse una vez al día (cron).
+    """
+    help = 'Sincroniza Producto.es_nuevo con la fecha de creación, por bloques.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Productos por bloque/transacción (por defecto 1000).')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultado = barrer_es_nuevo(chunk_size=options['chunk_size'])
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            '{desmarcados} productos desmarcados y {marcados} marcados como nuevos'.format(**resultado)
+            + f' en {duracion:.2f}s'
+        ))
@@ -0,0 +1,158 @@
+import json
+import platform
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+from apiEcommerceComputerApp.benchmarks import (
+    cargar_http, comparar_resultados, crear_usuario_benchmark, escenarios_api, limpiar_catalogo,
+    limpiar_usuarios_benchmark, medir_cliente, muestrear_productos, sembrar_catalogo, servidor_local,
+)
+from apiEcommerceComputerApp.models import Producto
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_api --productos 10000 --salida base.json
+         python manage.py benchmark_api --productos 10000 --comparar base.json
+    Mide /productos/ (lista, detalle, nuevos y mas_vendidos), /categorias/,
+    /login/ y /registro/ con el cliente de pruebas de Django (en serie, sin
+    red) y con carga HTTP concurrente contra un servidor WSGI local o --url.
+    Reporta p50/p95/p99, requests/s y consultas por request, y escribe el
+    resultado en JSON.
+    Con --comparar marca las regresiones respecto de una corrida anterior
+    y termina con error si las hay.
+    Usa la base configurada (SQLite o MySQL). Como los hilos del servidor
+    usan sus propias conexiones, los datos sintéticos se confirman en la
+    base y se borran al terminar.
+    Los límites de tasa (limites.py) se desactivan solo en este proceso:
+    toda la carga sale de una IP, así que el servidor de --url debe correr
+    con LIMITES['ENABLED'] = False (se confirma con --url-sin-limites) o
+    login y registro responderían 429, contados como errores.
+    """
+    help = 'Benchmark y prueba de carga de los endpoints del catálogo y de autenticación.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=10000,
+                            help='Productos sintéticos a crear (10k a 1M; 0 = usar los datos actuales).')
+        parser.add_argument('--categorias', type=int, default=50)
+        parser.add_argument('--repeticiones', type=int, default=50,
+                            help='Requests por escenario con el cliente de pruebas.')
+        parser.add_argument('--hilos', type=int, default=8, help='Clientes HTTP concurrentes.')
+        parser.add_argument('--requests', type=int, default=50, help='Requests HTTP por hilo y escenario.')
+        parser.add_argument('--url', help='URL base de un servidor ya levantado (p. ej. gunicorn) en lugar del local.')
+        parser.add_argument('--url-sin-limites', action='store_true',
+                            help="Confirma que el servidor de --url corre con LIMITES['ENABLED'] = False.")
+        parser.add_argument('--escenarios', nargs='+', help='Subconjunto de escenarios a medir.')
+        parser.add_argument('--sin-http', action='store_true', help='Solo el cliente de pruebas.')
+        parser.add_argument('--sin-cache', action='store_true',
+                            help='Desactiva la cache de respuestas (mide el costo sin aciertos de cache).')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado.')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior con el que comparar.')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Empeoramiento relativo de p95 y requests/s que cuenta como regresión.')
+        parser.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['url'] and not options['sin_http'] and not options['url_sin_limites']:
+            raise CommandError(
+                "El servidor de --url aplica sus límites de tasa y toda la carga sale de una IP: "
+                "levántelo con LIMITES['ENABLED'] = False y agregue --url-sin-limites."
+            )
+        semilla = options['semilla']
+        categoria_ids = []
+        # Sin umbrales de lentitud: el log de cada request distorsiona la medición
+        config = {**getattr(settings, 'INSTRUMENTACION', {}),
+                  'ENABLED': True, 'UMBRAL_LENTO_MS': None, 'UMBRAL_CONSULTA_LENTA_MS': None}
+        hosts = [*settings.ALLOWED_HOSTS, 'localhost', '127.0.0.1']
+        cache = {**getattr(settings, 'RESPONSE_CACHE', {}), 'ENABLED': not options['sin_cache']}
+        # Toda la carga sale de una IP: los límites (limites.py) responderían 429
+        limites = {**getattr(settings, 'LIMITES', {}), 'ENABLED': False}
+        try:
+            if options['productos']:
+                self.stdout.write(f'Sembrando {options["productos"]} productos en {options["categorias"]} categorías...')
+                categoria_ids = sembrar_catalogo(options['productos'], categorias=options['categorias'], semilla=semilla)
+            crear_usuario_benchmark(semilla)
+            producto_ids = muestrear_productos(semilla=semilla)
+            if not producto_ids:
+                raise CommandError('No hay productos: use --productos.')
+            with override_settings(INSTRUMENTACION=config, ALLOWED_HOSTS=hosts, RESPONSE_CACHE=cache,
+                                   LIMITES=limites):
+                resultados = self.ejecutar(options, escenarios_api(producto_ids, semilla))
+        finally:
+            limpiar_usuarios_benchmark(semilla)
+            if categoria_ids:
+                limpiar_catalogo(categoria_ids)
+
+        corrida = {
+            'meta': {
+                'fecha': timezone.now().isoformat(),
+                'base_de_datos': connection.vendor,
+                'python': platform.python_version(),
+                'productos': options['productos'] or Producto.objects.count(),
+                'repeticiones': options['repeticiones'],
+                'hilos': options['hilos'],
+                'requests_por_hilo': options['requests'],
+                'url': options['url'],
+                'cache': not options['sin_cache'],
+            },
+            'resultados': resultados,
+        }
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                json.dump(corrida, archivo, indent=2)
+            self.stdout.write(f'Resultado guardado en {options["salida"]}')
+        if options['comparar']:
+            self.comparar(options['comparar'], corrida, options['tolerancia'])
+
+    def ejecutar(self, options, escenarios):
+        if options['escenarios']:
+            desconocidos = set(options['escenarios']) - set(escenarios)
+            if desconocidos:
+                raise CommandError(f'Escenarios desconocidos: {sorted(desconocidos)}; disponibles: {sorted(escenarios)}')
+            escenarios = {nombre: escenarios[nombre] for nombre in options['escenarios']}
+
+        resultados = {nombre: {} for nombre in escenarios}
+        self.stdout.write(
+            f'{"escenario":<20}{"modo":<9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+            f'{"req/s":>9}{"consultas":>11}{"errores":>9}'
+        )
+        cliente = Client(HTTP_HOST='localhost')
+        for nombre, escenario in escenarios.items():
+            resultados[nombre]['cliente'] = medir_cliente(cliente, escenario, repeticiones=options['repeticiones'])
+            self.imprimir(nombre, 'cliente', resultados[nombre]['cliente'])
+
+        if not options['sin_http']:
+            carga = {'hilos': options['hilos'], 'requests_por_hilo': options['requests']}
+            if options['url']:
+                for nombre, escenario in escenarios.items():
+                    resultados[nombre]['http'] = cargar_http(options['url'].rstrip('/'), escenario, **carga)
+                    self.imprimir(nombre, 'http', resultados[nombre]['http'])
+            else:
+                with servidor_local() as url:
+                    for nombre, escenario in escenarios.items():
+                        resultados[nombre]['http'] = cargar_http(url, escenario, **carga)
+                        self.imprimir(nombre, 'http', resultados[nombre]['http'])
+        return resultados
+
+    def imprimir(self, nombre, modo, datos):
+        consultas = '-' if datos['consultas'] is None else f'{datos["consultas"]:g}'
+        self.stdout.write(
+            f'{nombre:<20}{modo:<9}{datos["p50"]:>9.2f}{datos["p95"]:>9.2f}{datos["p99"]:>9.2f}'
+            f'{datos["requests_por_segundo"]:>9.1f}{consultas:>11}{datos["errores"]:>9}'
+        )
+
+    def comparar(self, ruta, corrida, tolerancia):
+        with open(ruta) as archivo:
+            base = json.load(archivo)
+        for clave in ('base_de_datos', 'productos', 'hilos', 'cache'):
+            if base['meta'].get(clave) != corrida['meta'][clave]:
+                self.stdout.write(self.style.WARNING(
+                    f'La corrida base usó {clave}={base["meta"].get(clave)} y esta {corrida["meta"][clave]}.'
+                ))
+        regresiones = comparar_resultados(base, corrida, tolerancia)
+        if regresiones:
+            for regresion in regresiones:
+                self.stdout.write(self.style.ERROR(f'Regresión: {regresion}'))
+            raise CommandError(f'{len(regresiones)} regresiones respecto de {ruta}.')
+        self.stdout.write(self.style.SUCCESS(f'Sin regresiones respecto de {ruta} (tolerancia {tolerancia:.0%}).'))
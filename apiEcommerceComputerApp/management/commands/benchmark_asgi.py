@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from apiEcommerceComputerApp.benchmarks import (
+    cargar_asgi, escenarios_api, limpiar_catalogo, muestrear_productos, sembrar_catalogo,
+)
+
+ESCENARIOS = ('productos_lista', 'productos_detalle', 'productos_nuevos', 'productos_mas_vendidos', 'categorias_lista')
+
+# Modo -> ROOT_URLCONF
+URLCONFS = {
+    'sync': 'apiEcommerceComputer.urls',
+    'async': 'apiEcommerceComputer.urls_asgi',
+}
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_asgi --productos 10000 --concurrencia 1,16,64
+    Carga ASGI en proceso (un worker: un event loop) sobre las lecturas del
+    catálogo, con los ViewSet síncronos (urls.py) y con las vistas async
+    (urls_asgi.py, vistas_async.py), para cada nivel de conexiones
+    concurrentes. Reporta p50/p95, requests/s y consultas por request.
+    Con --sin-cache cada request consulta la base. Los datos sintéticos se
+    confirman en la base y se borran al terminar.
+    """
+    help = 'Benchmark ASGI de las lecturas del catálogo: vistas síncronas vs. async.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=10000,
+                            help='Productos sintéticos a crear (0 = usar los datos actuales).')
+        parser.add_argument('--categorias', type=int, default=50)
+        parser.add_argument('--concurrencia', default='1,16,64', help='Conexiones concurrentes, separadas por coma.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests por escenario, modo y concurrencia.')
+        parser.add_argument('--escenarios', nargs='+', choices=ESCENARIOS, default=ESCENARIOS)
+        parser.add_argument('--sin-cache', action='store_true', help='Desactiva la cache de respuestas.')
+        parser.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        niveles = [int(valor) for valor in options['concurrencia'].split(',')]
+        config = {**getattr(settings, 'INSTRUMENTACION', {}),
+                  'ENABLED': True, 'UMBRAL_LENTO_MS': None, 'UMBRAL_CONSULTA_LENTA_MS': None}
+        hosts = [*settings.ALLOWED_HOSTS, 'localhost']
+        cache = {**getattr(settings, 'RESPONSE_CACHE', {}), 'ENABLED': not options['sin_cache']}
+        # Toda la carga sale de una IP: los límites (limites.py) responderían 429
+        limites = {**getattr(settings, 'LIMITES', {}), 'ENABLED': False}
+        categoria_ids = []
+        try:
+            if options['productos']:
+                self.stdout.write(f'Sembrando {options["productos"]} productos en {options["categorias"]} categorías...')
+                categoria_ids = sembrar_catalogo(options['productos'], categorias=options['categorias'],
+                                                 semilla=options['semilla'])
+            producto_ids = muestrear_productos(semilla=options['semilla'])
+            if not producto_ids:
+                raise CommandError('No hay productos: use --productos.')
+            escenarios = escenarios_api(producto_ids, options['semilla'])
+
+            self.stdout.write(
+                f'{"escenario":<24}{"modo":<7}{"conc.":>6}{"p50 ms":>9}{"p95 ms":>9}'
+                f'{"req/s":>9}{"consultas":>11}{"errores":>9}'
+            )
+            for nombre in options['escenarios']:
+                for concurrencia in niveles:
+                    for modo, urlconf in URLCONFS.items():
+                        with override_settings(ROOT_URLCONF=urlconf, INSTRUMENTACION=config,
+                                               ALLOWED_HOSTS=hosts, RESPONSE_CACHE=cache, LIMITES=limites):
+                            aplicacion = ASGIHandler()
+                            # Calentamiento: cache de respuestas, feeds y conexiones
+                            cargar_asgi(aplicacion, escenarios[nombre], concurrencia=1, requests=5)
+                            datos = cargar_asgi(aplicacion, escenarios[nombre], concurrencia, options['requests'])
+                        consultas = '-' if datos['consultas'] is None else f'{datos["consultas"]:g}'
+                        self.stdout.write(
+                            f'{nombre:<24}{modo:<7}{concurrencia:>6}{datos["p50"]:>9.2f}{datos["p95"]:>9.2f}'
+                            f'{datos["requests_por_segundo"]:>9.1f}{consultas:>11}{datos["errores"]:>9}'
+                        )
+        finally:
+            if categoria_ids:
+                limpiar_catalogo(categoria_ids)
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from apiEcommerceComputerApp.autenticacion import RefreshTokenUsuario
+from apiEcommerceComputerApp.benchmarks import datos_temporales, medir_cliente
+from apiEcommerceComputerApp.models import Usuario
+
+ENDPOINTS = {
+    'pedidos_lista': '/ecommerce/api/v1/pedidos/',
+    'reservas_lista': '/ecommerce/api/v1/reservas/',
+    'perfil': '/ecommerce/api/v1/perfil/',
+}
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_autenticacion --repeticiones 500
+    Compara requests autenticados con un token sin claims (simplejwt carga
+    el Usuario en cada request) y con RefreshTokenUsuario (el usuario sale
+    de los claims; ver autenticacion.py). /perfil/ necesita la fila
+    completa en ambos casos. El usuario se crea en una transacción que se
+    revierte al terminar.
+    """
+    help = 'Benchmark de requests autenticados con JWT: usuario desde la base vs. desde los claims.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=500)
+
+    def handle(self, *args, **options):
+        config = {**getattr(settings, 'INSTRUMENTACION', {}),
+                  'ENABLED': True, 'UMBRAL_LENTO_MS': None, 'UMBRAL_CONSULTA_LENTA_MS': None}
+        hosts = [*settings.ALLOWED_HOSTS, 'localhost']
+        with datos_temporales(), override_settings(INSTRUMENTACION=config, ALLOWED_HOSTS=hosts):
+            usuario = Usuario.objects.create_user(
+                email='benchmark-autenticacion@example.com', password='Benchmark-Clave-2024',
+                nombre='Benchmark', apellido='Autenticacion',
+            )
+            tokens = {
+                'base': RefreshToken.for_user(usuario).access_token,
+                'claims': RefreshTokenUsuario.for_user(usuario).access_token,
+            }
+            self.stdout.write(f'{"endpoint":<16}{"token":<8}{"p50 ms":>9}{"p95 ms":>9}{"req/s":>10}{"consultas":>11}')
+            for nombre, ruta in ENDPOINTS.items():
+                for modo, token in tokens.items():
+                    cliente = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+                    datos = medir_cliente(cliente, lambda i: ('GET', ruta, None), repeticiones=options['repeticiones'])
+                    self.stdout.write(
+                        f'{nombre:<16}{modo:<8}{datos["p50"]:>9.3f}{datos["p95"]:>9.3f}'
+                        f'{datos["requests_por_segundo"]:>10.1f}{datos["consultas"]:>11g}'
+                    )
@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand
+from apiEcommerceComputerApp.benchmarks import datos_temporales, medir, sembrar_catalogo
+from apiEcommerceComputerApp.busqueda import filtro_like, obtener_backend
+from apiEcommerceComputerApp.models import Producto
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_busqueda --productos 200000 --termino 0012345
+    Compara la búsqueda LIKE '%termino%' (SearchFilter) contra el backend de
+    búsqueda activo (FULLTEXT en MySQL, índice invertido en otras bases),
+    obteniendo la primera página ordenada por relevancia.
+    Los datos sintéticos se crean en una transacción que se revierte al terminar.
+    """
+    help = 'Benchmark de la búsqueda de productos: LIKE vs. backend de búsqueda.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=200000)
+        parser.add_argument('--termino', action='append',
+                            help='Término a buscar (se puede repetir).')
+        parser.add_argument('--repeticiones', type=int, default=10)
+
+    def handle(self, *args, **options):
+        terminos = options['termino'] or ['0012345', 'producto 00123']
+        backend = obtener_backend()
+        with datos_temporales():
+            sembrar_catalogo(options['productos'])
+            backend.invalidar()
+            inicio = time.perf_counter()
+            list(backend.buscar(Producto.objects.all(), terminos[0])[:1])
+            self.stdout.write(
+                f'{type(backend).__name__}: primera búsqueda (construcción del índice) '
+                f'{(time.perf_counter() - inicio) * 1000:.0f} ms'
+            )
+
+            self.stdout.write(f'{"termino":<20}{"estrategia":<18}{"p50 ms":>10}{"p95 ms":>10}{"filas":>8}')
+            for termino in terminos:
+                casos = {
+                    'like': lambda: list(filtro_like(Producto.objects.all(), termino).order_by('id')[:12]),
+                    'backend': lambda: list(
+                        backend.buscar(Producto.objects.all(), termino).order_by('-relevancia', 'id')[:12]
+                    ),
+                }
+                for nombre, funcion in casos.items():
+                    datos = medir(funcion, repeticiones=options['repeticiones'], calentamiento=1)
+                    self.stdout.write(
+                        f'{termino:<20}{nombre:<18}{datos["p50"]:>10.2f}{datos["p95"]:>10.2f}{len(funcion()):>8}'
+                    )
+            backend.invalidar()
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from apiEcommerceComputerApp.benchmarks import datos_temporales, medir, sembrar_catalogo
+from apiEcommerceComputerApp.models import Categoria
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_categorias --categorias 1000 --productos 1000000
+    Compara tres formas de obtener la cantidad de productos de todas las categorías:
+      - COUNT por fila (el antiguo get_cantidad_productos, 1 + N consultas)
+      - una consulta agrupada (annotate Count)
+      - la columna mantenida Categoria.cantidad_productos
+    Los datos sintéticos se crean en una transacción que se revierte al terminar.
+    """
+    help = 'Benchmark del conteo de productos por categoría.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categorias', type=int, default=1000)
+        parser.add_argument('--productos', type=int, default=1000000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with datos_temporales():
+            self.stdout.write(
+                f'Sembrando {options["categorias"]} categorías y {options["productos"]} productos...'
+            )
+            sembrar_catalogo(options['productos'], categorias=options['categorias'])
+
+            casos = {
+                'count_por_fila': lambda: [c.productos.count() for c in Categoria.objects.all()],
+                'consulta_agrupada': lambda: list(
+                    Categoria.objects.annotate(total=Count('productos')).values_list('id', 'total')
+                ),
+                'columna_contador': lambda: list(
+                    Categoria.objects.values_list('id', 'cantidad_productos')
+                ),
+            }
+
+            self.stdout.write(f'{"estrategia":<20}{"p50 ms":>10}{"p95 ms":>10}{"consultas":>11}')
+            for nombre, funcion in casos.items():
+                datos = medir(funcion, repeticiones=options['repeticiones'], calentamiento=1)
+                self.stdout.write(
+                    f'{nombre:<20}{datos["p50"]:>10.2f}{datos["p95"]:>10.2f}{datos["consultas"]:>11}'
+                )
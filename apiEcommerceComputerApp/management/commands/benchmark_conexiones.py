@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from apiEcommerceComputerApp.benchmarks import medir_conexiones
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_conexiones --hilos 8 --requests 200 --tamano-pool 4
+    Compara la latencia por request con conexiones sin persistencia
+    (CONN_MAX_AGE = 0), persistentes por hilo (CONN_MAX_AGE > 0) y del pool
+    en proceso (pool.py), contra la base configurada en DATABASES.
+    Con --hilo-por-request cada request usa un hilo nuevo, como las vistas
+    síncronas bajo ASGI: las conexiones persistentes dejan de reutilizarse.
+    En SQLite abrir una conexión casi no cuesta; la diferencia relevante es
+    la de MySQL (handshake TCP y autenticación).
+    """
+    help = 'Benchmark de conexiones sin persistencia, persistentes y con pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help='Requests por hilo.')
+        parser.add_argument('--tamano-pool', type=int, default=4)
+        parser.add_argument('--max-age', type=int, default=60, help='CONN_MAX_AGE del modo persistente.')
+        parser.add_argument('--hilo-por-request', action='store_true')
+
+    def handle(self, *args, **options):
+        base = connections[options['database']].settings_dict
+        motores = getattr(settings, 'MOTORES_CON_POOL', {})
+        # Motor de Django sin pool aunque DATABASES ya use el del pool
+        motor = {con_pool: sin_pool for sin_pool, con_pool in motores.items()}.get(base['ENGINE'], base['ENGINE'])
+        modos = {
+            'sin_persistencia': {'ENGINE': motor, 'CONN_MAX_AGE': 0},
+            'persistente': {'ENGINE': motor, 'CONN_MAX_AGE': options['max_age']},
+        }
+        if motor in motores:
+            modos['pool'] = {
+                'ENGINE': motores[motor], 'CONN_MAX_AGE': 0,
+                'POOL': {**base.get('POOL', {}), 'TAMANO': options['tamano_pool']},
+            }
+        else:
+            self.stdout.write(self.style.WARNING(f'Sin backend con pool para {motor}.'))
+
+        self.stdout.write(
+            f'{"modo":<18}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"req/s":>10}{"conexiones":>12}{"errores":>9}'
+        )
+        for modo, cambios in modos.items():
+            datos = medir_conexiones(
+                {**base, **cambios}, f'benchmark_{modo}', hilos=options['hilos'],
+                requests=options['requests'], hilo_por_request=options['hilo_por_request'],
+            )
+            self.stdout.write(
+                f'{modo:<18}{datos["p50"]:>9.3f}{datos["p95"]:>9.3f}{datos["p99"]:>9.3f}'
+                f'{datos["requests_por_segundo"]:>10.1f}{datos["conexiones"]:>12}{datos["errores"]:>9}'
+            )
@@ -0,0 +1,63 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+from apiEcommerceComputerApp import contrasenas
+from apiEcommerceComputerApp.benchmarks import (
+    cargar_http, crear_usuario_benchmark, escenarios_api, limpiar_usuarios_benchmark, servidor_local,
+)
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_contrasenas --iteraciones 260000,600000,1000000 --hilos 8
+    Logins por segundo (POST /login/ por HTTP contra un servidor local con
+    un hilo por conexión) para cada costo de PBKDF2, con el hash en el
+    hilo del request (PROCESOS = 0) y en el pool de procesos
+    (contrasenas.py). "por núcleo" divide por los núcleos disponibles.
+    El usuario se confirma en la base y se borra al terminar.
+    """
+    help = 'Benchmark de logins por segundo según el costo del hash y dónde se calcula.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', default='260000,600000,1000000',
+                            help='Costos de PBKDF2 separados por coma.')
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=10, help='Logins por hilo.')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos del pool (por defecto, los núcleos).')
+        parser.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        nucleos = os.cpu_count() or 1
+        modos = {'local': 0, 'procesos': options['procesos'] or nucleos}
+        hosts = [*settings.ALLOWED_HOSTS, '127.0.0.1']
+        instrumentacion = {**getattr(settings, 'INSTRUMENTACION', {}), 'UMBRAL_LENTO_MS': None}
+        # Todos los logins salen de una IP: el límite de /login/ (limites.py) respondería 429
+        limites = {**getattr(settings, 'LIMITES', {}), 'ENABLED': False}
+        escenario = escenarios_api([], options['semilla'])['login']
+        limpiar_usuarios_benchmark(options['semilla'])
+        crear_usuario_benchmark(options['semilla'])
+        self.stdout.write(f'núcleos: {nucleos}')
+        self.stdout.write(
+            f'{"iteraciones":>12}  {"modo":<10}{"p50 ms":>9}{"p95 ms":>9}{"logins/s":>10}{"por núcleo":>12}{"errores":>9}'
+        )
+        try:
+            with servidor_local() as url:
+                for iteraciones in [int(valor) for valor in options['iteraciones'].split(',')]:
+                    for modo, procesos in modos.items():
+                        config = {**getattr(settings, 'CONTRASENAS', {}), 'ITERACIONES': iteraciones, 'PROCESOS': procesos}
+                        with override_settings(CONTRASENAS=config, ALLOWED_HOSTS=hosts,
+                                               INSTRUMENTACION=instrumentacion, LIMITES=limites):
+                            # Calentamiento: inicia el pool y actualiza el hash al costo nuevo
+                            cargar_http(url, escenario, hilos=1, requests_por_hilo=1)
+                            datos = cargar_http(url, escenario, options['hilos'], options['requests'])
+                        self.stdout.write(
+                            f'{iteraciones:>12}  {modo:<10}{datos["p50"]:>9.1f}{datos["p95"]:>9.1f}'
+                            f'{datos["requests_por_segundo"]:>10.1f}{datos["requests_por_segundo"] / nucleos:>12.1f}'
+                            f'{datos["errores"]:>9}'
+                        )
+        finally:
+            contrasenas.cerrar_pool()
+            connections.close_all()
+            limpiar_usuarios_benchmark(options['semilla'])
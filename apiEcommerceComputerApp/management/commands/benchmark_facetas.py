@@ -0,0 +1,79 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+from apiEcommerceComputerApp.benchmarks import datos_temporales, medir, sembrar_catalogo
+from apiEcommerceComputerApp.facetas import RANGOS_PRECIO
+from apiEcommerceComputerApp.models import Tipo_Producto
+from apiEcommerceComputerApp.views import ProductoViewSet
+
+URL = '/ecommerce/api/v1/productos/'
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_facetas --productos 200000 --categorias 20 --objetivo-ms 200
+    Compara el costo de obtener todos los conteos de la barra de filtros:
+      - ingenuo: un /productos/?<faceta>=<valor>&page_size=1 por valor (lee `count`)
+      - facetas: un solo /productos/facetas/
+    con la cache de respuestas desactivada. Termina con error si el p95 de
+    /facetas/ supera el objetivo.
+    Los datos sintéticos se crean en una transacción que se revierte al terminar.
+    """
+    help = 'Benchmark de /productos/facetas/ vs. una llamada por valor de faceta.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=200000)
+        parser.add_argument('--categorias', type=int, default=20)
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--objetivo-ms', type=float, default=200.0,
+                            help='p95 máximo aceptado para /productos/facetas/.')
+
+    def handle(self, *args, **options):
+        with datos_temporales(), override_settings(RESPONSE_CACHE={'ENABLED': False}):
+            categoria_ids = sembrar_catalogo(options['productos'], categorias=options['categorias'])
+            self.ejecutar(categoria_ids, options)
+
+    def ejecutar(self, categoria_ids, options):
+        factory = APIRequestFactory()
+        listado = ProductoViewSet.as_view({'get': 'list'})
+        facetas = ProductoViewSet.as_view({'get': 'facetas'})
+
+        def llamar(vista, url, params):
+            respuesta = vista(factory.get(url, params))
+            respuesta.render()
+            assert respuesta.status_code == 200, respuesta.content
+            return respuesta
+
+        consultas_ingenuas = [{'categoria': categoria_id} for categoria_id in categoria_ids]
+        consultas_ingenuas += [{'tipo': tipo.value} for tipo in Tipo_Producto]
+        for indice, desde in enumerate(RANGOS_PRECIO):
+            params = {'precio__gte': desde}
+            if indice + 1 < len(RANGOS_PRECIO):
+                params['precio__lte'] = Decimal(RANGOS_PRECIO[indice + 1]) - Decimal('0.01')
+            consultas_ingenuas.append(params)
+        consultas_ingenuas += [{'stock__gte': 1}, {'stock__lte': 0}]
+
+        def ingenuo():
+            for params in consultas_ingenuas:
+                llamar(listado, URL, {**params, 'page_size': 1})
+
+        casos = {
+            f'ingenuo ({len(consultas_ingenuas)} llamadas)': ingenuo,
+            'facetas (1 llamada)': lambda: llamar(facetas, URL + 'facetas/', {}),
+        }
+        self.stdout.write(f'{"estrategia":<26}{"p50 ms":>10}{"p95 ms":>10}{"consultas":>11}')
+        resultados = {}
+        for nombre, funcion in casos.items():
+            datos = resultados[nombre] = medir(funcion, repeticiones=options['repeticiones'], calentamiento=1)
+            self.stdout.write(
+                f'{nombre:<26}{datos["p50"]:>10.2f}{datos["p95"]:>10.2f}{datos["consultas"]:>11}'
+            )
+
+        ingenuo_p50 = resultados[f'ingenuo ({len(consultas_ingenuas)} llamadas)']['p50']
+        self.stdout.write(f'Aceleración: {ingenuo_p50 / resultados["facetas (1 llamada)"]["p50"]:.1f}x')
+        p95 = resultados['facetas (1 llamada)']['p95']
+        if p95 > options['objetivo_ms']:
+            raise CommandError(f'p95 de /facetas/ {p95:.2f} ms supera el objetivo de {options["objetivo_ms"]} ms.')
+        self.stdout.write(self.style.SUCCESS(
+            f'p95 de /facetas/ {p95:.2f} ms dentro del objetivo ({options["objetivo_ms"]} ms).'
+        ))
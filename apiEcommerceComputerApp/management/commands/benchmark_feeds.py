@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+from apiEcommerceComputerApp import feeds
+from apiEcommerceComputerApp.benchmarks import datos_temporales, medir, sembrar_catalogo
+from apiEcommerceComputerApp.views import ProductoViewSet
+
+URL = '/ecommerce/api/v1/productos/'
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_feeds --productos 200000 --categorias 20
+    Compara /productos/nuevos/ y /productos/mas_vendidos/ (global y por
+    categoría) leyendo el feed materializado contra la consulta ordenada
+    directa, con la cache de respuestas desactivada. También mide la
+    reconstrucción completa de los feeds.
+    Los datos sintéticos se crean en una transacción que se revierte al terminar.
+    """
+    help = 'Benchmark de los feeds materializados de la página de inicio.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=200000)
+        parser.add_argument('--categorias', type=int, default=20)
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with datos_temporales(), override_settings(RESPONSE_CACHE={'ENABLED': False}):
+            categoria_ids = sembrar_catalogo(options['productos'], categorias=options['categorias'])
+            calculados = feeds.reconstruir()
+            self.stdout.write(
+                f'Reconstrucción: {calculados} feeds en {feeds.metricas()["reconstruccion_ms"]:.1f} ms'
+            )
+            self.ejecutar(categoria_ids[0], options)
+            feeds.invalidar()
+
+    def ejecutar(self, categoria_id, options):
+        factory = APIRequestFactory()
+        self.stdout.write(f'{"endpoint":<36}{"modo":<10}{"p50 ms":>10}{"p95 ms":>10}{"consultas":>11}')
+        for accion in ('nuevos', 'mas_vendidos'):
+            vista = ProductoViewSet.as_view({'get': accion})
+            for params in ({}, {'categoria': categoria_id}):
+                def llamar():
+                    respuesta = vista(factory.get(f'{URL}{accion}/', params))
+                    respuesta.render()
+                    assert respuesta.status_code == 200, respuesta.content
+
+                # TAMANO=0 fuerza la consulta ordenada directa
+                for modo, config in (('directo', {'TAMANO': 0}), ('feed', {})):
+                    with override_settings(FEEDS=config):
+                        datos = medir(llamar, repeticiones=options['repeticiones'])
+                    endpoint = f'{accion}/' + (f'?categoria={categoria_id}' if params else '')
+                    self.stdout.write(
+                        f'{endpoint:<36}{modo:<10}{datos["p50"]:>10.2f}{datos["p95"]:>10.2f}{datos["consultas"]:>11}'
+                    )
@@ -0,0 +1,64 @@
+import csv
+import os
+import random
+import tempfile
+from django.core.management.base import BaseCommand
+from apiEcommerceComputerApp.benchmarks import datos_temporales, sembrar_catalogo
+from apiEcommerceComputerApp.importacion import ImportadorProductos, leer_filas
+from apiEcommerceComputerApp.models import Categoria, Tipo_Producto
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_importacion --filas 500000
+    Genera un CSV sintético (con un porcentaje de filas inválidas) y mide la
+    importación en filas por segundo. Los datos se crean en una transacción
+    que se revierte al terminar.
+    """
+    help = 'Mide el throughput (filas/s) de la importación masiva de productos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=500000)
+        parser.add_argument('--categorias', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--invalidas', type=float, default=0.01,
+                            help='Fracción de filas inválidas (por defecto 0.01).')
+
+    def handle(self, *args, **options):
+        with datos_temporales():
+            categoria_ids = sembrar_catalogo(0, categorias=options['categorias'])
+            nombres = list(Categoria.objects.filter(id__in=categoria_ids).values_list('nombre', flat=True))
+            with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as archivo:
+                self.generar_csv(archivo, options['filas'], nombres, options['invalidas'])
+            try:
+                with open(archivo.name, encoding='utf-8', newline='') as entrada:
+                    resultado = ImportadorProductos(batch_size=options['batch_size']).importar(
+                        leer_filas(entrada, 'csv')
+                    )
+            finally:
+                os.unlink(archivo.name)
+
+        self.stdout.write(
+            '{filas} filas: {creados} creados, {total_errores} con errores'.format(**resultado)
+        )
+        self.stdout.write(self.style.SUCCESS(
+            '{duracion_s:.2f}s -> {filas_por_segundo:.0f} filas/s'.format(**resultado)
+        ))
+
+    @staticmethod
+    def generar_csv(archivo, filas, categorias, invalidas, semilla=0):
+        rnd = random.Random(semilla)
+        tipos = [tipo.value for tipo in Tipo_Producto]
+        escritor = csv.writer(archivo)
+        escritor.writerow(['nombre', 'descripcion', 'precio', 'categoria', 'tipo', 'stock'])
+        for i in range(filas):
+            precio = f'{rnd.randint(1000, 500000) / 100:.2f}'
+            if rnd.random() < invalidas:
+                precio = '-1'
+            escritor.writerow([
+                f'Importado {i:07d}',
+                f'Descripción del producto importado {i}',
+                precio,
+                rnd.choice(categorias),
+                rnd.choice(tipos),
+                rnd.randint(0, 50),
+            ])
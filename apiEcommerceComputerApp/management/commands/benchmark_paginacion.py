@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apiEcommerceComputerApp.benchmarks import datos_temporales, medir, sembrar_catalogo
+from apiEcommerceComputerApp.models import Producto
+from apiEcommerceComputerApp.pagination import KeysetPagination
+from apiEcommerceComputerApp.views import ProductoViewSet
+
+URL = '/ecommerce/api/v1/productos/'
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_paginacion --sembrar 10000 --pagina 500
+    Compara la latencia de la página 1 y la página N del catálogo con
+    paginación por número de página (OFFSET + COUNT) y por cursor (keyset).
+    Con --sembrar los productos sintéticos se crean en una transacción que
+    se revierte al terminar.
+    """
+    help = 'Benchmark de paginación por página vs. por cursor en /productos/.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sembrar', type=int, default=0,
+                            help='Productos sintéticos a crear temporalmente (0 = usar los datos actuales).')
+        parser.add_argument('--pagina', type=int, default=500,
+                            help='Página profunda a medir (por defecto 500).')
+        parser.add_argument('--page-size', type=int, default=12)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--ordering', default='-created_at',
+                            help='Valor de ?ordering= a medir (por defecto -created_at).')
+
+    def handle(self, *args, **options):
+        with datos_temporales():
+            if options['sembrar']:
+                sembrar_catalogo(options['sembrar'])
+            self.ejecutar(options)
+
+    def ejecutar(self, options):
+        page_size, pagina = options['page_size'], options['pagina']
+        if Producto.objects.count() < page_size * pagina:
+            raise CommandError(
+                f'Se necesitan al menos {page_size * pagina} productos para medir la página {pagina}.'
+            )
+
+        vista = ProductoViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        base = {'page_size': page_size, 'ordering': options['ordering']}
+
+        def request(params):
+            def llamar():
+                respuesta = vista(factory.get(URL, {**base, **params}))
+                respuesta.render()
+                assert respuesta.status_code == 200, respuesta.content
+            return llamar
+
+        casos = [
+            ('pagina', 1, {'page': 1}),
+            ('pagina', pagina, {'page': pagina}),
+            ('cursor', 1, {'paginacion': 'cursor'}),
+            ('cursor', pagina, {'cursor': self.cursor_para_pagina(factory, base, pagina)}),
+        ]
+
+        self.stdout.write(f'{"modo":<8}{"página":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"consultas":>11}')
+        for modo, numero, params in casos:
+            datos = medir(request(params), repeticiones=options['repeticiones'])
+            self.stdout.write(
+                f'{modo:<8}{numero:>8}{datos["p50"]:>10.2f}{datos["p95"]:>10.2f}'
+                f'{datos["p99"]:>10.2f}{datos["consultas"]:>11}'
+            )
+
+    def cursor_para_pagina(self, factory, base, pagina):
+        """
+        Genera directamente el cursor que apunta a la página `pagina`
+        (la última fila de la página anterior), sin recorrer las anteriores.
+        """
+        paginator = KeysetPagination()
+        request = Request(factory.get(URL, base))
+        paginator.request = request
+        paginator.page_size = paginator.get_page_size(request)
+
+        vista = ProductoViewSet(request=request, action='list', format_kwarg=None)
+        queryset = vista.filter_queryset(vista.get_queryset())
+        paginator.orden = paginator.get_ordering(queryset)
+        paginator.modelo = queryset.model
+        anterior = queryset.order_by(*paginator.orden)[paginator.page_size * (pagina - 1) - 1]
+        return paginator.encode_cursor(anterior)
@@ -0,0 +1,65 @@
+import random
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apiEcommerceComputerApp.benchmarks import datos_temporales, medir, sembrar_catalogo
+from apiEcommerceComputerApp.models import Order, OrderItem, Producto, Usuario
+from apiEcommerceComputerApp.pedidos import crear_pedido
+from apiEcommerceComputerApp.reservas import StockInsuficiente
+from apiEcommerceComputerApp.rollups import registrar_venta
+
+
+def pedido_por_linea(usuario, lineas):
+    """
+    Referencia: una lectura, un guardado de stock, un INSERT y un UPDATE de
+    ventas por cada línea.
+    """
+    with transaction.atomic():
+        pedido = Order.objects.create(usuario=usuario, total=Decimal('0'))
+        for producto_id, cantidad in lineas:
+            producto = Producto.objects.select_for_update().get(pk=producto_id)
+            if producto.stock < cantidad:
+                raise StockInsuficiente([])
+            producto.stock -= cantidad
+            producto.save(update_fields=['stock'])
+            OrderItem.objects.create(order=pedido, producto=producto, cantidad=cantidad, precio_unitario=producto.precio)
+            registrar_venta(producto_id, cantidad)
+            pedido.total += producto.precio * cantidad
+        pedido.save(update_fields=['total'])
+    return pedido
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_pedidos --productos 50000 --lineas 10 --repeticiones 200
+    Mide pedidos por segundo creando pedidos de N líneas con
+    pedidos.crear_pedido (sentencias por lotes) contra la versión línea por
+    línea. Los datos sintéticos se crean en una transacción que se revierte
+    al terminar.
+    """
+    help = 'Benchmark de creación de pedidos (pedidos/s).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=50000)
+        parser.add_argument('--lineas', type=int, default=10)
+        parser.add_argument('--repeticiones', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with datos_temporales():
+            sembrar_catalogo(options['productos'])
+            Producto.objects.update(stock=10 ** 6)
+            producto_ids = list(Producto.objects.values_list('id', flat=True))
+            usuario = Usuario.objects.create_user(
+                email='benchmark-pedidos@example.com', password=None, nombre='Benchmark', apellido='Pedidos'
+            )
+            rnd = random.Random(0)
+
+            def lineas():
+                return [(producto_id, rnd.randint(1, 3)) for producto_id in rnd.sample(producto_ids, options['lineas'])]
+
+            self.stdout.write(f'{"modo":<12}{"pedidos/s":>12}{"p50 ms":>10}{"p95 ms":>10}{"consultas":>11}')
+            for modo, crear in (('por_linea', pedido_por_linea), ('por_lotes', crear_pedido)):
+                datos = medir(lambda: crear(usuario, lineas()), repeticiones=options['repeticiones'])
+                por_segundo = 1000 / datos['media'] if datos['media'] else 0.0
+                self.stdout.write(
+                    f'{modo:<12}{por_segundo:>12.1f}{datos["p50"]:>10.2f}{datos["p95"]:>10.2f}{datos["consultas"]:>11}'
+                )
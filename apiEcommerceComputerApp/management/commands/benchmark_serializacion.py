@@ -0,0 +1,63 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apiEcommerceComputerApp.benchmarks import datos_temporales, sembrar_catalogo
+from apiEcommerceComputerApp.models import Producto
+from apiEcommerceComputerApp.serializacion import SerializadorRapido
+from apiEcommerceComputerApp.serializers import ProductoListSerializer
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py benchmark_serializacion --filas 10000
+    Compara serializaciones por segundo de ProductoListSerializer (DRF) y
+    SerializadorRapido sobre las mismas filas, y verifica que el JSON sea
+    idéntico. Los productos sintéticos se crean en una transacción que se
+    revierte al terminar.
+    """
+    help = 'Microbenchmark de ProductoListSerializer vs. SerializadorRapido.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=10000)
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with datos_temporales():
+            sembrar_catalogo(options['filas'])
+            self.ejecutar(options)
+
+    def ejecutar(self, options):
+        contexto = {'request': Request(APIRequestFactory().get('/ecommerce/api/v1/productos/'))}
+        queryset = ProductoListSerializer.optimizar_queryset(Producto.objects.order_by('id'))
+        queryset = queryset[:options['filas']]
+
+        # Las filas se cargan antes de medir: solo se mide la serialización
+        instancias = list(queryset)
+        rapido = SerializadorRapido(ProductoListSerializer, contexto)
+        filas = list(rapido.filas(queryset))
+
+        def drf():
+            return ProductoListSerializer(instancias, many=True, context=contexto).data
+
+        def compilado():
+            return SerializadorRapido(ProductoListSerializer, contexto).serializar(filas)
+
+        if JSONRenderer().render(drf()) != JSONRenderer().render(compilado()):
+            raise CommandError('La salida de SerializadorRapido difiere de ProductoListSerializer.')
+
+        self.stdout.write(f'{"serializer":<22}{"filas/s":>12}{"ms/pasada":>12}')
+        resultados = {}
+        for nombre, funcion in (('ProductoListSerializer', drf), ('SerializadorRapido', compilado)):
+            mejor = min(self.cronometrar(funcion) for _ in range(options['repeticiones']))
+            resultados[nombre] = len(filas) / mejor
+            self.stdout.write(f'{nombre:<22}{resultados[nombre]:>12.0f}{mejor * 1000:>12.1f}')
+        self.stdout.write(self.style.SUCCESS(
+            'Aceleración: {:.1f}x'.format(resultados['SerializadorRapido'] / resultados['ProductoListSerializer'])
+        ))
+
+    @staticmethod
+    def cronometrar(funcion):
+        inicio = time.perf_counter()
+        funcion()
+        return time.perf_counter() - inicio
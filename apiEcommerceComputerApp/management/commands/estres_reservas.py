@@ -0,0 +1,66 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from apiEcommerceComputerApp.benchmarks import estresar_reservas
+from apiEcommerceComputerApp.models import Categoria, Producto, ReservaStock
+from apiEcommerceComputerApp.rollups import ajustar_conteo_categoria
+
+PREFIJO = 'estres-reservas'
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py estres_reservas --hilos 8 --intentos 200 --productos 5 --stock 500
+    Prueba de estrés de reservas.reservar: varios hilos compiten por el stock
+    de pocos productos. Verifica que no haya sobreventa (stock final =
+    inicial - unidades retenidas, nunca negativo) y reporta reservas/s.
+    Como cada hilo usa su propia conexión, los datos se confirman en la base
+    y se borran al terminar. En SQLite la base bloquea todo el archivo y los
+    hilos se serializan; la cifra representativa es la de MySQL.
+    """
+    help = 'Prueba de estrés concurrente de las reservas de stock.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--intentos', type=int, default=200, help='Reservas por hilo.')
+        parser.add_argument('--productos', type=int, default=5)
+        parser.add_argument('--stock', type=int, default=500, help='Stock inicial de cada producto.')
+
+    def handle(self, *args, **options):
+        categoria = Categoria.objects.create(nombre=f'{PREFIJO}-{Producto.objects.count()}')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'{PREFIJO} {i}', descripcion='', precio=Decimal('10.00'),
+                     categoria=categoria, stock=options['stock'])
+            for i in range(options['productos'])
+        ])
+        # bulk_create no envía señales; las bajas del final sí descuentan
+        ajustar_conteo_categoria(categoria.pk, len(productos))
+        # MySQL no retorna los pk desde bulk_create
+        producto_ids = list(Producto.objects.filter(categoria=categoria).values_list('id', flat=True))
+        try:
+            resultado = estresar_reservas(producto_ids, hilos=options['hilos'], intentos=options['intentos'])
+            self.reportar(resultado, producto_ids, options['stock'])
+        finally:
+            ReservaStock.objects.filter(items__producto_id__in=producto_ids).delete()
+            Producto.objects.filter(pk__in=producto_ids).delete()
+            categoria.delete()
+
+    def reportar(self, resultado, producto_ids, stock_inicial):
+        self.stdout.write(
+            '{reservas} reservas ({confirmadas} confirmadas, {liberadas} liberadas), '
+            '{rechazadas} rechazadas por stock, {errores} errores de base de datos'.format(**resultado)
+        )
+        self.stdout.write(f'{resultado["reservas_por_segundo"]} reservas/s en {resultado["duracion_s"]}s')
+
+        finales = dict(Producto.objects.filter(pk__in=producto_ids).values_list('id', 'stock'))
+        descuadres = [
+            producto_id for producto_id in producto_ids
+            if finales[producto_id] < 0
+            or finales[producto_id] != stock_inicial - resultado['retenido'].get(producto_id, 0)
+        ]
+        vendidas = sum(stock_inicial - stock for stock in finales.values())
+        self.stdout.write(
+            f'Unidades retenidas: {vendidas} de {stock_inicial * len(producto_ids)}; '
+            f'stock mínimo final: {min(finales.values())}'
+        )
+        if descuadres:
+            raise CommandError(f'Sobreventa o descuadre de stock en los productos {descuadres}')
+        self.stdout.write(self.style.SUCCESS('Sin sobreventa: el stock cuadra con las reservas.'))
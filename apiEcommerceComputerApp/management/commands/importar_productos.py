@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from apiEcommerceComputerApp.importacion import FORMATOS, ImportadorProductos, formato_desde_nombre, leer_filas
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py importar_productos productos.csv [--formato ndjson] [--batch-size 2000]
+    Importa productos en bloque desde CSV o NDJSON. Las filas con id
+    actualizan el producto existente; las demás se crean.
+    """
+    help = 'Importa productos en bloque desde un archivo CSV o NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--formato', choices=FORMATOS,
+                            help='Por defecto se deduce de la extensión del archivo.')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Filas por lote/transacción (por defecto 2000).')
+        parser.add_argument('--limite', type=int, default=20,
+                            help='Cantidad máxima de errores a mostrar.')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or formato_desde_nombre(options['archivo'])
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as archivo:
+                resultado = ImportadorProductos(batch_size=options['batch_size']).importar(
+                    leer_filas(archivo, formato)
+                )
+        except OSError as error:
+            raise CommandError(f'No se pudo abrir el archivo: {error}')
+
+        for error in resultado['errores'][:options['limite']]:
+            self.stdout.write(f'Fila {error["fila"]}: {error["errores"]}')
+        self.stdout.write(self.style.SUCCESS(
+            '{filas} filas: {creados} creados, {actualizados} actualizados, '
+            '{total_errores} con errores en {duracion_s:.2f}s ({filas_por_segundo:.0f} filas/s)'.format(**resultado)
+        ))
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from apiEcommerceComputerApp.reservas import liberar_vencidas
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py liberar_reservas_vencidas [--chunk-size 500]
+    Vence las reservas de stock activas cuyo TTL pasó y devuelve sus
+    unidades al stock. Pensado para ejecutarse cada minuto (cron).
+    """
+    help = 'Vence las reservas de stock expiradas y devuelve su stock, por bloques.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Reservas por bloque/transacción (por defecto 500).')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        vencidas = liberar_vencidas(chunk_size=options['chunk_size'])
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f'{vencidas} reservas vencidas en {duracion:.2f}s'))
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from apiEcommerceComputerApp.lista_negra import purgar_vencidos
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py purgar_tokens [--chunk-size 5000]
+    Borra los refresh tokens vencidos de token_blacklist (outstanding y
+    blacklisted), que crecen con cada login y logout. Un token vencido ya
+    no se acepta, así que no hace falta conservarlo en la lista negra.
+    Pensado para ejecutarse a diario (cron).
+    """
+    help = 'Borra por bloques los tokens JWT vencidos de la lista negra.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Tokens por bloque/transacción (por defecto 5000).')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        outstanding, blacklisted = purgar_vencidos(chunk_size=options['chunk_size'])
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{outstanding} tokens vencidos borrados ({blacklisted} en lista negra) en {duracion:.2f}s'
+        ))
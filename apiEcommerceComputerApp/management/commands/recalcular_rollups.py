@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from apiEcommerceComputerApp.rollups import recalcular_conteo_categorias, recalcular_rollups
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py recalcular_rollups [--chunk-size 1000]
+    Reconstruye cantidad_vendida, rating y total_reviews de todos los productos
+    y cantidad_productos de todas las categorías.
+    """
+    help = 'Reconstruye en bloque los rollups de Producto y el contador de productos de Categoria.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Productos por bloque/transacción (por defecto 1000).')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        procesados = recalcular_rollups(chunk_size=options['chunk_size'])
+        categorias = recalcular_conteo_categorias()
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{procesados} productos y {categorias} categorías recalculados en {duracion:.2f}s'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from apiEcommerceComputerApp import feeds, metricas
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py reconstruir_feeds [--feed nuevos]
+    Recalcula los feeds materializados de la página de inicio (global y por
+    categoría). Pensado para ejecutarse periódicamente (cron), como respaldo
+    de las actualizaciones incrementales.
+    """
+    help = 'Reconstruye los feeds de nuevos y más vendidos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--feed', action='append', choices=list(feeds.FEEDS),
+                            help='Feed a reconstruir (se puede repetir; por defecto todos).')
+
+    def handle(self, *args, **options):
+        calculados = feeds.reconstruir(options['feed'])
+        # feed_refresh_seconds: este proceso termina antes del próximo volcado periódico
+        metricas.volcar()
+        datos = feeds.metricas()
+        self.stdout.write(self.style.SUCCESS(
+            f'{calculados} feeds recalculados en {datos["reconstruccion_ms"]:.1f} ms'
+        ))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from apiEcommerceComputerApp.rollups import (
+    recalcular_conteo_categorias, recalcular_productos, verificar_conteo_categorias, verificar_rollups,
+)
+
+class Command(BaseCommand):
+    """
+    Uso: python manage.py verificar_rollups [--limite 20] [--corregir]
+    Compara los rollups guardados (productos y categorías) contra los agregados reales.
+    Termina con error si encuentra diferencias, salvo con --corregir, que
+    recalcula solo los productos y categorías con diferencias.
+    """
+    help = 'Verifica que los rollups de Producto y Categoria coincidan con los agregados reales.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=20,
+                            help='Cantidad máxima de diferencias a mostrar.')
+        parser.add_argument('--corregir', action='store_true',
+                            help='Recalcula los productos y categorías con diferencias.')
+
+    def handle(self, *args, **options):
+        diferencias = verificar_rollups() + verificar_conteo_categorias()
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('Rollups consistentes.'))
+            return
+
+        for diferencia in diferencias[:options['limite']]:
+            self.stdout.write(
+                '{modelo} {id}: {campo} guardado={guardado} real={real}'.format(**diferencia)
+            )
+        if options['corregir']:
+            productos = recalcular_productos(
+                {diferencia['id'] for diferencia in diferencias if diferencia['modelo'] == 'producto'}
+            )
+            categorias = recalcular_conteo_categorias() if any(
+                diferencia['modelo'] == 'categoria' for diferencia in diferencias
+            ) else 0
+            self.stdout.write(self.style.SUCCESS(
+                f'{productos} productos y {categorias} categorías recalculados.'
+            ))
+            return
+        raise CommandError(
+            f'{len(diferencias)} diferencias encontradas. '
+            'Ejecuta "python manage.py recalcular_rollups" o "verificar_rollups --corregir" para corregirlas.'
+        )
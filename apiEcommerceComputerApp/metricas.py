@@ -0,0 +1,389 @@
+"""
+Registro de métricas (contadores, gauges e histogramas de buckets fijos)
+expuesto en formato de texto de Prometheus en /metrics, sin servicios
+externos.
+
+Los valores viven en memoria del proceso, protegidos por un lock. Con
+varios workers (gunicorn) cada proceso solo ve sus propios requests; con
+METRICAS['DIRECTORIO'] cada proceso vuelca periódicamente sus valores a
+`<directorio>/metricas-<pid>.json` (escritura atómica con os.replace) y el
+worker que atiende /metrics suma los archivos de todos:
+  - contadores e histogramas se suman, también los de procesos ya
+    terminados (los contadores son acumulados);
+  - gauges con multiproceso='suma' se suman solo para procesos vivos;
+  - gauges con multiproceso='local' se calculan al exponer y no se guardan.
+Cada volcado se escribe en un temporal propio y se publica con os.replace
+bajo un lock, así los hilos del proceso no mezclan escrituras ni publican
+una copia más vieja sobre una más nueva. El directorio debe vaciarse al
+reiniciar el servicio (como PROMETHEUS_MULTIPROC_DIR de prometheus_client).
+"""
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import weakref
+from django.conf import settings
+from .instrumentacion import BUCKETS_MS
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Directorio compartido entre workers; None = solo este proceso
+    'DIRECTORIO': None,
+    # Segundos mínimos entre volcados al directorio
+    'INTERVALO_S': 5,
+    # Si se define, /metrics exige "Authorization: Bearer <TOKEN>"
+    'TOKEN': None,
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'METRICAS', {})}
+
+# ===== Almacén de valores =====
+
+class Almacen:
+    """
+    valores: {(nombre, etiquetas): número} para contadores y gauges y
+    {(nombre, etiquetas): [buckets..., suma, cuenta]} para histogramas,
+    donde `etiquetas` es una tupla de pares (etiqueta, valor).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Serializa los volcados (sin frenar a sumar/observar mientras se escribe)
+        self.lock_volcado = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self.lock:
+            self.pid = os.getpid()
+            self.valores = {}
+            self.ultimo_volcado = 0.0
+
+    def _verificar_proceso(self):
+        # Tras un fork (gunicorn --preload) el hijo empieza de cero
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.valores = {}
+            self.ultimo_volcado = 0.0
+
+    def sumar(self, clave, cantidad):
+        with self.lock:
+            self._verificar_proceso()
+            self.valores[clave] = self.valores.get(clave, 0) + cantidad
+        self.volcar_si_corresponde()
+
+    def fijar(self, clave, valor):
+        with self.lock:
+            self._verificar_proceso()
+            self.valores[clave] = valor
+
+    def observar(self, clave, indice, valor, cantidad_buckets):
+        with self.lock:
+            self._verificar_proceso()
+            datos = self.valores.get(clave)
+            if datos is None:
+                datos = self.valores[clave] = [0] * cantidad_buckets + [0.0, 0]
+            datos[indice] += 1
+            datos[-2] += valor
+            datos[-1] += 1
+        self.volcar_si_corresponde()
+
+    def copia(self):
+        with self.lock:
+            self._verificar_proceso()
+            return {clave: list(valor) if isinstance(valor, list) else valor for clave, valor in self.valores.items()}
+
+    # ----- Multiproceso -----
+
+    def volcar_si_corresponde(self):
+        config = get_config()
+        if not config['DIRECTORIO']:
+            return
+        with self.lock:
+            ahora = time.monotonic()
+            if ahora - self.ultimo_volcado < config['INTERVALO_S']:
+                return
+            # Solo el hilo que cambia ultimo_volcado vuelca
+            self.ultimo_volcado = ahora
+        self.volcar(config['DIRECTORIO'])
+
+    def volcar(self, directorio):
+        with self.lock_volcado:
+            with self.lock:
+                self.ultimo_volcado = time.monotonic()
+            actualizar_conexiones()
+            filas = [
+                [nombre, list(etiquetas), valor]
+                for (nombre, etiquetas), valor in self.copia().items()
+                if nombre not in _gauges_locales()
+            ]
+            pid = os.getpid()
+            with tempfile.NamedTemporaryFile(
+                'w', dir=directorio, prefix=f'metricas-{pid}-', suffix='.tmp', delete=False,
+            ) as archivo:
+                json.dump(filas, archivo)
+            try:
+                os.replace(archivo.name, os.path.join(directorio, f'metricas-{pid}.json'))
+            except OSError:
+                os.unlink(archivo.name)
+                raise
+
+
+_almacen = Almacen()
+
+
+def volcar():
+    """
+    Vuelca ya los valores de este proceso a DIRECTORIO (si hay): para
+    procesos de vida corta, como los comandos de cron.
+    """
+    directorio = get_config()['DIRECTORIO']
+    if directorio:
+        _almacen.volcar(directorio)
+
+
+def proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def valores_agregados():
+    """
+    Valores de este proceso más, con DIRECTORIO, los volcados de los demás.
+    """
+    propios = _almacen.copia()
+    directorio = get_config()['DIRECTORIO']
+    if not directorio:
+        return propios
+
+    _almacen.volcar(directorio)
+    total = {}
+    for ruta in glob.glob(os.path.join(directorio, 'metricas-*.json')):
+        pid = int(os.path.basename(ruta)[len('metricas-'):-len('.json')])
+        vivo = proceso_vivo(pid)
+        try:
+            with open(ruta) as archivo:
+                filas = json.load(archivo)
+        except (OSError, ValueError):
+            continue
+        for nombre, etiquetas, valor in filas:
+            metrica = REGISTRO.get(nombre)
+            if metrica is None or (metrica.tipo == 'gauge' and not vivo):
+                continue
+            clave = (nombre, tuple(tuple(par) for par in etiquetas))
+            if isinstance(valor, list):
+                anterior = total.get(clave)
+                total[clave] = valor if anterior is None else [a + b for a, b in zip(anterior, valor)]
+            else:
+                total[clave] = total.get(clave, 0) + valor
+    # Gauges locales: solo los de este proceso
+    total.update({clave: valor for clave, valor in propios.items() if clave[0] in _gauges_locales()})
+    return total
+
+# ===== Tipos de métrica =====
+
+REGISTRO = {}
+
+
+def _gauges_locales():
+    return {
+        nombre for nombre, metrica in REGISTRO.items()
+        if metrica.tipo == 'gauge' and metrica.multiproceso == 'local'
+    }
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        REGISTRO[nombre] = self
+
+    def clave(self, valores):
+        if set(valores) != set(self.etiquetas):
+            raise ValueError(f'{self.nombre} espera las etiquetas {self.etiquetas}')
+        return (self.nombre, tuple((etiqueta, str(valores[etiqueta])) for etiqueta in self.etiquetas))
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def inc(self, cantidad=1, **etiquetas):
+        _almacen.sumar(self.clave(etiquetas), cantidad)
+
+
+class Gauge(Metrica):
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), multiproceso='suma'):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.multiproceso = multiproceso
+
+    def inc(self, cantidad=1, **etiquetas):
+        _almacen.sumar(self.clave(etiquetas), cantidad)
+
+    def dec(self, cantidad=1, **etiquetas):
+        _almacen.sumar(self.clave(etiquetas), -cantidad)
+
+    def set(self, valor, **etiquetas):
+        _almacen.fijar(self.clave(etiquetas), valor)
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor, **etiquetas):
+        indice = next((i for i, limite in enumerate(self.buckets) if valor <= limite), len(self.buckets))
+        _almacen.observar(self.clave(etiquetas), indice, valor, len(self.buckets) + 1)
+
+# ===== Métricas de la API =====
+
+BUCKETS_SEGUNDOS = tuple(limite / 1000 for limite in BUCKETS_MS)
+
+REQUESTS = Contador(
+    'http_requests_total', 'Requests atendidos por vista, método y clase de estado.',
+    ('vista', 'metodo', 'estado'),
+)
+ERRORES = Contador(
+    'http_request_errors_total', 'Respuestas 4xx/5xx por vista y código.',
+    ('vista', 'codigo'),
+)
+LATENCIA = Histograma(
+    'http_request_duration_seconds', 'Duración de los requests por vista.',
+    ('vista',), BUCKETS_SEGUNDOS,
+)
+EN_CURSO = Gauge('http_requests_in_progress', 'Requests en curso.')
+CONSULTAS = Contador('db_queries_total', 'Consultas SQL por vista.', ('vista',))
+TIEMPO_DB = Contador('db_query_seconds_total', 'Tiempo en la base de datos por vista.', ('vista',))
+CONEXIONES_ABIERTAS = Contador(
+    'db_connections_opened_total', 'Conexiones abiertas por Django (con pool, préstamos del pool).', ('alias',),
+)
+CONEXIONES_RETENIDAS = Gauge(
+    'db_connections_held', 'Conexiones abiertas de los DatabaseWrapper vivos del proceso (sin las libres del pool).',
+    ('alias',),
+)
+CACHE_RESPUESTAS = Contador(
+    'response_cache_requests_total', 'Lecturas de la cache de respuestas por endpoint.',
+    ('endpoint', 'resultado'),
+)
+EDAD_FEEDS = Gauge(
+    'feed_age_seconds', 'Segundos desde el último cálculo completo de cada feed global.',
+    ('feed',), multiproceso='local',
+)
+
+REFRESCO_FEEDS = Histograma(
+    'feed_refresh_seconds', 'Duración del cálculo de los feeds: completo (reconstruir) o de un ámbito.',
+    ('feed', 'tipo'), BUCKETS_SEGUNDOS,
+)
+
+# DatabaseWrapper de cualquier hilo; los de hilos terminados salen al liberarse
+_conexiones = weakref.WeakSet()
+_conexiones_lock = threading.Lock()
+
+
+def registrar_request(vista, metodo, estado, total_ms, medicion):
+    REQUESTS.inc(vista=vista, metodo=metodo, estado=f'{estado // 100}xx')
+    if estado >= 400:
+        ERRORES.inc(vista=vista, codigo=estado)
+    LATENCIA.observe(total_ms / 1000, vista=vista)
+    CONSULTAS.inc(medicion.consultas, vista=vista)
+    TIEMPO_DB.inc(medicion.db_ms / 1000, vista=vista)
+
+
+def registrar_conexion(wrapper):
+    """
+    Desde connection_created: sigue el DatabaseWrapper (de cualquier hilo)
+    para contar sus conexiones abiertas al volcar o exponer.
+    """
+    with _conexiones_lock:
+        _conexiones.add(wrapper)
+
+
+def actualizar_conexiones():
+    """
+    Fija db_connections_held con las conexiones abiertas ahora. Bajo ASGI
+    cada vista síncrona corre en un hilo propio: la conexión de un hilo
+    terminado cuenta hasta que el recolector libera su DatabaseWrapper (y
+    la cierra).
+    """
+    with _conexiones_lock:
+        wrappers = list(_conexiones)
+    abiertas = {alias: 0 for alias in settings.DATABASES}
+    for wrapper in wrappers:
+        if wrapper.connection is not None:
+            abiertas[wrapper.alias] = abiertas.get(wrapper.alias, 0) + 1
+    for alias, cantidad in abiertas.items():
+        CONEXIONES_RETENIDAS.set(cantidad, alias=alias)
+
+
+def actualizar_gauges_locales():
+    from . import feeds
+    for nombre, edad in feeds.metricas()['edad_s'].items():
+        if edad is not None:
+            EDAD_FEEDS.set(edad, feed=nombre)
+
+# ===== Exposición =====
+
+def _escapar(valor):
+    return str(valor).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _etiquetas(pares):
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{etiqueta}="{_escapar(valor)}"' for etiqueta, valor in pares) + '}'
+
+
+def _numero(valor):
+    if valor == math.inf:
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exponer():
+    """
+    Texto en formato de exposición de Prometheus (versión 0.0.4).
+    """
+    actualizar_gauges_locales()
+    actualizar_conexiones()
+    valores = valores_agregados()
+    por_metrica = {}
+    for (nombre, etiquetas), valor in valores.items():
+        por_metrica.setdefault(nombre, []).append((etiquetas, valor))
+
+    lineas = []
+    for nombre, metrica in REGISTRO.items():
+        lineas.append(f'# HELP {nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {nombre} {metrica.tipo}')
+        for etiquetas, valor in sorted(por_metrica.get(nombre, [])):
+            if metrica.tipo != 'histogram':
+                lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+                continue
+            acumulado = 0
+            for limite, cantidad in zip([*metrica.buckets, math.inf], valor[:-2]):
+                acumulado += cantidad
+                lineas.append(f'{nombre}_bucket{_etiquetas([*etiquetas, ("le", _numero(limite))])} {acumulado}')
+            lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(valor[-2])}')
+            lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {valor[-1]}')
+    return '\n'.join(lineas) + '\n'
+
+
+def reiniciar():
+    _almacen.reiniciar()
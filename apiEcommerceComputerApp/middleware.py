@@ -1,12 +1,118 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import Http404
 from django.urls import reverse
+from . import instrumentacion, metricas
+
+class MiddlewareSyncAsync:
+    """
+    Base para middlewares que funcionan con WSGI y ASGI: bajo ASGI, con
+    get_response async, __call__ delega en __acall__ y la cadena no pasa
+    por hilos (las vistas async del catálogo corren en el event loop).
+    """
+    sync_capable = True
+    async_capable = True
 
-class RestrictAdminMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.procesar(request)
+
+class RestrictAdminMiddleware(MiddlewareSyncAsync):
+    def procesar(self, request):
         if request.path.startswith(reverse('admin:index')):
             if not request.user.is_authenticated or not request.user.is_superuser:
                 raise Http404 # 🔥 Devuelve un 404 en lugar de la página de login
-        return self.get_response(request)
\ No newline at end of file
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path.startswith(reverse('admin:index')):
+            usuario = await request.auser()
+            if not usuario.is_authenticated or not usuario.is_superuser:
+                raise Http404
+        return await self.get_response(request)
+
+class InstrumentacionMiddleware(MiddlewareSyncAsync):
+    """
+    Mide cada request (consultas, tiempo de base de datos, serialización,
+    render y total) por vista y acción; ver instrumentacion.py.
+    Debe ir primero en MIDDLEWARE para incluir al resto en el tiempo total.
+    Con METRICAS['ENABLED'] también alimenta el registro de /metrics
+    (metricas.py).
+    """
+    def procesar(self, request):
+        config = instrumentacion.get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        exportar = self.iniciar()
+        inicio = time.perf_counter()
+        try:
+            with instrumentacion.instrumentar(request, config) as medicion:
+                response = self.get_response(request)
+        finally:
+            self.terminar(exportar)
+        return self.registrar(request, response, medicion, inicio, config, exportar)
+
+    async def __acall__(self, request):
+        config = instrumentacion.get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        exportar = self.iniciar()
+        inicio = time.perf_counter()
+        try:
+            with instrumentacion.instrumentar(request, config) as medicion:
+                response = await self.get_response(request)
+        finally:
+            self.terminar(exportar)
+        return self.registrar(request, response, medicion, inicio, config, exportar)
+
+    @staticmethod
+    def iniciar():
+        exportar = metricas.get_config()['ENABLED']
+        if exportar:
+            metricas.EN_CURSO.inc()
+        return exportar
+
+    @staticmethod
+    def terminar(exportar):
+        if exportar:
+            metricas.EN_CURSO.dec()
+
+    def registrar(self, request, response, medicion, inicio, config, exportar):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        vista = instrumentacion.nombre_vista(request)
+        lento = config['UMBRAL_LENTO_MS'] is not None and total_ms >= config['UMBRAL_LENTO_MS']
+        instrumentacion.registrar(vista, medicion, total_ms, lento)
+        if exportar:
+            metricas.registrar_request(vista, request.method, response.status_code, total_ms, medicion)
+        if lento:
+            instrumentacion.logger.warning(
+                'Request lento (%.1f ms, %d consultas, %.1f ms en base de datos): %s %s',
+                total_ms, medicion.consultas, medicion.db_ms, vista, request.get_full_path()
+            )
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = instrumentacion.server_timing(medicion, total_ms)
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Las respuestas de DRF se renderizan después de la vista: el tiempo
+        del render (JSON) se mide con un callback posterior.
+        """
+        medicion = instrumentacion.medicion_actual()
+        if medicion is not None:
+            inicio = time.perf_counter()
+
+            def fin_render(respuesta):
+                medicion.fases['render'] += (time.perf_counter() - inicio) * 1000
+
+            response.add_post_render_callback(fin_render)
+        return response
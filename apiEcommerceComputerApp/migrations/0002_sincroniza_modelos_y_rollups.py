@@ -0,0 +1,97 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiEcommerceComputerApp', '0001_initial'),
+    ]
+
+    operations = [
+        # ===== Categoria =====
+        migrations.AddField(
+            model_name='categoria',
+            name='imagen',
+            field=models.ImageField(blank=True, null=True, upload_to='categorias/'),
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        # ===== Producto =====
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_tipo_9a364b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_cantida_fc4f36_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_fecha_c_2b84a0_idx',
+        ),
+        migrations.RenameField(
+            model_name='producto',
+            old_name='imagen',
+            new_name='imagen_principal',
+        ),
+        migrations.RenameField(
+            model_name='producto',
+            old_name='fecha_creacion',
+            new_name='created_at',
+        ),
+        migrations.RenameField(
+            model_name='producto',
+            old_name='fecha_actualizacion',
+            new_name='updated_at',
+        ),
+        migrations.AlterModelOptions(
+            name='producto',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Producto', 'verbose_name_plural': 'Productos'},
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='tipo',
+            field=models.CharField(choices=[('portatil', 'Portátil'), ('escritorio', 'Escritorio'), ('tablet', 'Tablet'), ('componente', 'Componente'), ('accesorio', 'Accesorio')], max_length=20),
+        ),
+        # Columnas del rollup de valoraciones (ver rollups.py)
+        migrations.AddField(
+            model_name='producto',
+            name='rating',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='total_reviews',
+            field=models.IntegerField(default=0),
+        ),
+        # ===== ImagenProducto =====
+        migrations.AlterUniqueTogether(
+            name='imagenproducto',
+            unique_together=set(),
+        ),
+        migrations.AlterModelOptions(
+            name='imagenproducto',
+            options={'ordering': ['orden'], 'verbose_name': 'Imagen del Producto', 'verbose_name_plural': 'Imágenes de Productos'},
+        ),
+        migrations.AlterField(
+            model_name='imagenproducto',
+            name='imagen',
+            field=models.ImageField(upload_to='productos/imagenes/'),
+        ),
+        migrations.AlterField(
+            model_name='imagenproducto',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imagenes', to='apiEcommerceComputerApp.producto'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiEcommerceComputerApp', '0002_sincroniza_modelos_y_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria', 'precio'], name='producto_categor_8e8bf2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['tipo', 'precio'], name='producto_tipo_f0f6af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['precio'], name='producto_precio_e7989f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['stock'], name='producto_stock_f1f011_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['nombre'], name='producto_nombre_38c699_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['-created_at'], name='producto_created_4c03ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria', '-created_at'], name='producto_categor_2af7fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['-cantidad_vendida', '-rating'], name='producto_cantida_88d793_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria', '-cantidad_vendida', '-rating'], name='producto_categor_563757_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def poblar_contador(apps, schema_editor):
+    """
+    Inicializa cantidad_productos con un único UPDATE ... SET = (subquery).
+    """
+    Categoria = apps.get_model('apiEcommerceComputerApp', 'Categoria')
+    Producto = apps.get_model('apiEcommerceComputerApp', 'Producto')
+    conteo = (
+        Producto.objects.filter(categoria=OuterRef('pk'))
+        .order_by().values('categoria').annotate(total=Count('id')).values('total')[:1]
+    )
+    Categoria.objects.update(cantidad_productos=Coalesce(Subquery(conteo), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiEcommerceComputerApp', '0003_indices_catalogo_producto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='cantidad_productos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(poblar_contador, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:10
+
+from django.db import migrations
+
+INDICE = 'producto_busqueda_ft'
+
+
+def crear_indice_fulltext(apps, schema_editor):
+    """
+    Índice FULLTEXT para la búsqueda de productos. Solo MySQL: en otras
+    bases se usa busqueda.IndiceInvertido.
+    """
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        f'ALTER TABLE producto ADD FULLTEXT INDEX {INDICE} (nombre, descripcion)'
+    )
+
+
+def eliminar_indice_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(f'ALTER TABLE producto DROP INDEX {INDICE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiEcommerceComputerApp', '0004_contador_productos_categoria'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_fulltext, eliminar_indice_fulltext),
+    ]
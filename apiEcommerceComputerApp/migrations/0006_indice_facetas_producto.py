@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiEcommerceComputerApp', '0005_indice_fulltext_producto'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_tipo_f0f6af_idx',
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['tipo', 'precio', 'stock'], name='producto_tipo_388ba7_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiEcommerceComputerApp', '0006_indice_facetas_producto'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['es_nuevo', 'created_at'], name='producto_es_nuev_8ccf1b_idx'),
+        ),
+    ]
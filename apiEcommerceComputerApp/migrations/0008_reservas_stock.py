@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:46
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiEcommerceComputerApp', '0007_indice_es_nuevo_producto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('estado', models.CharField(choices=[('activa', 'Activa'), ('confirmada', 'Confirmada'), ('liberada', 'Liberada'), ('vencida', 'Vencida')], default='activa', max_length=10)),
+                ('expira_en', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservas_stock', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reserva de Stock',
+                'verbose_name_plural': 'Reservas de Stock',
+                'db_table': 'reserva_stock',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReservaStockItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reservas_stock', to='apiEcommerceComputerApp.producto')),
+                ('reserva', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='apiEcommerceComputerApp.reservastock')),
+            ],
+            options={
+                'verbose_name': 'Línea de Reserva',
+                'verbose_name_plural': 'Líneas de Reserva',
+                'db_table': 'reserva_stock_item',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reservastock',
+            index=models.Index(fields=['estado', 'expira_en'], name='reserva_sto_estado_deea16_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reservastockitem',
+            unique_together={('reserva', 'producto')},
+        ),
+    ]
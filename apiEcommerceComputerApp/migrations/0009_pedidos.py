@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiEcommerceComputerApp', '0008_reservas_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('pagado', 'Pagado'), ('enviado', 'Enviado'), ('cancelado', 'Cancelado')], default='pendiente', max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('reserva', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pedido', to='apiEcommerceComputerApp.reservastock')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='pedidos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Pedido',
+                'verbose_name_plural': 'Pedidos',
+                'db_table': 'pedido',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='apiEcommerceComputerApp.order')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='order_items', to='apiEcommerceComputerApp.producto')),
+            ],
+            options={
+                'verbose_name': 'Línea de Pedido',
+                'verbose_name_plural': 'Líneas de Pedido',
+                'db_table': 'pedido_item',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['usuario', '-created_at'], name='pedido_usuario_621347_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='orderitem',
+            unique_together={('order', 'producto')},
+        ),
+    ]
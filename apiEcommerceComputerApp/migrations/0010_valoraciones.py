@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:51
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiEcommerceComputerApp', '0009_pedidos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Valoracion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntuacion', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('comentario', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valoraciones', to='apiEcommerceComputerApp.producto')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valoraciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Valoración',
+                'verbose_name_plural': 'Valoraciones',
+                'db_table': 'valoracion',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['producto', '-created_at'], name='valoracion_product_44abc8_idx')],
+                'unique_together': {('producto', 'usuario')},
+            },
+        ),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
+import uuid
 from datetime import timedelta
 from django.utils import timezone
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser, PermissionsMixin
+from django.contrib.auth.hashers import acheck_password, check_password
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.conf import settings
+from .contrasenas import recodificar
 
 # Create your models here.
 class UserManager(BaseUserManager): 
@@ -82,6 +86,27 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
         """
         return self.is_superuser 
 
+    def check_password(self, raw_password):
+        """
+        Como AbstractBaseUser.check_password, pero al actualizar el hash
+        conserva la sal si solo cambió el costo (contrasenas.recodificar):
+        no invalida los tokens de las otras sesiones.
+        """
+        def setter(raw_password):
+            self.password = recodificar(raw_password, self.password)
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        async def setter(raw_password):
+            self.password = recodificar(raw_password, self.password)
+            self._password = None
+            await self.asave(update_fields=['password'])
+
+        return await acheck_password(raw_password, self.password, setter)
+
     class Meta:
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
@@ -95,6 +120,8 @@ class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     descripcion = models.TextField(blank=True, null=True)
     imagen = models.ImageField(upload_to='categorias/', null=True, blank=True)
+    # Contador desnormalizado, mantenido por señales de Producto (ver signals.py)
+    cantidad_productos = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -106,6 +133,9 @@ class Categoria(models.Model):
     def __str__(self):
         return self.nombre
 
+# Ventas a partir de las cuales un producto se considera "más vendido"
+UMBRAL_MAS_VENDIDO = 10
+
 class Tipo_Producto(models.TextChoices):
     """
     Tipos de productos disponibles.
@@ -116,6 +146,27 @@ class Tipo_Producto(models.TextChoices):
     COMPONENTE = 'componente', 'Componente'
     ACCESORIO = 'accesorio', 'Accesorio'
 
+# Días durante los que un producto se considera "nuevo"
+DIAS_PRODUCTO_NUEVO = 30
+
+
+def fecha_limite_nuevo(ahora=None):
+    """
+    Productos creados desde esta fecha son nuevos.
+    """
+    return (ahora or timezone.now()) - timedelta(days=DIAS_PRODUCTO_NUEVO)
+
+
+class ProductoQuerySet(models.QuerySet):
+
+    def nuevos(self, ahora=None):
+        """
+        Productos creados en los últimos DIAS_PRODUCTO_NUEVO días: un rango
+        sobre el índice de created_at, siempre vigente (no depende de es_nuevo).
+        """
+        return self.filter(created_at__gte=fecha_limite_nuevo(ahora))
+
+
 class Producto(models.Model):
     """
     Modelo principal para los productos del ecommerce.
@@ -144,6 +195,17 @@ class Producto(models.Model):
     rating = models.FloatField(default=0.0)
     total_reviews = models.IntegerField(default=0)
 
+    objects = ProductoQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Guarda la categoría original para detectar cambios de categoría al guardar.
+        """
+        instancia = super().from_db(db, field_names, values)
+        instancia._categoria_id_original = instancia.__dict__.get('categoria_id')
+        return instancia
+
     def clean(self):
         """
         Validaciones personalizadas para el modelo Producto.
@@ -155,14 +217,13 @@ class Producto(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Override del método save para calcular si el producto es nuevo.
+        Override del método save: todo producto se crea como nuevo.
+        El paso a "no nuevo" lo hace el comando barrer_es_nuevo por bloques
+        (ver rollups.barrer_es_nuevo); las consultas de novedad usan
+        Producto.objects.nuevos().
         """
-        # Calcula si el producto es nuevo (creado en los últimos 30 días)
         if self.pk is None:
             self.es_nuevo = True
-        else:
-            fecha_limite = timezone.now() - timedelta(days=30)
-            self.es_nuevo = self.fecha_creacion >= fecha_limite
 
         super().save(*args, **kwargs)
     
@@ -172,7 +233,7 @@ class Producto(models.Model):
         Determina si es más vendido basándose en la cantidad vendida.
         Se considera más vendido si tiene más de 10 ventas.
         """
-        return self.cantidad_vendida >= 10
+        return self.cantidad_vendida >= UMBRAL_MAS_VENDIDO
     
     @property
     def esta_agotado(self):
@@ -195,12 +256,26 @@ class Producto(models.Model):
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
         db_table = 'producto'
-        ordering = ['-fecha_creacion']
-        # indexes = [
-        #     models.Index(fields=['tipo', 'categoria']),
-        #     models.Index(fields=['-cantidad_vendida']),
-        #     models.Index(fields=['-fecha_creacion']),
-        # ]
+        ordering = ['-created_at']
+        # Índices alineados con los filtros y ordenamientos de ProductoViewSet
+        indexes = [
+            # filtros por categoría/tipo combinados con rango u orden de precio;
+            # con stock, cubre la consulta agrupada de /productos/facetas/
+            models.Index(fields=['categoria', 'precio']),
+            models.Index(fields=['tipo', 'precio', 'stock']),
+            # rangos de precio y stock (stock_bajo, agotados)
+            models.Index(fields=['precio']),
+            models.Index(fields=['stock']),
+            # ordenamientos del catálogo
+            models.Index(fields=['nombre']),
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['categoria', '-created_at']),
+            # mas_vendidos: global y por categoría
+            models.Index(fields=['-cantidad_vendida', '-rating']),
+            models.Index(fields=['categoria', '-cantidad_vendida', '-rating']),
+            # barrer_es_nuevo: filas cuyo flag no coincide con la ventana de novedad
+            models.Index(fields=['es_nuevo', 'created_at']),
+        ]
 
 class ImagenProducto(models.Model):
     """
@@ -224,3 +299,154 @@ class ImagenProducto(models.Model):
         db_table = 'imagen_producto'
         ordering = ['orden']
         # unique_together = [['producto', 'orden']]
+
+class EstadoReserva(models.TextChoices):
+    ACTIVA = 'activa', 'Activa'
+    CONFIRMADA = 'confirmada', 'Confirmada'
+    LIBERADA = 'liberada', 'Liberada'
+    VENCIDA = 'vencida', 'Vencida'
+
+class ReservaStock(models.Model):
+    """
+    Unidades apartadas del stock durante el checkout (ver reservas.py).
+    El stock ya está descontado mientras la reserva está activa; al liberarse
+    o vencer se devuelve.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reservas_stock'
+    )
+    estado = models.CharField(max_length=10, choices=EstadoReserva.choices, default=EstadoReserva.ACTIVA)
+    expira_en = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Reserva {self.token} ({self.estado})'
+
+    class Meta:
+        verbose_name = 'Reserva de Stock'
+        verbose_name_plural = 'Reservas de Stock'
+        db_table = 'reserva_stock'
+        indexes = [
+            # liberar_reservas_vencidas: activas con expira_en pasado
+            models.Index(fields=['estado', 'expira_en']),
+        ]
+
+class ReservaStockItem(models.Model):
+    reserva = models.ForeignKey(ReservaStock, on_delete=models.CASCADE, related_name='items')
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name='reservas_stock')
+    cantidad = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f'{self.cantidad} x {self.producto_id}'
+
+    class Meta:
+        verbose_name = 'Línea de Reserva'
+        verbose_name_plural = 'Líneas de Reserva'
+        db_table = 'reserva_stock_item'
+        unique_together = [['reserva', 'producto']]
+
+class EstadoPedido(models.TextChoices):
+    PENDIENTE = 'pendiente', 'Pendiente'
+    PAGADO = 'pagado', 'Pagado'
+    ENVIADO = 'enviado', 'Enviado'
+    CANCELADO = 'cancelado', 'Cancelado'
+
+class Order(models.Model):
+    """
+    Pedido de un usuario (ver pedidos.py). El total y los precios de las
+    líneas se copian al crear el pedido: no cambian si cambia el catálogo.
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name='pedidos'
+    )
+    reserva = models.OneToOneField(
+        ReservaStock,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pedido'
+    )
+    estado = models.CharField(max_length=10, choices=EstadoPedido.choices, default=EstadoPedido.PENDIENTE)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Pedido {self.id} ({self.estado})'
+
+    class Meta:
+        verbose_name = 'Pedido'
+        verbose_name_plural = 'Pedidos'
+        db_table = 'pedido'
+        ordering = ['-created_at']
+        indexes = [
+            # historial por usuario con paginación keyset (created_at, id)
+            models.Index(fields=['usuario', '-created_at']),
+        ]
+
+class OrderItem(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name='order_items')
+    cantidad = models.PositiveIntegerField()
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f'{self.cantidad} x {self.producto_id}'
+
+    @property
+    def subtotal(self):
+        return self.precio_unitario * self.cantidad
+
+    class Meta:
+        verbose_name = 'Línea de Pedido'
+        verbose_name_plural = 'Líneas de Pedido'
+        db_table = 'pedido_item'
+        unique_together = [['order', 'producto']]
+
+class Valoracion(models.Model):
+    """
+    Valoración de un producto (una por usuario). Producto.rating y
+    total_reviews se actualizan de forma incremental desde las señales
+    (ver rollups.registrar_valoracion).
+    """
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='valoraciones')
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='valoraciones'
+    )
+    puntuacion = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    comentario = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Guarda la puntuación original para ajustar el promedio al editarla.
+        """
+        instancia = super().from_db(db, field_names, values)
+        instancia._puntuacion_original = instancia.__dict__.get('puntuacion')
+        return instancia
+
+    def __str__(self):
+        return f'{self.puntuacion}/5 - {self.producto_id}'
+
+    class Meta:
+        verbose_name = 'Valoración'
+        verbose_name_plural = 'Valoraciones'
+        db_table = 'valoracion'
+        ordering = ['-created_at']
+        unique_together = [['producto', 'usuario']]
+        indexes = [
+            # listado por producto con paginación keyset (created_at, id)
+            models.Index(fields=['producto', '-created_at']),
+        ]
@@ -0,0 +1,190 @@
+import base64
+import binascii
+import json
+from types import SimpleNamespace
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def ordenamiento_keyset(queryset, desempate='id'):
+    """
+    Retorna el ordenamiento efectivo del queryset (order_by o Meta.ordering)
+    terminado en el campo de desempate, con la misma dirección que el último
+    criterio.
+    """
+    orden = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+    orden = [campo for campo in orden if campo.lstrip('-') not in (desempate, 'pk')]
+    if not orden:
+        return [desempate]
+    prefijo = '-' if orden[-1].startswith('-') else ''
+    return orden + [prefijo + desempate]
+
+
+def filtro_keyset(orden, posicion):
+    """
+    Construye la condición "fila posterior a `posicion`" para `orden`,
+    p. ej. para ['-precio', '-id']:
+        precio < v0 OR (precio = v0 AND id < v1)
+    """
+    condicion = Q()
+    iguales = {}
+    for criterio, valor in zip(orden, posicion):
+        campo = criterio.lstrip('-')
+        operador = 'lt' if criterio.startswith('-') else 'gt'
+        condicion |= Q(**iguales, **{f'{campo}__{operador}': valor})
+        iguales[campo] = valor
+    return condicion
+
+
+def iterar_por_keyset(queryset, chunk_size=2000, desempate='id'):
+    """
+    Recorre el queryset completo en bloques de `chunk_size` filas usando
+    keyset en lugar de un cursor abierto: cada bloque es una consulta corta y
+    la memoria no depende del tamaño total (en MySQL, .iterator() no hace
+    streaming real: el driver carga todo el resultado).
+    Funciona con instancias o con filas de .values().
+    """
+    orden = ordenamiento_keyset(queryset, desempate)
+    queryset = queryset.order_by(*orden)
+    columnas = [queryset.model._meta.get_field(criterio.lstrip('-')).attname for criterio in orden]
+    posicion = None
+    while True:
+        bloque = queryset if posicion is None else queryset.filter(filtro_keyset(orden, posicion))
+        filas = list(bloque[:chunk_size])
+        yield from filas
+        if len(filas) < chunk_size:
+            return
+        ultima = filas[-1]
+        if isinstance(ultima, dict):
+            posicion = [ultima[columna] for columna in columnas]
+        else:
+            posicion = [getattr(ultima, columna) for columna in columnas]
+
+
+def limite_busqueda(request, datos):
+    """
+    Agrega `busqueda_limitada` (el tope aplicado) a los datos de una página
+    cuya búsqueda recortó las coincidencias (ver busqueda.py): el total y
+    las páginas siguientes no incluyen el resto.
+    """
+    limite = getattr(request, 'busqueda_limitada', None)
+    if limite is not None:
+        datos['busqueda_limitada'] = limite
+    return datos
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por keyset (cursor) para el catálogo.
+    - No usa OFFSET: cada página filtra a partir de la última fila de la
+      anterior, así la página 500 cuesta lo mismo que la 1.
+    - No ejecuta COUNT(*).
+    - Respeta el ordenamiento del queryset (OrderingFilter o Meta.ordering) y
+      desempata por id, por lo que el orden es estable aunque haya valores
+      repetidos (mismo precio, mismo nombre, etc.).
+    Solo avanza hacia adelante: la respuesta trae `next` y `results`.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    desempate = 'id'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.orden = self.get_ordering(queryset)
+        self.modelo = queryset.model
+        queryset = queryset.order_by(*self.orden)
+
+        posicion = self.decode_cursor(request, queryset.model)
+        if posicion is not None:
+            queryset = queryset.filter(self.filtro_keyset(posicion))
+
+        # Una fila extra indica si existe una página siguiente
+        resultados = list(queryset[:self.page_size + 1])
+        self.siguiente = None
+        if len(resultados) > self.page_size:
+            resultados = resultados[:self.page_size]
+            self.siguiente = resultados[-1]
+        return resultados
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        return ordenamiento_keyset(queryset, self.desempate)
+
+    def filtro_keyset(self, posicion):
+        return filtro_keyset(self.orden, posicion)
+
+    def encode_cursor(self, instancia):
+        """
+        Codifica en base64 el orden y los valores de la última fila de la página.
+        `instancia` puede ser un modelo o una fila de .values().
+        """
+        if isinstance(instancia, dict):
+            instancia = SimpleNamespace(**instancia)
+        valores = []
+        for criterio in self.orden:
+            campo = self.modelo._meta.get_field(criterio.lstrip('-'))
+            valores.append(campo.value_to_string(instancia))
+        datos = json.dumps({'o': self.orden, 'p': valores}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(datos.encode()).decode()
+
+    def decode_cursor(self, request, modelo):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            if datos['o'] != self.orden or len(datos['p']) != len(self.orden):
+                # El cursor se generó con otro ordenamiento
+                raise NotFound(self.invalid_cursor_message)
+            return [
+                modelo._meta.get_field(criterio.lstrip('-')).to_python(valor)
+                for criterio, valor in zip(self.orden, datos['p'])
+            ]
+        except (TypeError, KeyError, ValueError, UnicodeDecodeError,
+                binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.siguiente is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.siguiente))
+
+    def get_paginated_response(self, data):
+        return Response(limite_busqueda(self.request, {
+            'next': self.get_next_link(),
+            'results': data,
+        }))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+                'busqueda_limitada': {
+                    'type': 'integer',
+                },
+            },
+        }
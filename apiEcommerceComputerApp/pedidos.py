@@ -0,0 +1,67 @@
+"""
+Creación de pedidos con pocas sentencias por pedido, sin importar cuántas
+líneas tenga:
+
+  1. SELECT de todos los productos de las líneas (id, precio) en una consulta.
+  2. Stock: sin reserva, reservas.descontar_stock (un UPDATE condicional para
+     todas las líneas); con reserva, confirmarla (el stock ya estaba apartado).
+  3. INSERT del pedido y de todas sus líneas con bulk_create.
+  4. rollups.registrar_ventas: un UPDATE de cantidad_vendida para todas las
+     líneas.
+Los pasos 2 a 4 van en la misma transacción: si falta stock o falla una
+escritura no queda ni el pedido ni el descuento ni las ventas.
+"""
+from django.db import transaction
+from .models import Order, OrderItem, Producto, ReservaStockItem
+from .reservas import StockInsuficiente, agrupar_lineas, calcular_faltantes, confirmar, descontar_stock
+from .rollups import registrar_ventas
+
+
+class PedidoInvalido(Exception):
+    """
+    Líneas que no se pueden vender; `errores` se retorna tal cual al cliente.
+    """
+
+    def __init__(self, errores):
+        self.errores = errores
+        super().__init__(errores)
+
+
+def crear_pedido(usuario, lineas=None, reserva=None):
+    """
+    Crea un pedido desde [(producto_id, cantidad)] o desde una reserva
+    activa del usuario (sus líneas reemplazan a `lineas`).
+    Lanza PedidoInvalido, StockInsuficiente o ReservaNoActiva.
+    """
+    if reserva is not None:
+        lineas = ReservaStockItem.objects.filter(reserva=reserva).values_list('producto_id', 'cantidad')
+    try:
+        cantidades = agrupar_lineas(lineas or [])
+    except ValueError as error:
+        raise PedidoInvalido({'items': [str(error)]})
+
+    precios = dict(Producto.objects.filter(pk__in=cantidades).values_list('id', 'precio'))
+    inexistentes = [producto_id for producto_id in cantidades if producto_id not in precios]
+    if inexistentes:
+        raise PedidoInvalido({'items': [f'No existen los productos {inexistentes}.']})
+
+    with transaction.atomic():
+        if reserva is not None:
+            confirmar(reserva)
+        completo = reserva is not None or descontar_stock(cantidades)
+        if completo:
+            pedido = Order.objects.create(
+                usuario=usuario,
+                reserva=reserva,
+                total=sum(precios[producto_id] * cantidad for producto_id, cantidad in cantidades.items()),
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=pedido, producto_id=producto_id, cantidad=cantidad, precio_unitario=precios[producto_id])
+                for producto_id, cantidad in cantidades.items()
+            ])
+            registrar_ventas(cantidades)
+        else:
+            transaction.set_rollback(True)
+    if not completo:
+        raise StockInsuficiente(calcular_faltantes(cantidades))
+    return pedido
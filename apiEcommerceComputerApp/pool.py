@@ -0,0 +1,298 @@
+"""
+Pool de conexiones en proceso para la base de datos.
+
+Django mantiene una conexión por hilo: con CONN_MAX_AGE > 0 (settings.py)
+cada hilo de un worker WSGI reutiliza la suya entre requests. Bajo ASGI las
+vistas síncronas corren en hilos que no sobreviven al request, así que esas
+conexiones persistentes no se reutilizan y cada request paga de nuevo el
+handshake TCP y la autenticación de MySQL.
+
+Con el ENGINE "apiEcommerceComputerApp.backends.mysql" (o ".sqlite3") las
+conexiones físicas vienen de un `PoolConexiones` compartido por todos los
+hilos del proceso: al cerrar, Django devuelve la conexión al pool en lugar
+de cerrarla (usar CONN_MAX_AGE = 0 para devolverla al final de cada
+request). Configuración en DATABASES[alias]['POOL'] (ver DEFAULTS).
+
+Las conexiones que vuelven dentro de una transacción, con errores o con
+autocommit cambiado se descartan. Las que estuvieron inactivas más de
+VERIFICAR_TRAS_S se prueban con un SELECT 1 antes de prestarlas.
+"""
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+from django.db.utils import OperationalError
+from . import metricas
+
+DEFAULTS = {
+    # Conexiones físicas máximas por proceso (prestadas + libres)
+    'TAMANO': 10,
+    # Segundos que se espera una conexión con el pool agotado
+    'TIMEOUT': 10,
+    # Las conexiones libres más de esto se cierran (por debajo del wait_timeout de MySQL)
+    'MAX_INACTIVA_S': 300,
+    # Vida máxima de una conexión física (None = sin límite)
+    'MAX_VIDA_S': 1800,
+    # Inactiva más de esto: SELECT 1 antes de prestarla
+    'VERIFICAR_TRAS_S': 30,
+}
+
+
+def get_config(settings_dict):
+    return {**DEFAULTS, **settings_dict.get('POOL', {})}
+
+
+class PoolAgotado(OperationalError):
+    """No se liberó ninguna conexión dentro de POOL['TIMEOUT']."""
+
+# ===== Métricas =====
+
+CONEXIONES_POOL = metricas.Gauge(
+    'db_pool_connections', 'Conexiones físicas del pool por estado (en_uso, libres).', ('alias', 'estado'),
+)
+CREADAS_POOL = metricas.Contador(
+    'db_pool_connections_created_total', 'Conexiones físicas abiertas por el pool.', ('alias',),
+)
+DESCARTADAS_POOL = metricas.Contador(
+    'db_pool_connections_discarded_total', 'Conexiones físicas cerradas por el pool, por motivo.',
+    ('alias', 'motivo'),
+)
+PRESTAMOS_POOL = metricas.Contador('db_pool_checkouts_total', 'Conexiones prestadas por el pool.', ('alias',))
+ESPERA_POOL = metricas.Histograma(
+    'db_pool_wait_seconds', 'Espera por una conexión con el pool agotado.', ('alias',), metricas.BUCKETS_SEGUNDOS,
+)
+TIMEOUTS_POOL = metricas.Contador('db_pool_timeouts_total', 'Esperas que superaron POOL["TIMEOUT"].', ('alias',))
+
+# ===== Pool =====
+
+class PoolConexiones:
+    """
+    Pool genérico y seguro entre hilos de conexiones DB-API.
+    `validar(conexion)` retorna si la conexión responde.
+    """
+
+    def __init__(self, alias, validar, config=None):
+        config = {**DEFAULTS, **(config or {})}
+        self.alias = alias
+        self.validar = validar
+        self.tamano = config['TAMANO']
+        self.timeout = config['TIMEOUT']
+        self.max_inactiva_s = config['MAX_INACTIVA_S']
+        self.max_vida_s = config['MAX_VIDA_S']
+        self.verificar_tras_s = config['VERIFICAR_TRAS_S']
+        self.condicion = threading.Condition()
+        # (conexión, creada_en, devuelta_en); se presta la más reciente
+        self.libres = deque()
+        self.creadas_en = {}
+        self.en_uso = 0
+        self.contadores = {'creadas': 0, 'prestamos': 0, 'esperas': 0, 'timeouts': 0, 'descartadas': 0}
+
+    def obtener(self, crear):
+        """
+        Presta una conexión libre o crea una con `crear()` si hay lugar;
+        con el pool agotado espera hasta TIMEOUT y lanza PoolAgotado.
+        """
+        limite = time.monotonic() + self.timeout
+        espero = False
+        while True:
+            vencidas, candidata, nueva = [], None, False
+            with self.condicion:
+                ahora = time.monotonic()
+                while self.libres and candidata is None:
+                    conexion, creada_en, devuelta_en = self.libres.pop()
+                    if self._vencida(creada_en, devuelta_en, ahora):
+                        vencidas.append(conexion)
+                    else:
+                        candidata = (conexion, devuelta_en)
+                # Las más antiguas quedan al principio: se cierran al vencer
+                while self.libres and self._vencida(self.libres[0][1], self.libres[0][2], ahora):
+                    vencidas.append(self.libres.popleft()[0])
+                if candidata is None and self.en_uso + len(self.libres) < self.tamano:
+                    nueva = True
+                if candidata is not None or nueva:
+                    self.en_uso += 1
+                    self.contadores['prestamos'] += 1
+                elif not vencidas:
+                    restante = limite - ahora
+                    if restante <= 0:
+                        self.contadores['timeouts'] += 1
+                        TIMEOUTS_POOL.inc(alias=self.alias)
+                        raise PoolAgotado(
+                            f'Sin conexiones libres en el pool "{self.alias}" tras {self.timeout}s '
+                            f'({self.tamano} en uso).'
+                        )
+                    if not espero:
+                        espero, inicio_espera = True, time.monotonic()
+                        self.contadores['esperas'] += 1
+                    self.condicion.wait(restante)
+                    continue
+            self._cerrar(vencidas, 'vencida')
+            if candidata is None and not nueva:
+                continue
+
+            if espero:
+                ESPERA_POOL.observe(time.monotonic() - inicio_espera, alias=self.alias)
+            PRESTAMOS_POOL.inc(alias=self.alias)
+            if nueva:
+                return self._crear(crear)
+            conexion, devuelta_en = candidata
+            if time.monotonic() - devuelta_en < self.verificar_tras_s or self.validar(conexion):
+                self._publicar()
+                return conexion
+            self._liberar_lugar()
+            self._cerrar([conexion], 'sin_respuesta')
+
+    def _vencida(self, creada_en, devuelta_en, ahora):
+        return (
+            (self.max_inactiva_s is not None and ahora - devuelta_en >= self.max_inactiva_s)
+            or (self.max_vida_s is not None and ahora - creada_en >= self.max_vida_s)
+        )
+
+    def _crear(self, crear):
+        try:
+            conexion = crear()
+        except BaseException:
+            self._liberar_lugar()
+            raise
+        with self.condicion:
+            self.creadas_en[id(conexion)] = time.monotonic()
+            self.contadores['creadas'] += 1
+        CREADAS_POOL.inc(alias=self.alias)
+        self._publicar()
+        return conexion
+
+    def _liberar_lugar(self):
+        with self.condicion:
+            self.en_uso -= 1
+            self.condicion.notify()
+        self._publicar()
+
+    def devolver(self, conexion):
+        with self.condicion:
+            self.en_uso -= 1
+            creada_en = self.creadas_en.get(id(conexion), time.monotonic())
+            self.libres.append((conexion, creada_en, time.monotonic()))
+            self.condicion.notify()
+        self._publicar()
+
+    def descartar(self, conexion, motivo='descartada'):
+        """
+        Cierra una conexión prestada que no debe volver al pool.
+        """
+        self._liberar_lugar()
+        self._cerrar([conexion], motivo)
+
+    def _cerrar(self, conexiones, motivo):
+        for conexion in conexiones:
+            with self.condicion:
+                self.creadas_en.pop(id(conexion), None)
+                self.contadores['descartadas'] += 1
+            DESCARTADAS_POOL.inc(alias=self.alias, motivo=motivo)
+            try:
+                conexion.close()
+            except Exception:
+                pass
+        if conexiones:
+            self._publicar()
+
+    def cerrar_libres(self):
+        with self.condicion:
+            libres = [conexion for conexion, _, _ in self.libres]
+            self.libres.clear()
+        self._cerrar(libres, 'cierre_pool')
+
+    def _publicar(self):
+        with self.condicion:
+            en_uso, libres = self.en_uso, len(self.libres)
+        CONEXIONES_POOL.set(en_uso, alias=self.alias, estado='en_uso')
+        CONEXIONES_POOL.set(libres, alias=self.alias, estado='libres')
+
+    def estadisticas(self):
+        with self.condicion:
+            return {'tamano': self.tamano, 'en_uso': self.en_uso, 'libres': len(self.libres), **self.contadores}
+
+# ===== Pools por alias =====
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def _clave(settings_dict, alias):
+    # El runner de tests cambia NAME: cada base tiene su pool
+    return (alias, *(settings_dict.get(campo) for campo in ('NAME', 'HOST', 'PORT', 'USER')))
+
+
+def obtener_pool(wrapper):
+    """
+    Pool del alias y la base del DatabaseWrapper; se crea al primer uso.
+    Tras un fork los pools heredados se abandonan sin cerrar sus conexiones
+    (son del proceso padre).
+    """
+    global _pid
+    clave = _clave(wrapper.settings_dict, wrapper.alias)
+    with _pools_lock:
+        if _pid != os.getpid():
+            _pid = os.getpid()
+            _pools.clear()
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = _pools[clave] = PoolConexiones(wrapper.alias, validar_conexion, get_config(wrapper.settings_dict))
+        return pool
+
+
+def cerrar_pools(alias=None):
+    """
+    Cierra las conexiones libres de los pools (de un alias o de todos).
+    """
+    with _pools_lock:
+        pools = [pool for clave, pool in _pools.items() if alias is None or clave[0] == alias]
+        if alias is None:
+            _pools.clear()
+        else:
+            for clave in [clave for clave in _pools if clave[0] == alias]:
+                del _pools[clave]
+    for pool in pools:
+        pool.cerrar_libres()
+
+
+def estadisticas():
+    with _pools_lock:
+        return {'/'.join(str(parte) for parte in clave[:2]): pool.estadisticas() for clave, pool in _pools.items()}
+
+
+def validar_conexion(conexion):
+    try:
+        cursor = conexion.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class PoolMixin:
+    """
+    Mixin para el DatabaseWrapper de un backend: toma las conexiones físicas
+    del pool y las devuelve al cerrar.
+    """
+
+    def get_new_connection(self, conn_params):
+        return obtener_pool(self).obtener(partial(super().get_new_connection, conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = obtener_pool(self)
+        if self.in_atomic_block:
+            pool.descartar(self.connection, 'en_transaccion')
+        elif self.errors_occurred:
+            pool.descartar(self.connection, 'con_errores')
+        elif self.autocommit != self.settings_dict['AUTOCOMMIT']:
+            pool.descartar(self.connection, 'autocommit')
+        else:
+            pool.devolver(self.connection)
@@ -0,0 +1,218 @@
+"""
+Reservas de stock del checkout: reservar -> confirmar, o liberar / vencer.
+
+- `reservar` descuenta el stock de todas las líneas con un único UPDATE
+  condicional, sin SELECT ... FOR UPDATE:
+      UPDATE producto SET stock = stock - CASE id WHEN 1 THEN 2 WHEN 7 THEN 1 END
+      WHERE id IN (1, 7) AND stock >= CASE id WHEN 1 THEN 2 WHEN 7 THEN 1 END
+  La condición se evalúa sobre la fila que el propio UPDATE bloquea, así dos
+  reservas concurrentes nunca venden la misma unidad. Si se actualizaron
+  menos filas que líneas, a alguna le faltó stock y la transacción se
+  revierte completa (todo o nada). Las filas se bloquean en orden de clave
+  primaria, así reservas con productos en común no pueden quedar en
+  deadlock; igual esperan una a otra por los bloqueos de esas filas hasta
+  que la primera confirme o revierta.
+- `confirmar` cierra la reserva: el stock ya estaba descontado.
+- `liberar` y `liberar_vencidas` devuelven las unidades con otro UPDATE por
+  lotes. Las transiciones de estado son UPDATE condicionales
+  (estado='activa'), así una reserva no se devuelve dos veces aunque el
+  usuario la libere mientras el comando liberar_reservas_vencidas la vence.
+
+Los UPDATE no envían señales: al confirmar la transacción se invalidan las
+respuestas cacheadas del catálogo (cache.py), que muestran el stock.
+"""
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+from .cache import invalidar_al_confirmar
+from .models import EstadoReserva, Producto, ReservaStock, ReservaStockItem
+
+DEFAULTS = {
+    # Segundos que una reserva activa retiene el stock
+    'TTL': 900,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESERVAS', {})}
+
+
+class StockInsuficiente(Exception):
+    """
+    Alguna línea no tenía stock; no se reservó nada.
+    `faltantes`: [{'producto', 'solicitado', 'disponible'}] leídos después
+    del intento (puede quedar vacío si el stock cambió entretanto).
+    """
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        super().__init__('Stock insuficiente: {}'.format(
+            ', '.join(str(faltante['producto']) for faltante in faltantes)
+        ))
+
+
+class ReservaNoActiva(Exception):
+    """La reserva ya fue confirmada, liberada o venció."""
+
+# ===== UPDATE por lotes sobre Producto.stock =====
+
+def agrupar_lineas(lineas):
+    """
+    [(producto_id, cantidad)] -> {producto_id: cantidad}, sumando productos repetidos.
+    """
+    cantidades = Counter()
+    for producto_id, cantidad in lineas:
+        if cantidad <= 0:
+            raise ValueError('La cantidad debe ser mayor a 0.')
+        cantidades[producto_id] += cantidad
+    if not cantidades:
+        raise ValueError('La reserva debe tener al menos una línea.')
+    return dict(cantidades)
+
+
+def _cantidad_por_producto(cantidades):
+    return Case(
+        *[When(pk=producto_id, then=Value(cantidad)) for producto_id, cantidad in cantidades.items()],
+        output_field=IntegerField(),
+    )
+
+
+def descontar_stock(cantidades):
+    """
+    Descuenta {producto_id: cantidad} con un UPDATE condicional.
+    Retorna True si todas las líneas tenían stock; si no, el llamador debe
+    revertir la transacción (las líneas con stock ya se descontaron).
+    """
+    cantidad = _cantidad_por_producto(cantidades)
+    actualizados = Producto.objects.filter(pk__in=cantidades, stock__gte=cantidad).update(
+        stock=F('stock') - cantidad
+    )
+    if actualizados:
+        invalidar_al_confirmar('producto')
+    return actualizados == len(cantidades)
+
+
+def devolver_stock(cantidades):
+    """
+    Suma {producto_id: cantidad} al stock con un solo UPDATE.
+    """
+    if not cantidades:
+        return 0
+    actualizados = Producto.objects.filter(pk__in=cantidades).update(
+        stock=F('stock') + _cantidad_por_producto(cantidades)
+    )
+    if actualizados:
+        invalidar_al_confirmar('producto')
+    return actualizados
+
+
+def calcular_faltantes(cantidades):
+    disponibles = dict(Producto.objects.filter(pk__in=cantidades).values_list('pk', 'stock'))
+    return [
+        {'producto': producto_id, 'solicitado': cantidad, 'disponible': disponibles.get(producto_id, 0)}
+        for producto_id, cantidad in cantidades.items()
+        if disponibles.get(producto_id, 0) < cantidad
+    ]
+
+# ===== Ciclo de vida de la reserva =====
+
+def reservar(lineas, usuario=None, ttl=None):
+    """
+    Reserva todas las líneas [(producto_id, cantidad)] o ninguna.
+    Retorna la ReservaStock activa; lanza StockInsuficiente si falta stock.
+    """
+    cantidades = agrupar_lineas(lineas)
+    ttl = get_config()['TTL'] if ttl is None else ttl
+    with transaction.atomic():
+        completa = descontar_stock(cantidades)
+        if completa:
+            reserva = ReservaStock.objects.create(
+                usuario=usuario,
+                expira_en=timezone.now() + timedelta(seconds=ttl),
+            )
+            ReservaStockItem.objects.bulk_create([
+                ReservaStockItem(reserva=reserva, producto_id=producto_id, cantidad=cantidad)
+                for producto_id, cantidad in cantidades.items()
+            ])
+        else:
+            transaction.set_rollback(True)
+    if not completa:
+        raise StockInsuficiente(calcular_faltantes(cantidades))
+    return reserva
+
+
+def _cambiar_estado(reserva, estado, **filtros):
+    """
+    activa -> `estado` con un UPDATE condicional; False si ya no estaba activa.
+    """
+    ahora = timezone.now()
+    cambiadas = ReservaStock.objects.filter(pk=reserva.pk, estado=EstadoReserva.ACTIVA, **filtros).update(
+        estado=estado, updated_at=ahora
+    )
+    if cambiadas:
+        reserva.estado, reserva.updated_at = estado, ahora
+    return bool(cambiadas)
+
+
+def confirmar(reserva):
+    """
+    Cierra una reserva activa y no vencida: las unidades quedan vendidas.
+    """
+    if not _cambiar_estado(reserva, EstadoReserva.CONFIRMADA, expira_en__gt=timezone.now()):
+        raise ReservaNoActiva(reserva.pk)
+    return reserva
+
+
+def liberar(reserva, estado=EstadoReserva.LIBERADA):
+    """
+    Devuelve al stock las unidades de una reserva activa.
+    """
+    with transaction.atomic():
+        if not _cambiar_estado(reserva, estado):
+            raise ReservaNoActiva(reserva.pk)
+        devolver_stock(dict(
+            ReservaStockItem.objects.filter(reserva_id=reserva.pk).values_list('producto_id', 'cantidad')
+        ))
+    return reserva
+
+
+def liberar_vencidas(chunk_size=500, ahora=None):
+    """
+    Vence las reservas activas con expira_en pasado y devuelve su stock.
+    Por bloque: un UPDATE de estado, una suma agrupada de las líneas y un
+    UPDATE de stock. Si otro proceso cambió alguna reserva del bloque
+    entretanto, el bloque se revierte y se vence de a una reserva.
+    Retorna la cantidad de reservas vencidas.
+    """
+    ahora = ahora or timezone.now()
+    pendientes = ReservaStock.objects.filter(estado=EstadoReserva.ACTIVA, expira_en__lte=ahora)
+    total = 0
+    while True:
+        ids = list(pendientes.order_by('expira_en').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return total
+        with transaction.atomic():
+            vencidas = ReservaStock.objects.filter(pk__in=ids, estado=EstadoReserva.ACTIVA).update(
+                estado=EstadoReserva.VENCIDA, updated_at=timezone.now()
+            )
+            if vencidas == len(ids):
+                devolver_stock(dict(
+                    ReservaStockItem.objects.filter(reserva_id__in=ids)
+                    .values('producto_id')
+                    .annotate(total=Sum('cantidad'))
+                    .values_list('producto_id', 'total')
+                ))
+            else:
+                transaction.set_rollback(True)
+        if vencidas == len(ids):
+            total += vencidas
+            continue
+        for reserva_id in ids:
+            try:
+                liberar(ReservaStock(pk=reserva_id), estado=EstadoReserva.VENCIDA)
+                total += 1
+            except ReservaNoActiva:
+                pass
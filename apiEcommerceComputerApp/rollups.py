@@ -0,0 +1,346 @@
+"""
+Rollups desnormalizados de ventas y valoraciones sobre Producto, y del
+contador de productos por Categoria.
+
+Los listados del catálogo leen directamente las columnas `cantidad_vendida`,
+`rating` y `total_reviews` en lugar de agregar (AVG/SUM + GROUP BY) en cada
+request. Estas columnas se mantienen:
+  - de forma incremental, con UPDATEs atómicos (F()) al escribir líneas de
+    pedido y valoraciones;
+  - en bloque, con `recalcular_rollups` (comando `recalcular_rollups`);
+y se auditan con `verificar_rollups` (comando `verificar_rollups`).
+
+`Categoria.cantidad_productos` se mantiene igual: +1/-1 desde las señales de
+Producto (alta, baja y cambio de categoría) y reconstrucción en bloque.
+
+`Producto.es_nuevo` depende del paso del tiempo: `barrer_es_nuevo` (comando
+`barrer_es_nuevo`, diario) actualiza por bloques solo las filas que cruzaron
+el límite de DIAS_PRODUCTO_NUEVO.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import (
+    Avg, Case, Count, ExpressionWrapper, F, FloatField, OuterRef, Subquery,
+    Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from . import feeds
+from .cache import invalidar
+from .models import Categoria, Producto, fecha_limite_nuevo
+
+# related_name de las tablas de origen sobre Producto
+RELACION_VENTAS = 'order_items'
+RELACION_VALORACIONES = 'valoraciones'
+
+# Diferencia máxima aceptada entre el rating guardado y el promedio real
+TOLERANCIA_RATING = 1e-6
+
+
+def _relacion(nombre):
+    """
+    Retorna (modelo, campo FK hacia Producto) de una relación inversa,
+    o None si el modelo de origen todavía no existe en el proyecto.
+    """
+    try:
+        campo = Producto._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        return None
+    return campo.related_model, campo.field.name
+
+
+def _subquery_agregado(nombre, agregado, campo_valor):
+    """
+    Subquery correlacionada que agrega `campo_valor` de la relación `nombre`
+    para el producto externo (OuterRef('pk')).
+    """
+    relacion = _relacion(nombre)
+    if relacion is None:
+        return None
+    modelo, fk = relacion
+    return Subquery(
+        modelo.objects.filter(**{fk: OuterRef('pk')})
+        .order_by()
+        .values(fk)
+        .annotate(valor=agregado(campo_valor))
+        .values('valor')[:1]
+    )
+
+
+def _expresiones_vivas():
+    """
+    Expresiones con los agregados reales calculados desde las tablas de origen.
+    Solo incluye las relaciones que existen.
+    """
+    expresiones = {}
+    ventas = _subquery_agregado(RELACION_VENTAS, Sum, 'cantidad')
+    if ventas is not None:
+        expresiones['cantidad_vendida'] = Coalesce(ventas, 0)
+    promedio = _subquery_agregado(RELACION_VALORACIONES, Avg, 'puntuacion')
+    if promedio is not None:
+        expresiones['rating'] = Coalesce(promedio, Value(0.0), output_field=FloatField())
+        expresiones['total_reviews'] = Coalesce(
+            _subquery_agregado(RELACION_VALORACIONES, Count, 'id'), 0
+        )
+    return expresiones
+
+# ===== Actualizaciones incrementales =====
+
+def _ventas_al_confirmar(producto_ids):
+    """
+    Reubica los productos en mas_vendidos e invalida las respuestas
+    cacheadas cuando se confirme la transacción: un rollback no deja en la
+    cache compartida ventas que no existen.
+    """
+    def al_confirmar():
+        feeds.ventas_registradas(producto_ids)
+        invalidar('producto')
+
+    transaction.on_commit(al_confirmar)
+
+
+def registrar_venta(producto_id, cantidad):
+    """
+    Suma `cantidad` unidades vendidas al producto (negativo para devoluciones),
+    lo reubica en el feed de más vendidos e invalida las respuestas cacheadas
+    (ambos al confirmar la transacción).
+    """
+    actualizados = Producto.objects.filter(pk=producto_id).update(
+        cantidad_vendida=F('cantidad_vendida') + cantidad
+    )
+    if actualizados:
+        _ventas_al_confirmar([producto_id])
+    return actualizados
+
+
+def registrar_ventas(cantidades):
+    """
+    Versión por lotes de registrar_venta para las líneas de un pedido:
+    {producto_id: cantidad} en un solo UPDATE. Los feeds y las respuestas
+    cacheadas (cantidad_vendida y orden de mas_vendidos) se actualizan al
+    confirmar la transacción (una consulta para todos los productos).
+    """
+    if not cantidades:
+        return 0
+    actualizados = Producto.objects.filter(pk__in=cantidades).update(
+        cantidad_vendida=F('cantidad_vendida') + Case(
+            *[When(pk=producto_id, then=Value(cantidad)) for producto_id, cantidad in cantidades.items()],
+            default=Value(0),
+        )
+    )
+    if actualizados:
+        _ventas_al_confirmar(list(cantidades))
+    return actualizados
+
+
+def registrar_valoracion(producto_id, puntuacion):
+    """
+    Agrega una valoración al promedio acumulado: O(1), sin re-promediar.
+    El orden importa: en MySQL las asignaciones del UPDATE se evalúan de
+    izquierda a derecha, así que rating debe calcularse antes que total_reviews.
+    """
+    return Producto.objects.filter(pk=producto_id).update(
+        rating=ExpressionWrapper(
+            (F('rating') * F('total_reviews') + puntuacion) / (F('total_reviews') + 1.0),
+            output_field=FloatField()
+        ),
+        total_reviews=F('total_reviews') + 1,
+    )
+
+
+def actualizar_valoracion(producto_id, puntuacion_anterior, puntuacion_nueva):
+    """
+    Reemplaza una valoración existente en el promedio acumulado.
+    """
+    diferencia = puntuacion_nueva - puntuacion_anterior
+    if not diferencia:
+        return 0
+    return Producto.objects.filter(pk=producto_id, total_reviews__gt=0).update(
+        rating=ExpressionWrapper(
+            F('rating') + diferencia / (F('total_reviews') * 1.0),
+            output_field=FloatField()
+        ),
+    )
+
+
+def eliminar_valoracion(producto_id, puntuacion):
+    """
+    Quita una valoración del promedio acumulado. Con la última valoración
+    el rating vuelve a 0.
+    """
+    return Producto.objects.filter(pk=producto_id, total_reviews__gt=0).update(
+        rating=Case(
+            When(total_reviews__lte=1, then=Value(0.0)),
+            default=ExpressionWrapper(
+                (F('rating') * F('total_reviews') - puntuacion) / (F('total_reviews') - 1.0),
+                output_field=FloatField()
+            ),
+            output_field=FloatField(),
+        ),
+        total_reviews=F('total_reviews') - 1,
+    )
+
+
+def ajustar_conteo_categoria(categoria_id, delta):
+    """
+    Suma `delta` (+1/-1) al contador de productos de la categoría.
+    """
+    return Categoria.objects.filter(pk=categoria_id).update(
+        cantidad_productos=F('cantidad_productos') + delta
+    )
+
+# ===== Reconstrucción y verificación =====
+
+def _conteo_productos_vivo():
+    """
+    Subquery con la cantidad real de productos de la categoría externa.
+    """
+    return Coalesce(
+        Subquery(
+            Producto.objects.filter(categoria=OuterRef('pk'))
+            .order_by()
+            .values('categoria')
+            .annotate(total=Count('id'))
+            .values('total')[:1]
+        ),
+        0
+    )
+
+
+def recalcular_rollups(chunk_size=1000):
+    """
+    Reconstruye en bloque las columnas del rollup a partir de las tablas de
+    origen. Procesa rangos de ids con un UPDATE ... SET col = (subquery) por
+    bloque, cada uno en su propia transacción para no retener locks largos.
+    Retorna la cantidad de productos procesados.
+    """
+    expresiones = _expresiones_vivas()
+    if not expresiones:
+        return 0
+
+    procesados = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Producto.objects.filter(pk__gt=ultimo_id)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            Producto.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).update(**expresiones)
+        procesados += len(ids)
+        ultimo_id = ids[-1]
+    return procesados
+
+
+def recalcular_productos(producto_ids):
+    """
+    Reconstruye el rollup solo de `producto_ids` (p. ej. los que reportó
+    verificar_rollups) con un único UPDATE.
+    """
+    expresiones = _expresiones_vivas()
+    if not expresiones or not producto_ids:
+        return 0
+    return Producto.objects.filter(pk__in=producto_ids).update(**expresiones)
+
+
+def recalcular_conteo_categorias():
+    """
+    Reconstruye Categoria.cantidad_productos con un único UPDATE.
+    Retorna la cantidad de categorías procesadas.
+    """
+    return Categoria.objects.update(cantidad_productos=_conteo_productos_vivo())
+
+
+def verificar_rollups(chunk_size=2000):
+    """
+    Compara las columnas del rollup contra los agregados reales.
+    Retorna una lista de diferencias: {'modelo', 'id', 'campo', 'guardado', 'real'}.
+    """
+    expresiones = _expresiones_vivas()
+    if not expresiones:
+        return []
+
+    vivas = {'real_' + campo: expresion for campo, expresion in expresiones.items()}
+    campos = ['id', *expresiones.keys(), *vivas.keys()]
+    filas = Producto.objects.order_by().annotate(**vivas).values(*campos)
+
+    diferencias = []
+    for fila in filas.iterator(chunk_size=chunk_size):
+        for campo in expresiones:
+            guardado, real = fila[campo], fila['real_' + campo]
+            if campo == 'rating':
+                iguales = abs(guardado - real) <= TOLERANCIA_RATING
+            else:
+                iguales = guardado == real
+            if not iguales:
+                diferencias.append({
+                    'modelo': 'producto',
+                    'id': fila['id'],
+                    'campo': campo,
+                    'guardado': guardado,
+                    'real': real,
+                })
+    return diferencias
+
+
+def verificar_conteo_categorias():
+    """
+    Compara Categoria.cantidad_productos contra el conteo real.
+    Retorna las diferencias con el mismo formato que verificar_rollups.
+    """
+    filas = (
+        Categoria.objects.annotate(real=_conteo_productos_vivo())
+        .exclude(cantidad_productos=F('real'))
+        .values('id', 'cantidad_productos', 'real')
+    )
+    return [
+        {
+            'modelo': 'categoria',
+            'id': fila['id'],
+            'campo': 'cantidad_productos',
+            'guardado': fila['cantidad_productos'],
+            'real': fila['real'],
+        }
+        for fila in filas
+    ]
+
+# ===== es_nuevo =====
+
+def _actualizar_por_bloques(queryset, chunk_size, **valores):
+    """
+    UPDATE de las filas de `queryset` en bloques de `chunk_size` ids, cada uno
+    en su propia transacción. Las filas actualizadas dejan de cumplir el
+    filtro, así que cada bloque vuelve a tomar los primeros.
+    """
+    total = 0
+    while True:
+        ids = list(queryset.order_by('created_at').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return total
+        with transaction.atomic():
+            total += queryset.filter(pk__in=ids).update(**valores)
+
+
+def barrer_es_nuevo(chunk_size=1000, ahora=None):
+    """
+    Sincroniza es_nuevo con la ventana de novedad sin cargar instancias:
+    desmarca los productos que la dejaron y marca los que están dentro con
+    el flag en False (p. ej. creados con bulk_create). Ambos filtros usan el
+    índice (es_nuevo, created_at).
+    Retorna {'desmarcados': n, 'marcados': n}.
+    """
+    limite = fecha_limite_nuevo(ahora)
+    resultado = {
+        'desmarcados': _actualizar_por_bloques(
+            Producto.objects.filter(es_nuevo=True, created_at__lt=limite), chunk_size, es_nuevo=False
+        ),
+        'marcados': _actualizar_por_bloques(
+            Producto.objects.filter(es_nuevo=False, created_at__gte=limite), chunk_size, es_nuevo=True
+        ),
+    }
+    if any(resultado.values()):
+        # update() no envía señales
+        invalidar('producto')
+    return resultado
@@ -0,0 +1,125 @@
+"""
+Serialización rápida (solo lectura) para los listados del catálogo.
+
+`SerializadorRapido` "compila" un ModelSerializer una sola vez por request:
+recorre sus campos y prepara un accesor por campo que lee directamente de una
+fila de `.values()`. Así se evita instanciar modelos y el recorrido
+campo-por-campo de DRF por cada fila, manteniendo exactamente la misma salida
+(cada accesor termina en el `to_representation` del campo original).
+
+Soporta:
+  - campos del modelo y relaciones por pk (`categoria` -> `categoria_id`)
+  - fuentes con punto (`categoria.nombre` -> `categoria__nombre`)
+  - properties del modelo (`es_mas_vendido`, ...), evaluadas sobre la fila
+  - SerializerMethodField si el serializer define `rapido_<campo>(fila)` y,
+    opcionalmente, `anotaciones_rapidas()` con las columnas extra que necesita
+"""
+from types import SimpleNamespace
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+
+
+class SerializadorRapido:
+
+    def __init__(self, serializer_class, context=None):
+        self.serializer = serializer_class(context=context or {})
+        self.modelo = self.serializer.Meta.model
+        self.columnas = [campo.attname for campo in self.modelo._meta.concrete_fields]
+        self.anotaciones = {}
+        if hasattr(self.serializer, 'anotaciones_rapidas'):
+            self.anotaciones = self.serializer.anotaciones_rapidas()
+        self.usa_objeto = False
+        self.accesores = [
+            (nombre, self.compilar(nombre, campo))
+            for nombre, campo in self.serializer.fields.items()
+            if not campo.write_only
+        ]
+
+    def filas(self, queryset):
+        """
+        Convierte el queryset en un queryset de diccionarios con todas las
+        columnas que necesitan los accesores.
+        """
+        return queryset.prefetch_related(None).values(*self.columnas, **self.anotaciones)
+
+    def serializar(self, filas):
+        return [self.serializar_fila(fila) for fila in filas]
+
+    def serializar_fila(self, fila):
+        objeto = SimpleNamespace(**fila) if self.usa_objeto else None
+        return {nombre: accesor(fila, objeto) for nombre, accesor in self.accesores}
+
+    # ===== Compilación de campos =====
+
+    def compilar(self, nombre, campo):
+        rapido = getattr(self.serializer, 'rapido_' + nombre, None)
+        if rapido is not None:
+            return lambda fila, objeto: rapido(fila)
+        if isinstance(campo, serializers.SerializerMethodField):
+            raise ImproperlyConfigured(
+                f'{type(self.serializer).__name__} debe definir rapido_{nombre}(fila) '
+                'para usarse con SerializadorRapido.'
+            )
+
+        fuente = campo.source
+        if '.' in fuente:
+            clave = fuente.replace('.', '__')
+            if clave not in self.columnas:
+                self.columnas.append(clave)
+            return self.accesor_columna(clave, campo)
+
+        try:
+            campo_modelo = self.modelo._meta.get_field(fuente)
+        except FieldDoesNotExist:
+            propiedad = getattr(self.modelo, fuente, None)
+            if not isinstance(propiedad, property):
+                raise ImproperlyConfigured(
+                    f'SerializadorRapido no soporta la fuente "{fuente}" del campo "{nombre}".'
+                )
+            return self.accesor_propiedad(propiedad.fget, campo)
+
+        if isinstance(campo, serializers.RelatedField):
+            # PrimaryKeyRelatedField: la columna ya contiene el pk
+            return self.accesor_columna(campo_modelo.attname, None)
+        if isinstance(campo, serializers.FileField):
+            return self.accesor_archivo(campo_modelo, campo)
+        if isinstance(campo, serializers.DateTimeField) and not hasattr(campo, 'timezone'):
+            # Resuelve la zona horaria una vez y no por cada valor
+            campo.timezone = campo.default_timezone()
+        return self.accesor_columna(campo_modelo.attname, campo)
+
+    @staticmethod
+    def accesor_columna(clave, campo):
+        if campo is None:
+            return lambda fila, objeto: fila[clave]
+        representar = campo.to_representation
+
+        def accesor(fila, objeto):
+            valor = fila[clave]
+            return None if valor is None else representar(valor)
+        return accesor
+
+    def accesor_propiedad(self, getter, campo):
+        self.usa_objeto = True
+        representar = campo.to_representation
+
+        def accesor(fila, objeto):
+            valor = getter(objeto)
+            return None if valor is None else representar(valor)
+        return accesor
+
+    @staticmethod
+    def accesor_archivo(campo_modelo, campo):
+        """
+        La columna guarda el nombre del archivo: se envuelve en el FieldFile
+        del modelo para que DRF construya la misma URL.
+        """
+        representar = campo.to_representation
+        clase_archivo = campo_modelo.attr_class
+
+        def accesor(fila, objeto):
+            nombre = fila[campo_modelo.attname]
+            if nombre is None:
+                return None
+            return representar(clase_archivo(None, campo_modelo, nombre))
+        return accesor
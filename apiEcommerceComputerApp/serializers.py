@@ -1,5 +1,12 @@
 from rest_framework import serializers
-from .models import Usuario, Producto, Categoria, ImagenProducto
+from django.db.models import OuterRef, Subquery
+from .models import (
+    Usuario, Producto, Categoria, ImagenProducto, Order, OrderItem, ReservaStock, ReservaStockItem,
+    Valoracion,
+)
+from .autenticacion import cargar_usuario
+from .pedidos import crear_pedido
+from .reservas import reservar
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
@@ -9,25 +16,25 @@ User = get_user_model()
 class CategoriaSerializer(serializers.ModelSerializer):
     """
     Serializer para el modelo Categoría.
+    `cantidad_productos` es un contador mantenido por las señales de Producto.
     """
-    cantidad_productos = serializers.SerializerMethodField()
-
     class Meta:
         model = Categoria
         fields = '__all__'
-        read_only_fields = ['id']
-    
-    def get_cantidad_productos(self, obj):
+        read_only_fields = ['id', 'cantidad_productos']
+
+    @staticmethod
+    def optimizar_queryset(queryset):
         """
-        Retorna la cantidad de productos de esta categoría.
+        Sin carga adicional: la cantidad de productos ya está en la tabla.
         """
-        return obj.productos.count()
+        return queryset
 
     def validate_nombre(self, value):
         """
         Validad que el nombre de la categoría sea único.
         """
-        qs = Categoria.objects.filter(nombre_iexact=value)
+        qs = Categoria.objects.filter(nombre__iexact=value)
         if self.instance: # si es una actualización
             qs = qs.exclude(pk=self.instance.pk)
         if qs.exists():
@@ -49,8 +56,8 @@ class ProductoListSerializer(serializers.ModelSerializer):
     - rating  <- corresponde al float que guardas
     - cantidad_vendida <- entero que guardas
     """
-    # Campos computados que añadimos desde la queryset (annotate)
-    average_rating = serializers.FloatField(read_only=True)
+    # Campos del rollup (ver rollups.py), ya guardados en el modelo
+    average_rating = serializers.FloatField(source='rating', read_only=True)
     cantidad_vendida = serializers.IntegerField(read_only=True)
     
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
@@ -64,13 +71,48 @@ class ProductoListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = '__all__'
-        read_only_fields = ['id', 'es_nuevo', 'cantidad_vendida', 'average_rating', 'imagen_principal']
+        read_only_fields = ['id', 'es_nuevo', 'cantidad_vendida', 'rating', 'total_reviews', 'average_rating', 'imagen_principal']
+
+    @staticmethod
+    def optimizar_queryset(queryset):
+        """
+        Carga anticipada para listados: categoría (JOIN) e imágenes (1 consulta).
+        """
+        return queryset.select_related('categoria').prefetch_related('imagenes')
     
     def get_imagen_principal(self, obj):
-        imagenes = getattr(obj, 'imagenes', None)
-        if imagenes:
-            return getattr(first, 'imagen', None)
-        return getattr(obj, 'imagen', None)
+        """
+        Retorna la URL de la primera imagen adicional o, si no hay, la imagen principal.
+        """
+        primera = next(iter(obj.imagenes.all()), None)
+        imagen = primera.imagen if primera else obj.imagen_principal
+        if not imagen:
+            return None
+        return self.url_absoluta(imagen.url)
+
+    def url_absoluta(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    # ===== Serialización rápida (ver serializacion.py) =====
+
+    def anotaciones_rapidas(self):
+        """
+        Columnas extra para SerializadorRapido: la primera imagen adicional.
+        """
+        primera_imagen = ImagenProducto.objects.filter(producto=OuterRef('pk')).order_by('orden')
+        return {'primera_imagen': Subquery(primera_imagen.values('imagen')[:1])}
+
+    def rapido_imagen_principal(self, fila):
+        """
+        Equivalente a get_imagen_principal sobre una fila de .values().
+        """
+        nombre, campo = fila['primera_imagen'], ImagenProducto._meta.get_field('imagen')
+        if nombre is None:
+            nombre, campo = fila['imagen_principal'], Producto._meta.get_field('imagen_principal')
+        if not nombre:
+            return None
+        return self.url_absoluta(campo.storage.url(nombre))
     
 class ProductoDetailSerializer(serializers.ModelSerializer):
     """
@@ -86,7 +128,7 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
 
     # Imágenes adicionales
-    imagenes_adicionales = ImagenProductoSerializer(many=True, read_only=True)
+    imagenes_adicionales = ImagenProductoSerializer(source='imagenes', many=True, read_only=True)
     # Campos calculados
     es_mas_vendido = serializers.BooleanField(read_only=True)
     esta_agotado = serializers.BooleanField(read_only=True)
@@ -102,7 +144,15 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = '__all__'
-        read_only_fields = ['id', 'es_nuevo', 'cantidad_vendida', 'fecha_creacion', 'fecha_actualizacion']
+        read_only_fields = ['id', 'es_nuevo', 'cantidad_vendida', 'rating', 'total_reviews', 'created_at', 'updated_at']
+
+    @staticmethod
+    def optimizar_queryset(queryset):
+        """
+        Carga anticipada para el detalle: creador y categoría (JOIN) e
+        imágenes adicionales.
+        """
+        return queryset.select_related('creado_por', 'categoria').prefetch_related('imagenes')
 
     def validate_precio(self, value):
         """
@@ -151,7 +201,130 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
             if 'creado_por' in validated_data:
                 validated_data.pop('creado_por')
 
-        return super().update(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Solo las columnas enviadas: un guardado completo pisaría el stock y
+        # cantidad_vendida que las reservas y ventas cambian con UPDATE atómicos
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+class ReservaStockItemSerializer(serializers.ModelSerializer):
+    producto = serializers.IntegerField(source='producto_id', min_value=1)
+    cantidad = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = ReservaStockItem
+        fields = ['producto', 'cantidad']
+
+class ReservaStockSerializer(serializers.ModelSerializer):
+    """
+    Reserva de stock del checkout. Los productos no se validan aquí uno por
+    uno: el UPDATE de reservas.reservar informa los inexistentes o sin stock.
+    """
+    items = ReservaStockItemSerializer(many=True)
+
+    class Meta:
+        model = ReservaStock
+        fields = ['token', 'estado', 'expira_en', 'created_at', 'items']
+        read_only_fields = ['token', 'estado', 'expira_en', 'created_at']
+
+    @staticmethod
+    def optimizar_queryset(queryset):
+        return queryset.prefetch_related('items')
+
+    def validate_items(self, value):
+        if not value:
+            raise serializers.ValidationError('La reserva debe tener al menos un producto.')
+        return value
+
+    def create(self, validated_data):
+        request = self.context.get('request')
+        return reservar(
+            [(item['producto_id'], item['cantidad']) for item in validated_data['items']],
+            usuario=request.user if request else None,
+        )
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    producto = serializers.IntegerField(source='producto_id', min_value=1)
+    cantidad = serializers.IntegerField(min_value=1)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['producto', 'cantidad', 'precio_unitario', 'subtotal']
+        read_only_fields = ['precio_unitario']
+
+class OrderSerializer(serializers.ModelSerializer):
+    """
+    Pedido con sus líneas. Se crea con "items" o con el token de una reserva
+    activa del usuario ("reserva"); los precios los pone el servidor.
+    """
+    items = OrderItemSerializer(many=True, required=False)
+    reserva = serializers.SlugRelatedField(
+        slug_field='token',
+        queryset=ReservaStock.objects.all(),
+        required=False,
+        allow_null=True
+    )
+
+    class Meta:
+        model = Order
+        fields = ['id', 'estado', 'total', 'reserva', 'created_at', 'items']
+        read_only_fields = ['id', 'estado', 'total', 'created_at']
+
+    @staticmethod
+    def optimizar_queryset(queryset):
+        return queryset.select_related('reserva').prefetch_related('items')
+
+    def validate_reserva(self, value):
+        request = self.context.get('request')
+        if value is not None and request and value.usuario_id != request.user.id:
+            raise serializers.ValidationError('La reserva no pertenece al usuario.')
+        return value
+
+    def validate(self, data):
+        if not data.get('items') and not data.get('reserva'):
+            raise serializers.ValidationError('El pedido debe tener "items" o una "reserva".')
+        return data
+
+    def create(self, validated_data):
+        return crear_pedido(
+            self.context['request'].user,
+            lineas=[(item['producto_id'], item['cantidad']) for item in validated_data.get('items', [])],
+            reserva=validated_data.get('reserva'),
+        )
+
+class ValoracionSerializer(serializers.ModelSerializer):
+    """
+    Valoración de un producto. El producto solo se elige al crearla y el
+    autor es el usuario autenticado.
+    """
+    usuario_nombre = serializers.CharField(source='usuario.nombre', read_only=True)
+
+    class Meta:
+        model = Valoracion
+        fields = ['id', 'producto', 'usuario_nombre', 'puntuacion', 'comentario', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    @staticmethod
+    def optimizar_queryset(queryset):
+        return queryset.select_related('usuario').only(
+            'id', 'producto_id', 'usuario__nombre', 'puntuacion', 'comentario', 'created_at', 'updated_at'
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            fields['producto'].read_only = True
+        return fields
+
+    def validate(self, data):
+        request = self.context.get('request')
+        if self.instance is None and request and Valoracion.objects.filter(
+            producto=data['producto'], usuario=request.user
+        ).exists():
+            raise serializers.ValidationError('Ya valoraste este producto.')
+        return data
 
 class UsuarioRegistroSerializer(serializers.ModelSerializer):
     """
@@ -272,7 +445,7 @@ class CambiarPasswordSerializer(serializers.Serializer):
     
     def validate_password_actual(self, value):
         """Valida que la contraseña actual sea correcta"""
-        user = self.context['request'].user
+        user = cargar_usuario(self.context['request'])
         if not user.check_password(value):
             raise serializers.ValidationError('La contraseña actual es incorrecta.')
         return value
@@ -301,7 +474,7 @@ class CambiarPasswordSerializer(serializers.Serializer):
     
     def save(self):
         """Cambia la contraseña del usuario"""
-        user = self.context['request'].user
+        user = cargar_usuario(self.context['request'])
         user.set_password(self.validated_data['password_nueva'])
         user.save()
         return user
\ No newline at end of file
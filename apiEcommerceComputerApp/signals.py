@@ -0,0 +1,136 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import feeds, instrumentacion
+from .autenticacion import invalidar_estado
+from .busqueda import obtener_backend
+from .cache import invalidar_al_confirmar
+from .metricas import CONEXIONES_ABIERTAS, registrar_conexion
+from .models import Categoria, ImagenProducto, Producto, Usuario, Valoracion
+from .rollups import (
+    actualizar_valoracion, ajustar_conteo_categoria, eliminar_valoracion, registrar_valoracion,
+)
+
+
+@receiver([post_save, post_delete], sender=Producto)
+@receiver([post_save, post_delete], sender=Categoria)
+@receiver([post_save, post_delete], sender=ImagenProducto)
+@receiver([post_save, post_delete], sender=Valoracion)
+def invalidar_cache_catalogo(sender, **kwargs):
+    """
+    Invalida las respuestas cacheadas del catálogo que dependen del modelo
+    modificado, al confirmar la transacción del cambio.
+    """
+    invalidar_al_confirmar(sender._meta.model_name)
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_feeds_al_guardar(sender, instance, created, **kwargs):
+    """
+    Actualiza los feeds de la página de inicio (feeds.py) al confirmar la
+    transacción: la cache es compartida y no se deshace con un rollback.
+    Debe registrarse antes de actualizar_conteo_categoria_al_guardar, que
+    reinicia `_categoria_id_original`.
+    """
+    original = getattr(instance, '_categoria_id_original', None)
+    anterior = original if not created and original is not None and original != instance.categoria_id else None
+    transaction.on_commit(lambda: feeds.producto_guardado(instance, categoria_anterior=anterior))
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_conteo_categoria_al_guardar(sender, instance, created, **kwargs):
+    """
+    Mantiene Categoria.cantidad_productos en altas y cambios de categoría.
+    """
+    original = getattr(instance, '_categoria_id_original', None)
+    if created:
+        ajustar_conteo_categoria(instance.categoria_id, 1)
+    elif original is not None and original != instance.categoria_id:
+        ajustar_conteo_categoria(original, -1)
+        ajustar_conteo_categoria(instance.categoria_id, 1)
+    instance._categoria_id_original = instance.categoria_id
+
+
+@receiver(post_delete, sender=Producto)
+def actualizar_conteo_categoria_al_borrar(sender, instance, **kwargs):
+    ajustar_conteo_categoria(instance.categoria_id, -1)
+    producto_id, categoria_id = instance.pk, instance.categoria_id
+    transaction.on_commit(lambda: feeds.producto_eliminado(producto_id, categoria_id))
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, **kwargs):
+    """
+    Actualiza el índice de búsqueda al confirmar la transacción (no-op con
+    FULLTEXT: lo mantiene MySQL).
+    """
+    transaction.on_commit(lambda: obtener_backend().indexar(instance))
+
+
+@receiver(post_delete, sender=Producto)
+def desindexar_producto(sender, instance, **kwargs):
+    producto_id = instance.pk
+    transaction.on_commit(lambda: obtener_backend().eliminar(producto_id))
+
+
+def valoracion_aplicada(producto_id):
+    """
+    rating cambió con un UPDATE (sin señales de Producto): al confirmar se
+    invalidan las respuestas del catálogo y se reubica el producto en
+    mas_vendidos, que desempata por rating.
+    """
+    invalidar_al_confirmar('producto')
+    transaction.on_commit(lambda: feeds.venta_registrada(producto_id))
+
+
+@receiver(post_save, sender=Valoracion)
+def actualizar_rating_al_guardar(sender, instance, created, **kwargs):
+    """
+    Promedio acumulado O(1): suma la valoración nueva o ajusta la diferencia
+    de una editada, sin re-promediar (ver rollups.py).
+    """
+    original = getattr(instance, '_puntuacion_original', None)
+    if created:
+        registrar_valoracion(instance.producto_id, instance.puntuacion)
+    elif original is not None and original != instance.puntuacion:
+        actualizar_valoracion(instance.producto_id, original, instance.puntuacion)
+    else:
+        return
+    instance._puntuacion_original = instance.puntuacion
+    valoracion_aplicada(instance.producto_id)
+
+
+@receiver(post_delete, sender=Valoracion)
+def actualizar_rating_al_borrar(sender, instance, **kwargs):
+    eliminar_valoracion(instance.producto_id, getattr(instance, '_puntuacion_original', instance.puntuacion))
+    valoracion_aplicada(instance.producto_id)
+
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def invalidar_estado_usuario(sender, instance, **kwargs):
+    """
+    Los tokens del usuario se revalidan contra la base en el próximo
+    request (autenticacion.py): desactivación, cambio de rol o de contraseña.
+    """
+    invalidar_estado(instance.pk)
+
+
+@receiver(connection_created)
+def contar_conexion(sender, connection, **kwargs):
+    """
+    Cuenta las conexiones nuevas a la base de datos (metricas.py); con
+    CONN_MAX_AGE > 0 debería crecer mucho más lento que http_requests_total.
+    """
+    CONEXIONES_ABIERTAS.inc(alias=connection.alias)
+    registrar_conexion(connection)
+
+
+@receiver(connection_created)
+def instrumentar_conexion(sender, connection, **kwargs):
+    """
+    Instala el contador de consultas de instrumentacion.py en las conexiones
+    de cualquier hilo (las vistas async consultan desde sync_to_async).
+    """
+    instrumentacion.instalar_contador(connection)
@@ -1,3 +1,2136 @@
-from django.test import TestCase
+import asyncio
+import gc
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from django.db import connection, connections, transaction
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache, RedisCacheClient, RedisSerializer
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework import permissions
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from . import (
+    autenticacion, busqueda, cache as cache_respuestas, coalescencia, contrasenas, feeds, instrumentacion, limites,
+    lista_negra, metricas, pedidos, pool, reservas, rollups,
+)
+from .benchmarks import comparar_resultados, estresar_reservas, medir_conexiones, muestrear_productos
+from .models import (
+    Categoria, EstadoReserva, ImagenProducto, Order, Producto, ReservaStock, Usuario, Valoracion,
+)
+from .serializacion import SerializadorRapido
+from .serializers import CategoriaSerializer, ProductoListSerializer
+from .views import ProductoViewSet
 
 # Create your tests here.
+CATALOGO_URL = '/ecommerce/api/v1/productos/'
+
+# Todos los clientes de prueba comparten IP: sin límites de tasa salvo en LimitesTest
+SIN_LIMITES = override_settings(LIMITES={'ENABLED': False})
+
+
+def setUpModule():
+    SIN_LIMITES.enable()
+
+
+def tearDownModule():
+    SIN_LIMITES.disable()
+
+
+def limpiar_feeds():
+    """
+    Los feeds que se calculan al leerlos quedan en cache, fuera de la
+    transacción de cada test.
+    """
+    feeds.get_cache().clear()
+
+
+TABLA_PRODUCTO = 'producto'
+
+
+def explicar(sql, params):
+    """
+    Ejecuta EXPLAIN sobre una consulta y retorna el plan como lista de filas.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        else:
+            cursor.execute('EXPLAIN ' + sql, params)
+        columnas = [col[0].lower() for col in cursor.description]
+        return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+
+def es_scan_completo(plan, filtrada):
+    """
+    True si el plan recorre la tabla producto completa.
+    - SQLite: 'SCAN producto' sin índice, o con índice (solo para ordenar)
+      cuando la consulta tiene WHERE.
+    - MySQL: type = 'ALL', o 'index' (scan completo del índice) con WHERE.
+    Sin WHERE, recorrer un índice en orden hasta el LIMIT es el plan esperado.
+    """
+    for fila in plan:
+        if connection.vendor == 'sqlite':
+            detalle = fila['detail']
+            if detalle.startswith('SCAN ' + TABLA_PRODUCTO):
+                if filtrada or 'INDEX' not in detalle:
+                    return True
+        elif fila.get('table') == TABLA_PRODUCTO:
+            if fila.get('type') == 'ALL' or (filtrada and fila.get('type') == 'index'):
+                return True
+    return False
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class PlanConsultasCatalogoTest(TestCase):
+    """
+    Regresión de planes de consulta del catálogo: cada combinación de filtro y
+    ordenamiento soportada por ProductoViewSet debe resolverse con un índice.
+    Si una consulta cae en un scan completo de producto, el test falla y
+    muestra el SQL y el EXPLAIN capturados.
+    """
+    FILTROS = [
+        {},
+        {'categoria': '1'},
+        {'tipo': 'portatil'},
+        {'precio__gte': '100', 'precio__lte': '500'},
+        {'categoria': '1', 'precio__gte': '100'},
+        {'tipo': 'portatil', 'precio__lte': '500'},
+        {'stock__gte': '1', 'stock__lte': '4'},
+        {'es_nuevo': 'true'},
+        {'categoria': '1', 'es_nuevo': 'true'},
+    ]
+    ORDENAMIENTOS = [
+        None,
+        'precio', '-precio',
+        'nombre', '-nombre',
+        'cantidad_vendida', '-cantidad_vendida',
+        'created_at', '-created_at',
+    ]
+    ACCIONES = [
+        ('nuevos/', {}),
+        ('nuevos/', {'categoria': '1'}),
+        ('mas_vendidos/', {}),
+        ('mas_vendidos/', {'categoria': '1'}),
+        ('por_tipo/', {'tipo': 'portatil'}),
+        ('agotados/', {}),
+        ('stock_bajo/', {}),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        # La categoría 1 debe existir para que el filterset acepte el filtro
+        Categoria.objects.create(id=1, nombre='Portátiles')
+
+    def setUp(self):
+        self.client = APIClient()
+        # Sin feeds en cache las acciones ejecutan la consulta top-N a revisar
+        limpiar_feeds()
+
+    def consultas_producto(self, url, params):
+        """
+        Ejecuta el request y retorna las consultas SELECT sobre producto.
+        """
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get(url, params)
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        return [
+            consulta['sql'] for consulta in contexto.captured_queries
+            if consulta['sql'].startswith('SELECT') and TABLA_PRODUCTO in consulta['sql']
+        ]
+
+    def assertSinScanCompleto(self, url, params):
+        consultas = self.consultas_producto(url, params)
+        self.assertTrue(consultas, f'No se capturaron consultas para {url} {params}')
+        for sql in consultas:
+            # El SQL capturado ya tiene los parámetros interpolados
+            plan = explicar(sql, [])
+            self.assertFalse(
+                es_scan_completo(plan, filtrada=' WHERE ' in sql),
+                f'Scan completo de {TABLA_PRODUCTO} en {url} {params}\nSQL: {sql}\nEXPLAIN: {plan}'
+            )
+
+    def test_listado_filtros_y_ordenamientos(self):
+        for filtro in self.FILTROS:
+            for orden in self.ORDENAMIENTOS:
+                params = dict(filtro)
+                if orden:
+                    params['ordering'] = orden
+                with self.subTest(params=params):
+                    self.assertSinScanCompleto(CATALOGO_URL, params)
+
+    def test_acciones_del_catalogo(self):
+        for accion, params in self.ACCIONES:
+            with self.subTest(accion=accion, params=params):
+                self.assertSinScanCompleto(CATALOGO_URL + accion, params)
+
+
+class PaginacionCursorTest(TestCase):
+    """
+    La paginación por cursor recorre el catálogo completo, sin repetir ni
+    saltar productos, para cada valor soportado de ?ordering= (con empates).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Componentes')
+        # Precios, nombres y ventas repetidos para forzar el desempate por id
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f'Producto {i % 4}',
+                descripcion='Descripción',
+                precio=Decimal(100 + i % 3),
+                categoria=categoria,
+                tipo='componente',
+                stock=i % 6,
+                cantidad_vendida=i % 5,
+            )
+            for i in range(23)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def recorrer(self, params):
+        ids = []
+        respuesta = self.client.get(CATALOGO_URL, {'paginacion': 'cursor', 'page_size': 5, **params})
+        while True:
+            self.assertEqual(respuesta.status_code, 200, respuesta.content)
+            ids += [producto['id'] for producto in respuesta.data['results']]
+            if not respuesta.data['next']:
+                return ids
+            respuesta = self.client.get(respuesta.data['next'])
+
+    def test_orden_estable_sin_repetidos(self):
+        for campo in ProductoViewSet.ordering_fields:
+            for criterio in (campo, '-' + campo):
+                with self.subTest(ordering=criterio):
+                    esperado = list(
+                        Producto.objects.order_by(criterio, criterio[:-len(campo)] + 'id')
+                        .values_list('id', flat=True)
+                    )
+                    self.assertEqual(self.recorrer({'ordering': criterio}), esperado)
+
+    def test_sin_count(self):
+        with CaptureQueriesContext(connection) as contexto:
+            self.client.get(CATALOGO_URL, {'paginacion': 'cursor'})
+        self.assertFalse([q for q in contexto.captured_queries if 'COUNT(' in q['sql']])
+
+    def test_cursor_invalido(self):
+        respuesta = self.client.get(CATALOGO_URL, {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class RedisFalso:
+    """
+    Lo que RedisCacheClient usa de redis.Redis, sobre un dict en memoria por
+    URL: valores como bytes (los enteros también, como el servidor), NX,
+    expiración, INCR solo sobre enteros y pipelines.
+    """
+    servidores = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, **opciones):
+        return cls.servidores.setdefault(url, {})
+
+    def __init__(self, connection_pool):
+        self.datos = connection_pool
+
+    @staticmethod
+    def codificar(valor):
+        if isinstance(valor, bytes):
+            return valor
+        return str(valor).encode()
+
+    def _vigente(self, clave):
+        valor = self.datos.get(clave)
+        if valor is not None and valor[1] is not None and valor[1] <= time.monotonic():
+            del self.datos[clave]
+            return None
+        return valor
+
+    def get(self, clave):
+        with self.lock:
+            valor = self._vigente(clave)
+        return None if valor is None else valor[0]
+
+    def mget(self, claves):
+        return [self.get(clave) for clave in claves]
+
+    def set(self, clave, valor, ex=None, nx=False):
+        with self.lock:
+            if nx and self._vigente(clave) is not None:
+                return None
+            self.datos[clave] = (self.codificar(valor), None if ex is None else time.monotonic() + ex)
+            return True
+
+    def mset(self, valores):
+        for clave, valor in valores.items():
+            self.set(clave, valor)
+        return True
+
+    def exists(self, clave):
+        with self.lock:
+            return int(self._vigente(clave) is not None)
+
+    def incr(self, clave, cantidad=1):
+        with self.lock:
+            valor, expira = self._vigente(clave) or (b'0', None)
+            nuevo = int(valor) + cantidad  # ValueError si no es entero, como Redis
+            self.datos[clave] = (self.codificar(nuevo), expira)
+            return nuevo
+
+    def delete(self, *claves):
+        with self.lock:
+            return sum(self.datos.pop(clave, None) is not None for clave in claves)
+
+    def expire(self, clave, segundos):
+        with self.lock:
+            valor = self._vigente(clave)
+            if valor is None:
+                return False
+            self.datos[clave] = (valor[0], time.monotonic() + segundos)
+            return True
+
+    def persist(self, clave):
+        with self.lock:
+            valor = self._vigente(clave)
+            if valor is None or valor[1] is None:
+                return False
+            self.datos[clave] = (valor[0], None)
+            return True
+
+    def flushdb(self):
+        with self.lock:
+            self.datos.clear()
+        return True
+
+    def pipeline(self):
+        cliente = self
+
+        class Pipeline:
+            def __init__(self):
+                self.comandos = []
+
+            def __getattr__(self, nombre):
+                return lambda *args, **kwargs: self.comandos.append((nombre, args, kwargs))
+
+            def execute(self):
+                return [getattr(cliente, nombre)(*args, **kwargs) for nombre, args, kwargs in self.comandos]
+
+        return Pipeline()
+
+
+class ClienteRedisFalso(RedisCacheClient):
+    """
+    RedisCacheClient de Django (serialización, add/incr/get_many...) sin el
+    paquete redis: las conexiones son RedisFalso.
+    """
+
+    def __init__(self, servers, **opciones):
+        self._servers = servers
+        self._pools = {}
+        self._client = RedisFalso
+        self._pool_class = RedisFalso
+        self._serializer = RedisSerializer()
+        self._pool_options = {}
+
+
+class RedisCacheFalso(RedisCache):
+    """
+    RedisCache (el backend con REDIS_URL) con ClienteRedisFalso.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = ClienteRedisFalso
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+        # Alias separado, como en producción con Redis (REDIS_URL)
+        'respuestas': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-respuestas'},
+    },
+    RESPONSE_CACHE={'ENABLED': True, 'ALIAS': 'respuestas', 'TIMEOUT': 60},
+)
+class CacheRespuestasTest(TestCase):
+    """
+    Cache de respuestas del catálogo: HIT/MISS, claves normalizadas e
+    invalidación por versión al guardar/borrar.
+    """
+    def setUp(self):
+        caches['respuestas'].clear()
+        cache_respuestas.reiniciar_estadisticas()
+        self.client = APIClient()
+        self.categoria = Categoria.objects.create(nombre='Tablets')
+        self.producto = Producto.objects.create(
+            nombre='Tablet 10', descripcion='Tablet', precio=Decimal('300'),
+            categoria=self.categoria, tipo='tablet', stock=3,
+        )
+
+    def test_hit_despues_de_miss(self):
+        primera = self.client.get(CATALOGO_URL)
+        segunda = self.client.get(CATALOGO_URL)
+        self.assertEqual(primera['X-Cache'], 'MISS')
+        self.assertEqual(segunda['X-Cache'], 'HIT')
+        self.assertEqual(primera.json(), segunda.json())
+
+    def test_hit_sin_consultas(self):
+        self.client.get(CATALOGO_URL + 'mas_vendidos/')
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(CATALOGO_URL + 'mas_vendidos/')
+        self.assertEqual(respuesta['X-Cache'], 'HIT')
+
+    def test_clave_normaliza_query_params(self):
+        self.client.get(CATALOGO_URL, {'tipo': 'tablet', 'ordering': 'precio'})
+        respuesta = self.client.get(CATALOGO_URL + '?ordering=precio&tipo=tablet&search=')
+        self.assertEqual(respuesta['X-Cache'], 'HIT')
+
+    def test_invalidacion_al_guardar_producto(self):
+        url = f'{CATALOGO_URL}{self.producto.pk}/'
+        self.client.get(url)
+        self.producto.nombre = 'Tablet 11'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.save()
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta['X-Cache'], 'MISS')
+        self.assertEqual(respuesta.json()['nombre'], 'Tablet 11')
+
+    def test_invalidacion_al_borrar_categoria(self):
+        url = '/ecommerce/api/v1/categorias/'
+        otra = Categoria.objects.create(nombre='Accesorios')
+        self.assertEqual(len(self.client.get(url).json()['results']), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            otra.delete()
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta['X-Cache'], 'MISS')
+        self.assertEqual(len(respuesta.json()['results']), 1)
+
+    def test_invalidacion_al_confirmar(self):
+        # Un lector concurrente no debe cachear filas sin confirmar bajo la versión nueva
+        version = cache_respuestas.versiones(['producto'])
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.producto.nombre = 'Tablet 12'
+                self.producto.save()
+                self.assertEqual(cache_respuestas.versiones(['producto']), version)
+        self.assertNotEqual(cache_respuestas.versiones(['producto']), version)
+
+    def test_estadisticas(self):
+        for _ in range(3):
+            self.client.get(CATALOGO_URL)
+        datos = cache_respuestas.estadisticas()['ProductoViewSet.list']
+        self.assertEqual((datos['hits'], datos['misses']), (2, 1))
+        self.assertAlmostEqual(datos['hit_rate'], 2 / 3)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+    'respuestas': {'BACKEND': 'apiEcommerceComputerApp.tests.RedisCacheFalso', 'LOCATION': 'redis://falso:6379/0'},
+})
+class CacheRespuestasRedisTest(CacheRespuestasTest):
+    """
+    Los mismos casos con RedisCache (el backend de producción con REDIS_URL)
+    sobre un servidor falso en memoria.
+    """
+    def test_backend_redis(self):
+        self.assertIsInstance(caches['respuestas'], RedisCache)
+
+    def test_versiones_sin_clave(self):
+        # incr sobre una clave inexistente: add la inicializa
+        cache_respuestas.invalidar('producto')
+        self.assertEqual(cache_respuestas.versiones(['producto', 'categoria']), [2, 1])
+        cache_respuestas.invalidar('producto')
+        self.assertEqual(async_to_sync(cache_respuestas.aversiones)(['producto', 'categoria']), [3, 1])
+        self.assertEqual(async_to_sync(cache_respuestas.aversiones)(['imagenproducto']), [1])
+
+    def test_vista_async_lee_la_respuesta_cacheada(self):
+        self.assertEqual(self.client.get(CATALOGO_URL)['X-Cache'], 'MISS')
+        with override_settings(ROOT_URLCONF='apiEcommerceComputer.urls_asgi'):
+            respuesta = async_to_sync(self.async_client.get)(CATALOGO_URL)
+        self.assertEqual(respuesta['X-Cache'], 'HIT')
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class CantidadConsultasTest(TestCase):
+    """
+    Fija la cantidad de consultas SQL de cada endpoint de lectura. El número
+    no debe crecer con el tamaño de la página (detecta consultas N+1).
+    """
+    # endpoint -> consultas esperadas
+    ENDPOINTS = {
+        'productos/': 2,  # COUNT + página (JOIN categoría, subquery de imagen)
+        'productos/?paginacion=cursor': 1,
+        'productos/{producto}/': 2,  # producto (JOIN creador y categoría) + imágenes
+        'productos/nuevos/': 2,  # feed en cache + productos por pk + imágenes
+        'productos/mas_vendidos/': 2,
+        'productos/por_tipo/?tipo=portatil': 1,
+        'productos/agotados/': 1,
+        'productos/stock_bajo/': 1,
+        'productos/facetas/': 2,  # GROUP BY categoría + GROUP BY tipo/rango/stock
+        'categorias/': 2,  # COUNT + página (contador en la tabla)
+        'categorias/{categoria}/': 1,
+        'categorias/{categoria}/productos/': 2,
+        'perfil/': 2,  # grupos + permisos del usuario (fields='__all__')
+        'usuarios/me/': 2,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(
+            email='cliente@example.com', password='clave-segura-123', nombre='Ana', apellido='Pérez'
+        )
+        cls.categoria = Categoria.objects.create(nombre='Portátiles')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        limpiar_feeds()
+        feeds.reconstruir()
+
+    def crear_productos(self, cantidad):
+        # Los feeds se actualizan al confirmar
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(cantidad):
+                producto = Producto.objects.create(
+                    nombre=f'Portátil {i}', descripcion='Portátil', precio=Decimal('1000'),
+                    categoria=self.categoria, tipo='portatil', stock=i % 3,
+                    creado_por=self.usuario,
+                )
+                ImagenProducto.objects.create(producto=producto, imagen=f'productos/imagenes/{i}.png')
+        return producto
+
+    def contar_consultas(self, endpoint, producto):
+        url = '/ecommerce/api/v1/' + endpoint.format(producto=producto.pk, categoria=self.categoria.pk)
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get(url, {'page_size': 100} if '?' not in url else None)
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        return len(contexto.captured_queries)
+
+    def test_consultas_constantes(self):
+        producto = self.crear_productos(2)
+        pocos = {endpoint: self.contar_consultas(endpoint, producto) for endpoint in self.ENDPOINTS}
+        producto = self.crear_productos(20)
+        muchos = {endpoint: self.contar_consultas(endpoint, producto) for endpoint in self.ENDPOINTS}
+
+        for endpoint, esperadas in self.ENDPOINTS.items():
+            with self.subTest(endpoint=endpoint):
+                self.assertEqual(pocos[endpoint], esperadas)
+                self.assertEqual(muchos[endpoint], esperadas)
+
+
+class ContadorProductosCategoriaTest(TestCase):
+    """
+    Categoria.cantidad_productos se mantiene en altas, bajas y cambios de categoría.
+    """
+    def setUp(self):
+        self.portatiles = Categoria.objects.create(nombre='Portátiles')
+        self.tablets = Categoria.objects.create(nombre='Tablets')
+
+    def crear_producto(self, categoria):
+        return Producto.objects.create(
+            nombre='Producto', descripcion='Producto', precio=Decimal('10'),
+            categoria=categoria, tipo='portatil',
+        )
+
+    def contadores(self):
+        return list(Categoria.objects.order_by('id').values_list('cantidad_productos', flat=True))
+
+    def test_alta_cambio_y_baja(self):
+        producto = self.crear_producto(self.portatiles)
+        self.crear_producto(self.portatiles)
+        self.assertEqual(self.contadores(), [2, 0])
+
+        producto = Producto.objects.get(pk=producto.pk)
+        producto.categoria = self.tablets
+        producto.save()
+        self.assertEqual(self.contadores(), [1, 1])
+
+        # Guardar sin cambiar de categoría no altera los contadores
+        producto.save()
+        self.assertEqual(self.contadores(), [1, 1])
+
+        producto.delete()
+        self.assertEqual(self.contadores(), [1, 0])
+        self.assertEqual(rollups.verificar_conteo_categorias(), [])
+
+    def test_recalcular_corrige_diferencias(self):
+        self.crear_producto(self.tablets)
+        Categoria.objects.update(cantidad_productos=7)
+        self.assertEqual(len(rollups.verificar_conteo_categorias()), 2)
+        rollups.recalcular_conteo_categorias()
+        self.assertEqual(self.contadores(), [0, 1])
+
+
+class SerializacionRapidaTest(TestCase):
+    """
+    SerializadorRapido debe producir exactamente los mismos bytes JSON que los
+    serializers de DRF.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        usuario = Usuario.objects.create_user(
+            email='admin@example.com', password='clave-segura-123', nombre='Admin', apellido='Tienda'
+        )
+        cls.categoria = Categoria.objects.create(
+            nombre='Portátiles', descripcion=None, imagen='categorias/portatiles.png'
+        )
+        Categoria.objects.create(nombre='Tablets', descripcion='Tablets y accesorios')
+        for i in range(6):
+            producto = Producto.objects.create(
+                nombre=f'Portátil {i}', descripcion='Portátil ñandú', precio=Decimal('999.9') + i,
+                categoria=cls.categoria, tipo='portatil', stock=i, cantidad_vendida=i * 4,
+                creado_por=usuario if i % 2 else None,
+                imagen_principal=f'productos/{i}.png' if i % 3 else '',
+            )
+            for orden in range(i % 3):
+                ImagenProducto.objects.create(
+                    producto=producto, imagen=f'productos/imagenes/{i}-{orden}.png', orden=orden
+                )
+        Producto.objects.filter(nombre='Portátil 5').update(rating=4.25, total_reviews=4)
+
+    def comparar(self, serializer_class, queryset):
+        request = Request(APIRequestFactory().get(CATALOGO_URL))
+        contexto = {'request': request}
+        esperado = serializer_class(queryset, many=True, context=contexto).data
+        rapido = SerializadorRapido(serializer_class, contexto)
+        obtenido = rapido.serializar(rapido.filas(queryset))
+        self.assertEqual(JSONRenderer().render(obtenido), JSONRenderer().render(esperado))
+
+    def test_productos_identicos(self):
+        queryset = ProductoListSerializer.optimizar_queryset(Producto.objects.order_by('id'))
+        self.comparar(ProductoListSerializer, queryset)
+
+    def test_categorias_identicas(self):
+        self.comparar(CategoriaSerializer, Categoria.objects.order_by('id'))
+
+    def test_listado_identico_al_serializer(self):
+        client = APIClient()
+        with override_settings(RESPONSE_CACHE={'ENABLED': False}):
+            rapida = client.get(CATALOGO_URL, {'ordering': 'precio'}).content
+            with patch.object(ProductoViewSet, 'serializacion_rapida', False):
+                normal = client.get(CATALOGO_URL, {'ordering': 'precio'}).content
+        self.assertEqual(rapida, normal)
+
+
+class ExportacionCatalogoTest(TestCase):
+    """
+    /productos/exportar/ emite el catálogo filtrado completo en NDJSON o JSON,
+    leyendo por bloques.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Accesorios')
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f'Mouse {i}', descripcion='Mouse', precio=Decimal(10 + i % 4),
+                categoria=categoria, tipo='accesorio' if i % 2 else 'componente', stock=i,
+            )
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def exportar(self, params):
+        respuesta = self.client.get(CATALOGO_URL + 'exportar/', params)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta, b''.join(respuesta.streaming_content).decode()
+
+    @patch.object(ProductoViewSet, 'exportar_chunk_size', 4)
+    def test_ndjson_con_filtros_y_orden(self):
+        respuesta, contenido = self.exportar({'tipo': 'accesorio', 'ordering': '-precio'})
+        self.assertTrue(respuesta['Content-Type'].startswith('application/x-ndjson'))
+        productos = [json.loads(linea) for linea in contenido.splitlines()]
+        esperado = list(
+            Producto.objects.filter(tipo='accesorio').order_by('-precio', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual([p['id'] for p in productos], esperado)
+
+    @patch.object(ProductoViewSet, 'exportar_chunk_size', 7)
+    def test_json_igual_al_listado(self):
+        _, contenido = self.exportar({'formato': 'json', 'ordering': 'nombre'})
+        listado = self.client.get(CATALOGO_URL, {'ordering': 'nombre', 'page_size': 100}).json()
+        self.assertEqual(json.loads(contenido), listado['results'])
+
+    def test_formato_invalido(self):
+        respuesta = self.client.get(CATALOGO_URL + 'exportar/', {'formato': 'xml'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ImportacionProductosTest(TestCase):
+    """
+    /productos/importar/ crea y actualiza productos en bloque y reporta las
+    filas inválidas sin abortar la importación.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(
+            email='admin@example.com', password='clave-segura-123', nombre='Admin', apellido='Tienda',
+            roles='admin'
+        )
+        cls.portatiles = Categoria.objects.create(nombre='Portátiles')
+        cls.accesorios = Categoria.objects.create(nombre='Accesorios')
+        cls.existente = Producto.objects.create(
+            nombre='Mouse', descripcion='Mouse', precio=Decimal('10.00'),
+            categoria=cls.accesorios, tipo='accesorio', stock=3,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def importar(self, nombre, contenido, **params):
+        archivo = SimpleUploadedFile(nombre, contenido.encode('utf-8'))
+        url = CATALOGO_URL + 'importar/'
+        if params:
+            url += '?' + '&'.join(f'{clave}={valor}' for clave, valor in params.items())
+        return self.client.post(url, {'archivo': archivo}, format='multipart')
+
+    def test_csv_crea_actualiza_y_reporta_errores(self):
+        contenido = (
+            'id,nombre,descripcion,precio,categoria,tipo,stock\n'
+            ',Portátil X,Equipo,1500.50,portátiles,componente,4\n'
+            f'{self.existente.id},Mouse Pro,Mouse,12.00,Portátiles,accesorio,\n'
+            ',Sin precio,Equipo,-3,Portátiles,componente,1\n'
+            ',Otro,Equipo,10,Inexistente,componente,1\n'
+            '999999,Fantasma,Equipo,10,Accesorios,componente,1\n'
+        )
+        with self.assertNumQueries(9):
+            respuesta = self.importar('productos.csv', contenido)
+        self.assertEqual(respuesta.status_code, 201)
+        datos = respuesta.json()
+        self.assertEqual((datos['filas'], datos['creados'], datos['actualizados']), (5, 1, 1))
+        self.assertEqual(
+            {error['fila']: list(error['errores']) for error in datos['errores']},
+            {4: ['precio'], 5: ['categoria'], 6: ['id']}
+        )
+
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.nombre, self.existente.categoria_id, self.existente.stock),
+                         ('Mouse Pro', self.portatiles.id, 0))
+        nuevo = Producto.objects.get(nombre='Portátil X')
+        self.assertEqual((nuevo.categoria_id, nuevo.creado_por_id, nuevo.es_nuevo),
+                         (self.portatiles.id, self.admin.id, True))
+        self.assertEqual(rollups.verificar_conteo_categorias(), [])
+
+    def test_actualizar_refresca_updated_at(self):
+        antes = timezone.now() - timedelta(days=3)
+        Producto.objects.filter(pk=self.existente.pk).update(updated_at=antes)
+        contenido = (
+            'id,nombre,descripcion,precio,categoria,tipo,stock\n'
+            f'{self.existente.id},Mouse,Mouse,10.00,Accesorios,accesorio,5\n'
+        )
+        self.assertEqual(self.importar('productos.csv', contenido).json()['actualizados'], 1)
+        self.existente.refresh_from_db()
+        self.assertGreater(self.existente.updated_at, antes)
+
+    def test_ndjson_cambio_de_categoria(self):
+        contenido = '\n'.join([
+            json.dumps({'id': self.existente.id, 'nombre': 'Mouse', 'descripcion': 'Mouse',
+                        'precio': '10.00', 'categoria': self.portatiles.id, 'tipo': 'accesorio', 'stock': 3}),
+            '{no es json',
+            '',
+        ])
+        datos = self.importar('productos.ndjson', contenido).json()
+        self.assertEqual((datos['actualizados'], datos['total_errores']), (1, 1))
+        self.assertEqual(datos['errores'][0]['fila'], 2)
+        self.assertEqual(rollups.verificar_conteo_categorias(), [])
+
+    def test_solo_administradores(self):
+        cliente = Usuario.objects.create_user(
+            email='cliente@example.com', password='clave-segura-123', nombre='Ana', apellido='Pérez'
+        )
+        self.client.force_authenticate(cliente)
+        respuesta = self.importar('productos.csv', 'nombre\n')
+        self.assertEqual(respuesta.status_code, 403)
+
+    def test_formato_invalido(self):
+        respuesta = self.importar('productos.xml', '<productos/>', formato='xml')
+        self.assertEqual(respuesta.status_code, 400)
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class BusquedaTextoTest(TestCase):
+    """
+    ?search= usa el backend de búsqueda (IndiceInvertido en SQLite): ignora
+    tildes, exige todas las palabras, ordena por relevancia y se mantiene al
+    día al guardar, borrar o insertar en bloque.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre='Portátiles')
+        cls.gamer = Producto.objects.create(
+            nombre='Portátil Gamer', descripcion='Equipo para juegos', precio=Decimal('3000.00'),
+            categoria=cls.categoria, tipo='componente', stock=2,
+        )
+        cls.oficina = Producto.objects.create(
+            nombre='Equipo de oficina', descripcion='Ideal como portátil de respaldo',
+            precio=Decimal('1200.00'), categoria=cls.categoria, tipo='componente', stock=5,
+        )
+        cls.mouse = Producto.objects.create(
+            nombre='Mouse gamer', descripcion='Óptico', precio=Decimal('50.00'),
+            categoria=cls.categoria, tipo='accesorio', stock=10,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        # Las transacciones de los tests se revierten: el índice se reconstruye
+        busqueda.obtener_backend().invalidar()
+
+    def buscar(self, termino, **params):
+        respuesta = self.client.get(CATALOGO_URL, {'search': termino, **params})
+        self.assertEqual(respuesta.status_code, 200)
+        return [producto['id'] for producto in respuesta.json()['results']]
+
+    def test_tokenizacion(self):
+        self.assertEqual(busqueda.tokenizar('Cámara del Año, ÓPTICA 4K'), ['camara', 'ano', 'optica', '4k'])
+        self.assertEqual(
+            busqueda.BusquedaFullText().consulta_booleana('Portátil de 15 pulgadas'),
+            '+portatil* +pulgadas*'
+        )
+
+    def test_relevancia_tildes_y_prefijos(self):
+        # El nombre pesa más que la descripción
+        self.assertEqual(self.buscar('PORTATIL'), [self.gamer.id, self.oficina.id])
+        self.assertEqual(self.buscar('gam'), [self.gamer.id, self.mouse.id])
+        # Todas las palabras deben aparecer
+        self.assertEqual(self.buscar('portátil gamer'), [self.gamer.id])
+        self.assertEqual(self.buscar('tablet'), [])
+        # ?ordering= tiene prioridad sobre la relevancia
+        self.assertEqual(self.buscar('gamer', ordering='precio'), [self.mouse.id, self.gamer.id])
+
+    def test_actualizacion_incremental(self):
+        self.assertEqual(self.buscar('teclado'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            teclado = Producto.objects.create(
+                nombre='Teclado mecánico', descripcion='RGB', precio=Decimal('80.00'),
+                categoria=self.categoria, tipo='accesorio', stock=4,
+            )
+        self.assertEqual(self.buscar('mecanico'), [teclado.id])
+
+        teclado.nombre = 'Teclado inalámbrico'
+        with self.captureOnCommitCallbacks(execute=True):
+            teclado.save()
+        self.assertEqual(self.buscar('mecanico'), [])
+        self.assertEqual(self.buscar('inalambrico'), [teclado.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            teclado.delete()
+        self.assertEqual(self.buscar('teclado'), [])
+
+        # bulk_create no envía señales: se indexa por id antes de buscar
+        Producto.objects.bulk_create([Producto(
+            nombre='Monitor curvo', descripcion='27 pulgadas', precio=Decimal('900.00'),
+            categoria=self.categoria, tipo='componente', stock=1,
+        )])
+        self.assertEqual(len(self.buscar('monitor')), 1)
+
+    def test_rollback_no_cambia_el_indice(self):
+        self.assertEqual(self.buscar('gamer'), [self.gamer.id, self.mouse.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Producto.objects.filter(pk=self.mouse.pk).get().delete()
+                self.gamer.nombre = 'Portátil liviano'
+                self.gamer.save()
+                transaction.set_rollback(True)
+        self.assertEqual(self.buscar('liviano'), [])
+        self.assertEqual(self.buscar('gamer'), [self.gamer.id, self.mouse.id])
+
+    def test_tope_de_resultados_explicito(self):
+        respuesta = self.client.get(CATALOGO_URL, {'search': 'gamer'}).json()
+        self.assertNotIn('busqueda_limitada', respuesta)
+        with patch.object(busqueda.obtener_backend(), 'max_resultados', 1):
+            respuesta = self.client.get(CATALOGO_URL, {'search': 'gamer'}).json()
+            cursor = self.client.get(CATALOGO_URL, {'search': 'gamer', 'paginacion': 'cursor'}).json()
+            completa = self.client.get(CATALOGO_URL, {'search': 'portátil gamer'}).json()
+        self.assertEqual((respuesta['count'], respuesta['busqueda_limitada']), (1, 1))
+        self.assertEqual([p['id'] for p in respuesta['results']], [self.gamer.id])
+        self.assertEqual(cursor['busqueda_limitada'], 1)
+        self.assertNotIn('busqueda_limitada', completa)
+
+    def test_paginacion_cursor_con_busqueda(self):
+        respuesta = self.client.get(CATALOGO_URL, {'search': 'gamer', 'paginacion': 'cursor', 'page_size': 1})
+        self.assertEqual(respuesta.status_code, 200)
+        siguiente = self.client.get(respuesta.json()['next']).json()
+        ids = [respuesta.json()['results'][0]['id'], siguiente['results'][0]['id']]
+        self.assertEqual(sorted(ids), sorted([self.gamer.id, self.mouse.id]))
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class FacetasTest(TestCase):
+    """
+    /productos/facetas/ retorna todos los conteos en una respuesta, respetando
+    los filtros y la búsqueda del listado.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.portatiles = Categoria.objects.create(nombre='Portátiles')
+        cls.accesorios = Categoria.objects.create(nombre='Accesorios')
+        datos = [
+            ('Portátil A', cls.portatiles, 'portatil', '1500.00', 3),
+            ('Portátil B', cls.portatiles, 'portatil', '999.99', 0),
+            ('Mouse', cls.accesorios, 'accesorio', '20.00', 10),
+            ('Teclado', cls.accesorios, 'accesorio', '100.00', 0),
+            ('Monitor', cls.accesorios, 'componente', '7500.00', 1),
+        ]
+        Producto.objects.bulk_create([
+            Producto(nombre=nombre, descripcion=nombre, categoria=categoria, tipo=tipo,
+                     precio=Decimal(precio), stock=stock)
+            for nombre, categoria, tipo, precio, stock in datos
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        busqueda.obtener_backend().invalidar()
+
+    def facetas(self, **params):
+        respuesta = self.client.get(CATALOGO_URL + 'facetas/', params)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_conteos(self):
+        datos = self.facetas()
+        self.assertEqual(datos['total'], 5)
+        self.assertEqual(
+            [(c['nombre'], c['cantidad']) for c in datos['categoria']],
+            [('Accesorios', 3), ('Portátiles', 2)]
+        )
+        tipos = {t['valor']: t['cantidad'] for t in datos['tipo']}
+        self.assertEqual((tipos['portatil'], tipos['accesorio'], tipos['componente'], tipos['tablet']), (2, 2, 1, 0))
+        self.assertEqual(
+            [(r['desde'], r['hasta'], r['cantidad']) for r in datos['precio']],
+            [(0, 100, 1), (100, 500, 1), (500, 1000, 1), (1000, 2000, 1), (2000, 5000, 0), (5000, None, 1)]
+        )
+        self.assertEqual(datos['stock'], {'disponible': 3, 'agotado': 2})
+
+    def test_respeta_filtros_y_busqueda(self):
+        datos = self.facetas(categoria=self.portatiles.id, stock__gte=1)
+        self.assertEqual(datos['total'], 1)
+        self.assertEqual(datos['stock'], {'disponible': 1, 'agotado': 0})
+
+        datos = self.facetas(search='portatil')
+        self.assertEqual(datos['total'], 2)
+        self.assertEqual([c['id'] for c in datos['categoria']], [self.portatiles.id])
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False}, FEEDS={'TAMANO': 3})
+class FeedsTest(TestCase):
+    """
+    Los feeds de nuevos/mas_vendidos se mantienen incrementalmente y siempre
+    coinciden con la consulta ordenada equivalente.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.portatiles = Categoria.objects.create(nombre='Portátiles')
+        cls.accesorios = Categoria.objects.create(nombre='Accesorios')
+
+    def setUp(self):
+        self.client = APIClient()
+        limpiar_feeds()
+        self.productos = [self.crear(f'Producto {i}', self.portatiles, vendidos=i * 10) for i in range(5)]
+        feeds.reiniciar_metricas()
+        feeds.reconstruir()
+
+    def crear(self, nombre, categoria, vendidos=0):
+        return Producto.objects.create(
+            nombre=nombre, descripcion=nombre, precio=Decimal('100.00'), categoria=categoria,
+            tipo='portatil', stock=1, cantidad_vendida=vendidos,
+        )
+
+    def assertFeedsConsistentes(self):
+        for nombre in feeds.FEEDS:
+            for ambito in (feeds.GLOBAL, self.portatiles.id, self.accesorios.id):
+                queryset = Producto.objects.all()
+                if ambito != feeds.GLOBAL:
+                    queryset = queryset.filter(categoria_id=ambito)
+                esperado = list(queryset.order_by(*feeds.orden(nombre)).values_list('id', flat=True)[:3])
+                with self.subTest(feed=nombre, ambito=ambito):
+                    self.assertEqual(feeds.ids(nombre, ambito), esperado)
+
+    def test_endpoints_leen_el_feed(self):
+        respuesta = self.client.get(CATALOGO_URL + 'mas_vendidos/', {'limit': 2})
+        self.assertEqual([p['id'] for p in respuesta.json()], [self.productos[4].id, self.productos[3].id])
+        respuesta = self.client.get(CATALOGO_URL + 'nuevos/', {'categoria': 'accesorios'})
+        self.assertEqual(respuesta.json(), [])
+        # limit mayor al feed: consulta ordenada directa
+        respuesta = self.client.get(CATALOGO_URL + 'nuevos/', {'limit': 5})
+        self.assertEqual([p['id'] for p in respuesta.json()], [p.id for p in reversed(self.productos)])
+
+    def test_nuevos_solo_de_los_ultimos_dias(self):
+        viejo = self.productos[4]
+        Producto.objects.filter(pk=viejo.pk).update(created_at=timezone.now() - timedelta(days=40))
+        feeds.reconstruir(['nuevos'])
+        esperado = list(Producto.objects.nuevos().order_by('-created_at').values_list('id', flat=True))
+        for limit in (3, 10):
+            with self.subTest(limit=limit):
+                respuesta = self.client.get(CATALOGO_URL + 'nuevos/', {'limit': limit})
+                self.assertEqual([p['id'] for p in respuesta.json()], esperado[:limit])
+        self.assertNotIn(viejo.id, esperado)
+
+    def test_limit_invalido_o_excesivo(self):
+        for limit in ('abc', '-1', '0', '00', '', '²'):
+            with self.subTest(limit=limit):
+                respuesta = self.client.get(CATALOGO_URL + 'mas_vendidos/', {'limit': limit})
+                self.assertEqual(respuesta.status_code, 400)
+        with patch.object(feeds, 'LIMITE_MAXIMO', 2):
+            respuesta = self.client.get(CATALOGO_URL + 'nuevos/', {'limit': 1000})
+        self.assertEqual(len(respuesta.json()), 2)
+
+    def test_actualizacion_incremental(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = self.crear('Mouse', self.accesorios)
+        self.assertEqual(feeds.ids('nuevos')[0], nuevo.id)
+        self.assertEqual(feeds.ids('nuevos', self.accesorios.id), [nuevo.id])
+
+        # La venta lo sube en mas_vendidos sin recalcular el ámbito
+        with self.assertNumQueries(2), self.captureOnCommitCallbacks(execute=True):
+            rollups.registrar_venta(nuevo.id, 35)
+        self.assertEqual(feeds.ids('mas_vendidos')[1], nuevo.id)
+        self.assertEqual(feeds.metricas()['recalculos_ambito'], 0)
+
+        # Cambio de categoría
+        nuevo.refresh_from_db()
+        nuevo.categoria = self.portatiles
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.save()
+        self.assertEqual(feeds.ids('nuevos', self.accesorios.id), [])
+        self.assertFeedsConsistentes()
+
+    def test_salida_de_feed_lleno_recalcula(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.productos[4].delete()
+            rollups.registrar_venta(self.productos[3].id, -25)
+        self.assertGreater(feeds.metricas()['recalculos_ambito'], 0)
+        self.assertFeedsConsistentes()
+
+    def test_rollback_no_cambia_los_feeds(self):
+        guardados = {
+            (nombre, ambito): feeds.ids(nombre, ambito)
+            for nombre in feeds.FEEDS for ambito in (feeds.GLOBAL, self.portatiles.id, self.accesorios.id)
+        }
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                self.crear('Mouse', self.accesorios)
+                rollups.registrar_venta(self.productos[0].id, 100)
+                Producto.objects.get(pk=self.productos[4].pk).delete()
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        for (nombre, ambito), ids in guardados.items():
+            with self.subTest(feed=nombre, ambito=ambito):
+                self.assertEqual(feeds.ids(nombre, ambito), ids)
+        self.assertEqual(feeds.metricas()['actualizaciones'], 0)
+
+    def test_metricas(self):
+        datos = feeds.metricas()
+        self.assertEqual(datos['reconstrucciones'], 1)
+        self.assertGreaterEqual(datos['edad_s']['nuevos'], 0)
+        self.assertEqual(datos['actualizaciones'], 0)
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class NovedadProductoTest(TestCase):
+    """
+    La novedad se consulta por rango de created_at; el flag es_nuevo se
+    sincroniza por bloques con barrer_es_nuevo.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Portátiles')
+        cls.viejos = [
+            Producto.objects.create(
+                nombre=f'Viejo {i}', descripcion='Viejo', precio=Decimal('100.00'),
+                categoria=categoria, tipo='portatil', stock=1,
+            )
+            for i in range(3)
+        ]
+        Producto.objects.filter(pk__in=[p.pk for p in cls.viejos]).update(
+            created_at=timezone.now() - timedelta(days=45)
+        )
+        # bulk_create no pasa por save(): queda con es_nuevo=False
+        cls.reciente = Producto.objects.bulk_create([Producto(
+            nombre='Reciente', descripcion='Reciente', precio=Decimal('100.00'),
+            categoria=categoria, tipo='portatil', stock=1,
+        )])[0]
+
+    def test_filtro_por_rango(self):
+        client = APIClient()
+        nuevos = client.get(CATALOGO_URL, {'es_nuevo': 'true'}).json()['results']
+        self.assertEqual([p['id'] for p in nuevos], [self.reciente.id])
+        viejos = client.get(CATALOGO_URL, {'es_nuevo': 'false'}).json()['results']
+        self.assertEqual(len(viejos), 3)
+
+    def test_save_no_recalcula(self):
+        viejo = Producto.objects.get(pk=self.viejos[0].pk)
+        viejo.stock = 5
+        viejo.save()
+        self.assertTrue(Producto.objects.get(pk=viejo.pk).es_nuevo)
+
+    def test_barrido_por_bloques(self):
+        self.assertEqual(rollups.barrer_es_nuevo(chunk_size=2), {'desmarcados': 3, 'marcados': 1})
+        self.assertEqual(
+            set(Producto.objects.filter(es_nuevo=True).values_list('id', flat=True)), {self.reciente.id}
+        )
+        with self.assertNumQueries(2):
+            self.assertEqual(rollups.barrer_es_nuevo(), {'desmarcados': 0, 'marcados': 0})
+
+
+class ReservasStockTest(TestCase):
+    """
+    reservar/confirmar/liberar descuentan y devuelven stock con UPDATE
+    condicionales por lotes: todo o nada y sin doble devolución.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(
+            email='cliente@example.com', password='clave-segura-123', nombre='Cliente', apellido='Tienda'
+        )
+        categoria = Categoria.objects.create(nombre='Accesorios')
+        cls.mouse, cls.teclado = [
+            Producto.objects.create(
+                nombre=nombre, descripcion=nombre, precio=Decimal('10.00'),
+                categoria=categoria, tipo='accesorio', stock=stock,
+            )
+            for nombre, stock in (('Mouse', 5), ('Teclado', 2))
+        ]
+
+    def stock(self, producto):
+        return Producto.objects.get(pk=producto.pk).stock
+
+    def test_reserva_varias_lineas_en_un_update(self):
+        # SAVEPOINT, UPDATE de stock, INSERT de la reserva, INSERT de las líneas, RELEASE
+        with self.assertNumQueries(5):
+            reserva = reservas.reservar([(self.mouse.pk, 2), (self.teclado.pk, 1), (self.mouse.pk, 1)])
+        self.assertEqual((self.stock(self.mouse), self.stock(self.teclado)), (2, 1))
+        self.assertEqual(
+            dict(reserva.items.values_list('producto_id', 'cantidad')), {self.mouse.pk: 3, self.teclado.pk: 1}
+        )
+
+    def test_reserva_invalida_la_cache_del_catalogo(self):
+        url = f'{CATALOGO_URL}{self.mouse.pk}/'
+        cliente = APIClient()
+        cliente.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            reservas.reservar([(self.mouse.pk, 2)])
+        respuesta = cliente.get(url)
+        self.assertEqual(respuesta['X-Cache'], 'MISS')
+        self.assertEqual(respuesta.json()['stock'], 3)
+
+    def test_sin_stock_no_reserva_nada(self):
+        with self.assertRaises(reservas.StockInsuficiente) as contexto:
+            reservas.reservar([(self.mouse.pk, 1), (self.teclado.pk, 3)])
+        self.assertEqual(
+            contexto.exception.faltantes, [{'producto': self.teclado.pk, 'solicitado': 3, 'disponible': 2}]
+        )
+        self.assertEqual((self.stock(self.mouse), self.stock(self.teclado)), (5, 2))
+        self.assertFalse(ReservaStock.objects.exists())
+
+    def test_liberar_devuelve_una_sola_vez(self):
+        reserva = reservas.reservar([(self.mouse.pk, 4)])
+        reservas.liberar(reserva)
+        self.assertEqual(self.stock(self.mouse), 5)
+        with self.assertRaises(reservas.ReservaNoActiva):
+            reservas.liberar(reserva)
+        with self.assertRaises(reservas.ReservaNoActiva):
+            reservas.confirmar(reserva)
+        self.assertEqual(self.stock(self.mouse), 5)
+
+    def test_confirmar_mantiene_el_descuento(self):
+        reserva = reservas.confirmar(reservas.reservar([(self.teclado.pk, 2)]))
+        self.assertEqual(reserva.estado, EstadoReserva.CONFIRMADA)
+        self.assertEqual(self.stock(self.teclado), 0)
+        with self.assertRaises(reservas.ReservaNoActiva):
+            reservas.liberar(reserva)
+
+    def test_vencidas_devuelven_stock(self):
+        vencidas = [reservas.reservar([(self.mouse.pk, 1), (self.teclado.pk, 1)], ttl=0) for _ in range(2)]
+        vigente = reservas.reservar([(self.mouse.pk, 1)])
+        self.assertEqual(reservas.liberar_vencidas(chunk_size=1), 2)
+        self.assertEqual((self.stock(self.mouse), self.stock(self.teclado)), (4, 2))
+        self.assertEqual(
+            set(ReservaStock.objects.filter(estado=EstadoReserva.VENCIDA).values_list('pk', flat=True)),
+            {reserva.pk for reserva in vencidas}
+        )
+        with self.assertRaises(reservas.ReservaNoActiva):
+            reservas.confirmar(vencidas[0])
+        reservas.confirmar(vigente)
+
+    def test_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        url = '/ecommerce/api/v1/reservas/'
+        respuesta = client.post(url, {'items': [{'producto': self.teclado.pk, 'cantidad': 3}]}, format='json')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json()['faltantes'][0]['disponible'], 2)
+
+        respuesta = client.post(url, {'items': [{'producto': self.mouse.pk, 'cantidad': 2}]}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        token = respuesta.json()['token']
+        self.assertEqual(client.post(f'{url}{token}/confirmar/').status_code, 403)
+        self.assertEqual(client.post(f'{url}{token}/liberar/').json()['estado'], 'liberada')
+        self.assertEqual(client.post(f'{url}{token}/liberar/').status_code, 409)
+        self.assertEqual(self.stock(self.mouse), 5)
+
+
+class ReservasConcurrentesTest(TransactionTestCase):
+    """
+    Varios hilos compiten por el stock: nunca hay sobreventa. En SQLite
+    muchos intentos fallan por bloqueo de la base (se cuentan como errores y
+    no retienen stock); el stock igual debe cuadrar.
+    """
+    def test_sin_sobreventa(self):
+        categoria = Categoria.objects.create(nombre='Concurrencia')
+        producto_ids = [
+            Producto.objects.create(
+                nombre=f'Producto {i}', descripcion='', precio=Decimal('10.00'),
+                categoria=categoria, tipo='accesorio', stock=20,
+            ).pk
+            for i in range(3)
+        ]
+        resultado = estresar_reservas(producto_ids, hilos=6, intentos=30)
+        self.assertGreater(resultado['reservas'], 0)
+        finales = dict(Producto.objects.filter(pk__in=producto_ids).values_list('id', 'stock'))
+        for producto_id in producto_ids:
+            self.assertGreaterEqual(finales[producto_id], 0)
+            self.assertEqual(finales[producto_id], 20 - resultado['retenido'].get(producto_id, 0))
+
+
+class PedidosTest(TestCase):
+    """
+    Crear un pedido cuesta las mismas sentencias con 1 o 10 líneas y deja
+    stock, ventas y líneas consistentes en una sola transacción.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario, cls.otro = [
+            Usuario.objects.create_user(
+                email=f'{nombre}@example.com', password='clave-segura-123', nombre=nombre, apellido='Tienda'
+            )
+            for nombre in ('cliente', 'otro')
+        ]
+        categoria = Categoria.objects.create(nombre='Accesorios')
+        cls.productos = [
+            Producto.objects.create(
+                nombre=f'Producto {i}', descripcion='', precio=Decimal('10.00') + i,
+                categoria=categoria, tipo='accesorio', stock=5,
+            )
+            for i in range(10)
+        ]
+
+    def setUp(self):
+        limpiar_feeds()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_pedido_de_diez_lineas(self):
+        lineas = [(producto.pk, 2) for producto in self.productos]
+        # SAVEPOINT, SELECT de productos, UPDATE de stock, INSERT pedido,
+        # INSERT de las líneas, UPDATE de ventas, RELEASE
+        with self.assertNumQueries(7), self.captureOnCommitCallbacks(execute=False):
+            pedido = pedidos.crear_pedido(self.usuario, lineas)
+        self.assertEqual(pedido.total, sum((Decimal('10.00') + i) * 2 for i in range(10)))
+        self.assertEqual(pedido.items.count(), 10)
+        self.assertEqual(set(Producto.objects.values_list('stock', 'cantidad_vendida')), {(3, 2)})
+        self.assertEqual(rollups.verificar_rollups(), [])
+
+    def test_sin_stock_no_crea_nada(self):
+        with self.assertRaises(reservas.StockInsuficiente):
+            pedidos.crear_pedido(self.usuario, [(self.productos[0].pk, 1), (self.productos[1].pk, 6)])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(set(Producto.objects.values_list('stock', 'cantidad_vendida')), {(5, 0)})
+
+    def test_ventas_actualizan_feed_al_confirmar(self):
+        feeds.reconstruir(['mas_vendidos'])
+        with self.captureOnCommitCallbacks(execute=True):
+            pedidos.crear_pedido(self.usuario, [(self.productos[7].pk, 4)])
+        self.assertEqual(feeds.ids('mas_vendidos')[0], self.productos[7].pk)
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True})
+    def test_ventas_invalidan_la_cache_al_confirmar(self):
+        url = f'{CATALOGO_URL}{self.productos[2].pk}/'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            rollups.registrar_ventas({self.productos[2].pk: 3})
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta['X-Cache'], 'MISS')
+        self.assertEqual(respuesta.json()['cantidad_vendida'], 3)
+
+    def test_crear_desde_reserva(self):
+        reserva = reservas.reservar([(self.productos[0].pk, 3)], usuario=self.usuario)
+        respuesta = self.client.post(
+            '/ecommerce/api/v1/pedidos/', {'reserva': str(reserva.token)}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['items'][0]['cantidad'], 3)
+        self.assertEqual(Producto.objects.get(pk=self.productos[0].pk).stock, 2)
+        self.assertEqual(ReservaStock.objects.get(pk=reserva.pk).estado, EstadoReserva.CONFIRMADA)
+        # La reserva ya se usó
+        respuesta = self.client.post(
+            '/ecommerce/api/v1/pedidos/', {'reserva': str(reserva.token)}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 409)
+
+    def test_endpoint_valida_lineas(self):
+        url = '/ecommerce/api/v1/pedidos/'
+        self.assertEqual(self.client.post(url, {}, format='json').status_code, 400)
+        respuesta = self.client.post(url, {'items': [{'producto': 999999, 'cantidad': 1}]}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        respuesta = self.client.post(url, {'items': [{'producto': self.productos[0].pk, 'cantidad': 9}]}, format='json')
+        self.assertEqual(respuesta.status_code, 409)
+
+    def test_historial_por_keyset(self):
+        for producto in self.productos[:5]:
+            pedidos.crear_pedido(self.usuario, [(producto.pk, 1)])
+        pedidos.crear_pedido(self.otro, [(self.productos[9].pk, 1)])
+        ids, url = [], '/ecommerce/api/v1/pedidos/?page_size=2'
+        while url:
+            datos = self.client.get(url).json()
+            ids += [pedido['id'] for pedido in datos['results']]
+            url = datos['next']
+        propios = Order.objects.filter(usuario=self.usuario).order_by('-created_at', '-id')
+        self.assertEqual(ids, list(propios.values_list('id', flat=True)))
+
+
+class ValoracionesTest(TestCase):
+    """
+    Las escrituras de valoraciones mantienen rating/total_reviews con el
+    promedio acumulado (sin re-promediar) y verificar_rollups detecta y
+    corrige las diferencias.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [
+            Usuario.objects.create_user(
+                email=f'cliente{i}@example.com', password='clave-segura-123', nombre=f'Cliente {i}', apellido='Tienda'
+            )
+            for i in range(3)
+        ]
+        categoria = Categoria.objects.create(nombre='Accesorios')
+        cls.producto = Producto.objects.create(
+            nombre='Mouse', descripcion='Mouse', precio=Decimal('10.00'), categoria=categoria, tipo='accesorio', stock=1,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def valorar(self, usuario, puntuacion):
+        self.client.force_authenticate(usuario)
+        return self.client.post(
+            '/ecommerce/api/v1/valoraciones/', {'producto': self.producto.pk, 'puntuacion': puntuacion}, format='json'
+        )
+
+    def rollup(self):
+        producto = Producto.objects.get(pk=self.producto.pk)
+        return round(producto.rating, 6), producto.total_reviews
+
+    def test_promedio_incremental(self):
+        ids = [self.valorar(usuario, puntuacion).json()['id'] for usuario, puntuacion in zip(self.usuarios, (5, 4, 3))]
+        self.assertEqual(self.rollup(), (4.0, 3))
+
+        self.client.force_authenticate(self.usuarios[2])
+        self.client.patch(f'/ecommerce/api/v1/valoraciones/{ids[2]}/', {'puntuacion': 1}, format='json')
+        self.assertEqual(self.rollup(), (round(10 / 3, 6), 3))
+
+        self.client.delete(f'/ecommerce/api/v1/valoraciones/{ids[2]}/')
+        self.assertEqual(self.rollup(), (4.5, 2))
+        Valoracion.objects.all().delete()
+        self.assertEqual(self.rollup(), (0.0, 0))
+        self.assertEqual(rollups.verificar_rollups(), [])
+
+    def test_una_valoracion_por_usuario(self):
+        self.assertEqual(self.valorar(self.usuarios[0], 5).status_code, 201)
+        self.assertEqual(self.valorar(self.usuarios[0], 1).status_code, 400)
+        self.assertEqual(self.valorar(self.usuarios[1], 6).status_code, 400)
+        self.assertEqual(self.rollup(), (5.0, 1))
+
+    def test_solo_el_autor_edita(self):
+        valoracion_id = self.valorar(self.usuarios[0], 5).json()['id']
+        self.client.force_authenticate(self.usuarios[1])
+        respuesta = self.client.patch(f'/ecommerce/api/v1/valoraciones/{valoracion_id}/', {'puntuacion': 1}, format='json')
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertEqual(self.rollup(), (5.0, 1))
+
+    def test_listado_por_keyset(self):
+        for usuario, puntuacion in zip(self.usuarios, (5, 4, 3)):
+            self.valorar(usuario, puntuacion)
+        self.client.force_authenticate(None)
+        url = f'{CATALOGO_URL}{self.producto.pk}/valoraciones/?page_size=2'
+        ids = []
+        while url:
+            datos = self.client.get(url).json()
+            ids += [valoracion['id'] for valoracion in datos['results']]
+            url = datos['next']
+        self.assertEqual(ids, list(Valoracion.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+        self.assertEqual(self.client.get(f'{CATALOGO_URL}999999/valoraciones/').status_code, 404)
+
+    def test_mas_vendidos_al_confirmar(self):
+        limpiar_feeds()
+        feeds.reconstruir(['mas_vendidos'])
+        guardado = feeds.leer('mas_vendidos')['entradas']
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Valoracion.objects.create(producto=self.producto, usuario=self.usuarios[0], puntuacion=5)
+                transaction.set_rollback(True)
+        self.assertEqual(feeds.leer('mas_vendidos')['entradas'], guardado)
+        with self.captureOnCommitCallbacks(execute=True):
+            Valoracion.objects.create(producto=self.producto, usuario=self.usuarios[0], puntuacion=4)
+        self.assertEqual(feeds.leer('mas_vendidos')['entradas'], [(0, 4.0, self.producto.pk)])
+
+    def test_verificar_y_corregir(self):
+        for usuario, puntuacion in zip(self.usuarios, (5, 4, 3)):
+            self.valorar(usuario, puntuacion)
+        Producto.objects.filter(pk=self.producto.pk).update(rating=1.0, total_reviews=7)
+        self.assertEqual({d['campo'] for d in rollups.verificar_rollups()}, {'rating', 'total_reviews'})
+        call_command('verificar_rollups', '--corregir', stdout=io.StringIO())
+        self.assertEqual(self.rollup(), (4.0, 3))
+        self.assertEqual(rollups.verificar_rollups(), [])
+
+
+@override_settings(
+    RESPONSE_CACHE={'ENABLED': False},
+    INSTRUMENTACION={'SERVER_TIMING': True, 'UMBRAL_LENTO_MS': None, 'UMBRAL_CONSULTA_LENTA_MS': None},
+)
+class InstrumentacionTest(TestCase):
+    """
+    InstrumentacionMiddleware mide cada request por vista y acción resuelta.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Accesorios')
+        cls.producto = Producto.objects.create(
+            nombre='Mouse', descripcion='Mouse', precio=Decimal('10.00'), categoria=categoria, tipo='accesorio', stock=1,
+        )
+
+    def setUp(self):
+        limpiar_feeds()
+        instrumentacion.reiniciar_estadisticas()
+
+    def test_server_timing_y_estadisticas_por_accion(self):
+        respuesta = APIClient().get(CATALOGO_URL)
+        header = respuesta['Server-Timing']
+        # Mismas consultas que fija CantidadConsultasTest: COUNT + página
+        self.assertIn('desc="2 consultas"', header)
+        for fase in ('db;dur=', 'serializacion;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(fase, header)
+
+        APIClient().get(f'{CATALOGO_URL}{self.producto.pk}/')
+        APIClient().get(f'{CATALOGO_URL}{self.producto.pk}/')
+        datos = instrumentacion.estadisticas()
+        self.assertEqual(datos['ProductoViewSet.list']['consultas_media'], 2)
+        self.assertEqual(datos['ProductoViewSet.retrieve']['requests'], 2)
+        self.assertEqual(sum(datos['ProductoViewSet.retrieve']['buckets'].values()), 2)
+
+    def test_vistas_sin_viewset_y_sin_ruta(self):
+        APIClient().post('/ecommerce/api/v1/login/', {}, format='json')
+        APIClient().get('/no-existe/')
+        self.assertEqual(set(instrumentacion.estadisticas()), {'LoginView.post', 'sin_ruta'})
+
+    def test_umbrales_registran_lentos(self):
+        config = {'UMBRAL_LENTO_MS': 0, 'UMBRAL_CONSULTA_LENTA_MS': 0}
+        with override_settings(INSTRUMENTACION=config), \
+                self.assertLogs('apiEcommerceComputerApp.instrumentacion', 'WARNING') as logs:
+            respuesta = APIClient().get(f'{CATALOGO_URL}{self.producto.pk}/')
+        self.assertNotIn('Server-Timing', respuesta)
+        self.assertTrue(any('Consulta lenta' in linea and 'ProductoViewSet.retrieve' in linea for linea in logs.output))
+        self.assertTrue(any('Request lento' in linea for linea in logs.output))
+        self.assertEqual(instrumentacion.estadisticas()['ProductoViewSet.retrieve']['lentos'], 1)
+
+
+class MetricasTest(TestCase):
+    """
+    /metrics expone el registro de metricas.py en formato de Prometheus.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Accesorios')
+        cls.producto = Producto.objects.create(
+            nombre='Mouse', descripcion='Mouse', precio=Decimal('10.00'), categoria=categoria, tipo='accesorio', stock=1,
+        )
+
+    def setUp(self):
+        limpiar_feeds()
+        metricas.reiniciar()
+
+    def test_exposicion_de_requests_latencia_y_errores(self):
+        APIClient().get(f'{CATALOGO_URL}{self.producto.pk}/')
+        APIClient().get(f'{CATALOGO_URL}999999/')
+        respuesta = APIClient().get('/metrics')
+        self.assertEqual(respuesta['Content-Type'], metricas.CONTENT_TYPE)
+        texto = respuesta.content.decode()
+
+        self.assertIn('# TYPE http_requests_total counter', texto)
+        self.assertIn('http_requests_total{vista="ProductoViewSet.retrieve",metodo="GET",estado="2xx"} 1', texto)
+        self.assertIn('http_requests_total{vista="ProductoViewSet.retrieve",metodo="GET",estado="4xx"} 1', texto)
+        self.assertIn('http_request_errors_total{vista="ProductoViewSet.retrieve",codigo="404"} 1', texto)
+        self.assertIn('http_request_duration_seconds_bucket{vista="ProductoViewSet.retrieve",le="+Inf"} 2', texto)
+        self.assertIn('http_request_duration_seconds_count{vista="ProductoViewSet.retrieve"} 2', texto)
+        self.assertIn('response_cache_requests_total{endpoint=', texto)
+        # El request a /metrics sigue en curso mientras se expone
+        self.assertIn('http_requests_in_progress 1', texto)
+
+    def test_buckets_acumulados_y_etiquetas_escapadas(self):
+        histograma = metricas.LATENCIA
+        histograma.observe(0.003, vista='a"b')
+        histograma.observe(0.2, vista='a"b')
+        histograma.observe(60, vista='a"b')
+        texto = metricas.exponer()
+        self.assertIn('http_request_duration_seconds_bucket{vista="a\\"b",le="0.005"} 1', texto)
+        self.assertIn('http_request_duration_seconds_bucket{vista="a\\"b",le="0.25"} 2', texto)
+        self.assertIn('http_request_duration_seconds_bucket{vista="a\\"b",le="5.0"} 2', texto)
+        self.assertIn('http_request_duration_seconds_bucket{vista="a\\"b",le="+Inf"} 3', texto)
+        with self.assertRaises(ValueError):
+            histograma.observe(1)
+
+    def test_token(self):
+        with override_settings(METRICAS={'TOKEN': 'secreto'}):
+            self.assertEqual(APIClient().get('/metrics').status_code, 401)
+            respuesta = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_agrega_procesos_desde_el_directorio(self):
+        with tempfile.TemporaryDirectory() as directorio, override_settings(METRICAS={'DIRECTORIO': directorio}):
+            metricas.REQUESTS.inc(vista='v', metodo='GET', estado='2xx')
+            metricas.EN_CURSO.inc()
+            # Un worker vivo (el proceso padre) y uno ya terminado: del
+            # terminado se suma el contador pero no el gauge
+            filas = [
+                ['http_requests_total', [['vista', 'v'], ['metodo', 'GET'], ['estado', '2xx']], 4],
+                ['http_requests_in_progress', [], 2],
+            ]
+            for pid in (os.getppid(), 2 ** 22 + 1):
+                with open(os.path.join(directorio, f'metricas-{pid}.json'), 'w') as archivo:
+                    json.dump(filas, archivo)
+            texto = metricas.exponer()
+        self.assertIn('http_requests_total{vista="v",metodo="GET",estado="2xx"} 9', texto)
+        self.assertIn('http_requests_in_progress 3', texto)
+
+    def test_duracion_de_reconstruccion_de_feeds(self):
+        with tempfile.TemporaryDirectory() as directorio, override_settings(METRICAS={'DIRECTORIO': directorio}):
+            call_command('reconstruir_feeds', feed=['nuevos'], stdout=io.StringIO())
+            # El comando de cron es otro proceso, ya terminado cuando se consulta /metrics
+            os.replace(
+                os.path.join(directorio, f'metricas-{os.getpid()}.json'),
+                os.path.join(directorio, f'metricas-{2 ** 22 + 1}.json'),
+            )
+            metricas.reiniciar()
+            texto = APIClient().get('/metrics').content.decode()
+        self.assertIn('# TYPE feed_refresh_seconds histogram', texto)
+        self.assertIn('feed_refresh_seconds_count{feed="nuevos",tipo="completo"} 1', texto)
+        # Global y la categoría
+        self.assertIn('feed_refresh_seconds_count{feed="nuevos",tipo="ambito"} 2', texto)
+        self.assertNotIn('feed="mas_vendidos"', texto)
+
+    def test_volcados_concurrentes(self):
+        with tempfile.TemporaryDirectory() as directorio, \
+                override_settings(METRICAS={'DIRECTORIO': directorio, 'INTERVALO_S': 3600}):
+            metricas.REQUESTS.inc(vista='v', metodo='GET', estado='2xx')
+            # Con el intervalo vigente, una estampida de incrementos no vuelca
+            with patch.object(metricas._almacen, 'volcar') as volcar:
+                rafaga(20, lambda i: metricas.REQUESTS.inc(vista='v', metodo='GET', estado='2xx'))
+            volcar.assert_not_called()
+            # /metrics concurrentes: cada volcado publica un archivo completo
+            rafaga(20, lambda i: metricas.valores_agregados())
+            self.assertEqual(os.listdir(directorio), [f'metricas-{os.getpid()}.json'])
+            with open(os.path.join(directorio, f'metricas-{os.getpid()}.json')) as archivo:
+                filas = json.load(archivo)
+        self.assertIn(['http_requests_total', [['vista', 'v'], ['metodo', 'GET'], ['estado', '2xx']], 21], filas)
+
+
+class ConexionesRetenidasTest(TransactionTestCase):
+    """
+    db_connections_held cuenta las conexiones abiertas ahora, también las de
+    hilos que ya terminaron (vistas síncronas bajo ASGI) hasta que se liberan.
+    """
+    CLAVE = ('db_connections_held', (('alias', 'default'),))
+
+    def abiertas(self):
+        metricas.actualizar_conexiones()
+        return metricas._almacen.copia()[self.CLAVE]
+
+    def test_hilos_terminados(self):
+        inicial = self.abiertas()
+        durante = []
+
+        def consultar(i):
+            self.assertEqual(APIClient().get(CATALOGO_URL).status_code, 200)
+            durante.append(self.abiertas())
+
+        # Cada request en un hilo que termina, con la conexión abierta al
+        # final del request (CONN_MAX_AGE > 0)
+        with patch.dict(connections.settings['default'], {'CONN_MAX_AGE': 60}):
+            rafaga(4, consultar)
+        self.assertGreater(max(durante), inicial)
+        gc.collect()
+        self.assertEqual(self.abiertas(), inicial)
+        self.assertIn('db_connections_held{alias="default"} %d' % inicial, metricas.exponer())
+
+
+class BenchmarkApiTest(TestCase):
+    """
+    benchmark_api escribe un JSON comparable entre corridas y marca regresiones.
+    """
+    def test_corrida_y_comparacion(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'base.json')
+            opciones = {
+                'productos': 30, 'categorias': 3, 'repeticiones': 3, 'sin_http': True,
+                'escenarios': ['productos_lista', 'productos_detalle', 'categorias_lista'],
+                'stdout': io.StringIO(),
+            }
+            call_command('benchmark_api', salida=ruta, **opciones)
+            with open(ruta) as archivo:
+                corrida = json.load(archivo)
+            # Tolerancia amplia: solo deben contar consultas y errores
+            call_command('benchmark_api', comparar=ruta, tolerancia=100, **opciones)
+
+        detalle = corrida['resultados']['productos_detalle']['cliente']
+        self.assertEqual(detalle['n'], 3)
+        self.assertEqual(detalle['errores'], 0)
+        self.assertEqual(detalle['consultas'], 2)
+        self.assertEqual(corrida['meta']['productos'], 30)
+        # Los datos sintéticos se borran al terminar
+        self.assertFalse(Producto.objects.exists())
+        self.assertFalse(Usuario.objects.filter(email__startswith='benchmark-').exists())
+
+    def test_url_exige_servidor_sin_limites(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', url='http://localhost:8000', productos=0, stdout=io.StringIO())
+
+    def test_muestra_de_productos(self):
+        categoria = Categoria.objects.create(nombre='Accesorios')
+        ids = [
+            Producto.objects.create(
+                nombre=f'Mouse {i}', descripcion='Mouse', precio=Decimal('10.00'), categoria=categoria,
+                tipo='accesorio', stock=1,
+            ).id
+            for i in range(10)
+        ]
+        muestra = muestrear_productos(20, semilla=1)
+        self.assertEqual(muestra, muestrear_productos(20, semilla=1))
+        self.assertEqual(len(muestra), len(set(muestra)))
+        self.assertTrue(set(muestra) <= set(ids))
+
+    def test_regresiones(self):
+        datos = {'p95': 10.0, 'requests_por_segundo': 100.0, 'consultas': 2, 'errores': 0}
+        base = {'resultados': {'login': {'http': datos}}}
+        actual = {'resultados': {'login': {'http': {**datos, 'p95': 11.0, 'requests_por_segundo': 90.0}}}}
+        self.assertEqual(comparar_resultados(base, actual, tolerancia=0.2), [])
+        actual['resultados']['login']['http'].update(p95=13.0, consultas=3)
+        regresiones = comparar_resultados(base, actual, tolerancia=0.2)
+        self.assertEqual(len(regresiones), 2)
+        self.assertTrue(regresiones[0].startswith('login/http: p95'))
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.cerrada = False
+
+    def close(self):
+        self.cerrada = True
+
+
+class PoolConexionesTest(TestCase):
+    """
+    pool.PoolConexiones presta, reutiliza, limita y verifica conexiones.
+    """
+    def test_reutiliza_y_limita(self):
+        conexiones = pool.PoolConexiones('prueba', validar=lambda c: True, config={'TAMANO': 1, 'TIMEOUT': 0.05})
+        primera = conexiones.obtener(ConexionFalsa)
+        with self.assertRaises(pool.PoolAgotado):
+            conexiones.obtener(ConexionFalsa)
+        conexiones.devolver(primera)
+        self.assertIs(conexiones.obtener(ConexionFalsa), primera)
+        datos = conexiones.estadisticas()
+        self.assertEqual((datos['creadas'], datos['prestamos'], datos['timeouts']), (1, 2, 1))
+
+    def test_descarta_las_que_no_responden(self):
+        config = {'TAMANO': 2, 'VERIFICAR_TRAS_S': 0}
+        conexiones = pool.PoolConexiones('prueba', validar=lambda c: False, config=config)
+        primera = conexiones.obtener(ConexionFalsa)
+        conexiones.devolver(primera)
+        segunda = conexiones.obtener(ConexionFalsa)
+        self.assertIsNot(segunda, primera)
+        self.assertTrue(primera.cerrada)
+        conexiones.descartar(segunda)
+        self.assertEqual(conexiones.estadisticas()['en_uso'], 0)
+
+    def test_backend_con_pool(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            base = {**connection.settings_dict, 'NAME': os.path.join(directorio, 'pool.sqlite3')}
+            sin_pool = medir_conexiones(
+                {**base, 'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0},
+                'prueba_sin_pool', hilos=3, requests=10,
+            )
+            con_pool = medir_conexiones(
+                {**base, 'ENGINE': 'apiEcommerceComputerApp.backends.sqlite3', 'CONN_MAX_AGE': 0, 'POOL': {'TAMANO': 2}},
+                'prueba_pool', hilos=3, requests=10,
+            )
+        self.assertEqual(sin_pool['conexiones'], 30)
+        self.assertLessEqual(con_pool['conexiones'], 2)
+        self.assertEqual(sin_pool['errores'] + con_pool['errores'], 0)
+
+
+class AutenticacionClaimsTest(TestCase):
+    """
+    JWTClaimsAuthentication arma el usuario desde el token y revoca con la cache.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(
+            email='claims@example.com', password='Clave-Segura-123', nombre='Ana', apellido='Claims',
+        )
+
+    def setUp(self):
+        autenticacion.get_cache().clear()
+
+    def autenticar(self, token):
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+        return autenticacion.JWTClaimsAuthentication().authenticate(request)[0]
+
+    def test_usuario_desde_claims_sin_consultas(self):
+        token = autenticacion.RefreshTokenUsuario.for_user(self.usuario).access_token
+        self.autenticar(token)
+        with self.assertNumQueries(0):
+            usuario = self.autenticar(token)
+            self.assertEqual(usuario, self.usuario)
+            self.assertEqual((usuario.roles, usuario.is_staff, usuario.is_active), (self.usuario.roles, False, True))
+        # Los campos que no vienen en el token se cargan al accederlos
+        with self.assertNumQueries(1):
+            self.assertEqual(usuario.email, 'claims@example.com')
+        # Tokens sin claims: camino normal de simplejwt
+        token = RefreshToken.for_user(self.usuario).access_token
+        with self.assertNumQueries(1):
+            self.autenticar(token)
+
+    def test_revocacion(self):
+        token = autenticacion.RefreshTokenUsuario.for_user(self.usuario).access_token
+        self.autenticar(token)
+        self.usuario.roles = 'admin'
+        self.usuario.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.autenticar(token)
+
+        token = autenticacion.RefreshTokenUsuario.for_user(self.usuario).access_token
+        self.usuario.set_password('Otra-Clave-456')
+        self.usuario.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.autenticar(token)
+
+        token = autenticacion.RefreshTokenUsuario.for_user(self.usuario).access_token
+        self.usuario.is_active = False
+        self.usuario.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.autenticar(token)
+
+    def test_huella_con_clave_del_servidor(self):
+        token = autenticacion.RefreshTokenUsuario.for_user(self.usuario)
+        # Depende de SECRET_KEY: con el hash solo no se puede calcular ni verificar
+        with override_settings(SECRET_KEY='otra-clave-secreta-para-el-test-' * 2):
+            self.assertNotEqual(autenticacion.huella_password(self.usuario.password), token['huella'])
+        self.assertEqual(autenticacion.huella_password(self.usuario.password), token['huella'])
+
+    def test_login_y_perfil(self):
+        respuesta = APIClient().post(
+            '/ecommerce/api/v1/login/', {'email': 'claims@example.com', 'password': 'Clave-Segura-123'}, format='json'
+        )
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {respuesta.data["access"]}')
+        perfil = cliente.get('/ecommerce/api/v1/perfil/')
+        self.assertEqual(perfil.status_code, 200)
+        self.assertEqual((perfil.data['email'], perfil.data['nombre']), ('claims@example.com', 'Ana'))
+        self.assertEqual(cliente.get('/ecommerce/api/v1/pedidos/').status_code, 200)
+
+
+class ListaNegraTest(TestCase):
+    """
+    Lista negra de refresh tokens con filtro de Bloom, LRU y purga de vencidos.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(
+            email='logout@example.com', password='Clave-Segura-123', nombre='Luis', apellido='Logout',
+        )
+
+    def setUp(self):
+        lista_negra.reiniciar()
+
+    def test_filtro_sin_falsos_negativos(self):
+        filtro = lista_negra.FiltroBloom(1000, 0.01)
+        valores = [f'jti-{i}' for i in range(1000)]
+        for valor in valores:
+            filtro.agregar(valor)
+        self.assertTrue(all(valor in filtro for valor in valores))
+        falsos = sum(f'otro-{i}' in filtro for i in range(10000))
+        self.assertLess(falsos, 300)
+
+    def test_jti_desconocido_sin_consultas(self):
+        token = autenticacion.RefreshTokenUsuario.for_user(self.usuario)
+        token.blacklist()
+        # Carga del filtro
+        self.assertTrue(lista_negra.esta_en_lista_negra(token['jti']))
+        with self.assertNumQueries(0):
+            self.assertFalse(lista_negra.esta_en_lista_negra('jti-que-no-existe'))
+            self.assertTrue(lista_negra.esta_en_lista_negra(token['jti']))
+
+    @override_settings(LISTA_NEGRA={'SINCRONIZAR_S': 0})
+    def test_sincronizar_ve_commits_tardios(self):
+        tokens = [autenticacion.RefreshTokenUsuario.for_user(self.usuario) for _ in range(3)]
+        tokens[0].blacklist()
+        tokens[2].blacklist()
+        # Un id menor al último que se confirma después de la sincronización
+        tardio = BlacklistedToken.objects.get(token__jti=tokens[0]['jti']).id
+        BlacklistedToken.objects.filter(id=tardio).delete()
+        self.assertTrue(lista_negra.esta_en_lista_negra(tokens[2]['jti']))
+        self.assertFalse(lista_negra.esta_en_lista_negra(tokens[1]['jti']))
+        BlacklistedToken.objects.create(id=tardio, token=OutstandingToken.objects.get(jti=tokens[1]['jti']))
+        self.assertTrue(lista_negra.esta_en_lista_negra(tokens[1]['jti']))
+
+    def test_logout(self):
+        respuesta = APIClient().post(
+            '/ecommerce/api/v1/login/', {'email': 'logout@example.com', 'password': 'Clave-Segura-123'}, format='json'
+        )
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {respuesta.data["access"]}')
+        datos = {'refresh': respuesta.data['refresh']}
+        self.assertEqual(cliente.post('/ecommerce/api/v1/logout/', datos, format='json').status_code, 200)
+        self.assertEqual(cliente.post('/ecommerce/api/v1/logout/', datos, format='json').status_code, 400)
+        # Otro proceso (filtro vacío) también lo rechaza
+        lista_negra.reiniciar()
+        self.assertEqual(cliente.post('/ecommerce/api/v1/logout/', datos, format='json').status_code, 400)
+
+    def test_purgar_tokens(self):
+        vencido = autenticacion.RefreshTokenUsuario.for_user(self.usuario)
+        vencido.blacklist()
+        vigente = autenticacion.RefreshTokenUsuario.for_user(self.usuario)
+        OutstandingToken.objects.filter(jti=vencido['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+        call_command('purgar_tokens', chunk_size=1, stdout=io.StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [vigente['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class ContrasenasTest(TestCase):
+    """
+    Hash con costo configurable en el pool de procesos y actualización al iniciar sesión.
+    """
+
+    def test_compatible_con_pbkdf2_de_django(self):
+        for procesos in (0, 1):
+            with override_settings(CONTRASENAS={'ITERACIONES': 1000, 'PROCESOS': procesos}):
+                codificado = make_password('Clave-Segura-123', salt='sal-fija')
+                self.assertTrue(codificado.startswith('pbkdf2_sha256$1000$sal-fija$'))
+                self.assertEqual(codificado, PBKDF2PasswordHasher().encode('Clave-Segura-123', 'sal-fija', 1000))
+                self.assertTrue(check_password('Clave-Segura-123', codificado))
+                self.assertFalse(check_password('Otra-Clave', codificado))
+        contrasenas.cerrar_pool()
+
+    @override_settings(CONTRASENAS={'ITERACIONES': 1000, 'PROCESOS': 0})
+    def test_login_actualiza_el_costo(self):
+        usuario = Usuario.objects.create_user(
+            email='costo@example.com', password='Clave-Segura-123', nombre='Carla', apellido='Costo',
+        )
+        self.assertIn('$1000$', usuario.password)
+        with override_settings(CONTRASENAS={'ITERACIONES': 2000, 'PROCESOS': 0}):
+            respuesta = APIClient().post(
+                '/ecommerce/api/v1/login/', {'email': 'costo@example.com', 'password': 'Clave-Segura-123'},
+                format='json',
+            )
+            self.assertEqual(respuesta.status_code, 200)
+        usuario.refresh_from_db()
+        self.assertIn('$2000$', usuario.password)
+        self.assertTrue(usuario.check_password('Clave-Segura-123'))
+
+    @override_settings(CONTRASENAS={'ITERACIONES': 1000, 'PROCESOS': 0})
+    def test_actualizar_el_costo_no_cierra_otras_sesiones(self):
+        usuario = Usuario.objects.create_user(
+            email='sesiones@example.com', password='Clave-Segura-123', nombre='Sara', apellido='Sesiones',
+        )
+        token = autenticacion.RefreshTokenUsuario.for_user(usuario).access_token
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+        with override_settings(CONTRASENAS={'ITERACIONES': 2000, 'PROCESOS': 0}):
+            self.assertTrue(Usuario.objects.get(pk=usuario.pk).check_password('Clave-Segura-123'))
+        usuario.refresh_from_db()
+        self.assertIn('$2000$', usuario.password)
+        self.assertEqual(autenticacion.JWTClaimsAuthentication().authenticate(request)[0], usuario)
+        # Cambiar la contraseña sí cierra las sesiones
+        usuario.set_password('Otra-Clave-456')
+        usuario.save()
+        with self.assertRaises(AuthenticationFailed):
+            autenticacion.JWTClaimsAuthentication().authenticate(request)
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class VistasAsyncTest(TestCase):
+    """
+    Las vistas async del catálogo (urls_asgi) responden igual que los ViewSet
+    y delegan en ellos lo que no atienden.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre='Monitores')
+        cls.productos = [
+            Producto.objects.create(
+                nombre=f'Monitor {i}', descripcion='Monitor', precio=Decimal('150.00'), categoria=cls.categoria,
+                tipo='monitor', stock=5, cantidad_vendida=i * 3,
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        limpiar_feeds()
+        cache_respuestas.get_cache().clear()
+
+    def get_sync(self, url, **extra):
+        return APIClient().get(url, **extra)
+
+    def get_async(self, url, **extra):
+        with override_settings(ROOT_URLCONF='apiEcommerceComputer.urls_asgi'):
+            return async_to_sync(self.async_client.get)(url, **extra)
+
+    def test_mismas_respuestas_que_los_viewset(self):
+        for url in (
+            CATALOGO_URL, f'{CATALOGO_URL}?page=2&page_size=2', f'{CATALOGO_URL}{self.productos[0].pk}/',
+            f'{CATALOGO_URL}nuevos/', f'{CATALOGO_URL}mas_vendidos/?limit=3',
+            f'{CATALOGO_URL}nuevos/?categoria=monitores',
+            '/ecommerce/api/v1/categorias/', f'/ecommerce/api/v1/categorias/{self.categoria.pk}/',
+        ):
+            with self.subTest(url=url):
+                esperada, respuesta = self.get_sync(url), self.get_async(url)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertIsNone(respuesta.get('Allow'))
+                self.assertEqual(respuesta.json(), esperada.json())
+
+    def test_delegan_en_el_viewset(self):
+        for url in (
+            f'{CATALOGO_URL}?ordering=precio', f'{CATALOGO_URL}?page=99', f'{CATALOGO_URL}999999/',
+            f'{CATALOGO_URL}?tipo=monitor', f'{CATALOGO_URL}facetas/', f'{CATALOGO_URL}mas_vendidos/?limit=abc',
+            f'{CATALOGO_URL}nuevos/?limit=0',
+        ):
+            with self.subTest(url=url):
+                respuesta = self.get_async(url)
+                self.assertEqual(respuesta.status_code, self.get_sync(url).status_code)
+                # Las respuestas de DRF llevan Allow
+                self.assertIsNotNone(respuesta.get('Allow'))
+        with override_settings(ROOT_URLCONF='apiEcommerceComputer.urls_asgi'):
+            respuesta = async_to_sync(self.async_client.post)(CATALOGO_URL, {'nombre': 'x'})
+        self.assertEqual(respuesta.status_code, 401)
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True}, INSTRUMENTACION={'UMBRAL_LENTO_MS': None})
+    def test_cache_compartida_e_instrumentacion(self):
+        instrumentacion.reiniciar_estadisticas()
+        self.assertEqual(self.get_async(CATALOGO_URL)['X-Cache'], 'MISS')
+        self.assertEqual(self.get_sync(CATALOGO_URL)['X-Cache'], 'HIT')
+        datos = instrumentacion.estadisticas()['ProductoViewSet.list']
+        self.assertEqual(datos['requests'], 2)
+        # COUNT y página; el HIT no consulta
+        self.assertEqual(datos['consultas_media'], 1)
+
+
+def rafaga(hilos, funcion):
+    """
+    Ejecuta funcion(i) en `hilos` hilos liberados a la vez (estampida) y
+    retorna los resultados en orden.
+    """
+    barrera = threading.Barrier(hilos)
+    resultados = [None] * hilos
+
+    def correr(i):
+        barrera.wait()
+        resultados[i] = funcion(i)
+
+    corriendo = [threading.Thread(target=correr, args=(i,)) for i in range(hilos)]
+    for hilo in corriendo:
+        hilo.start()
+    for hilo in corriendo:
+        hilo.join()
+    return resultados
+
+
+@override_settings(LIMITES={'REGLAS': {
+    'catalogo': {'TASA': 1, 'RAFAGA': 3},
+    'login': {'TASA': 1 / 60, 'RAFAGA': 2},
+}})
+class LimitesTest(TestCase):
+    """
+    Cubetas de tokens por IP/usuario en memoria y en la cache compartida.
+    """
+
+    def setUp(self):
+        limites.reiniciar()
+        caches['default'].clear()
+
+    def test_cubeta_rafaga_y_recarga(self):
+        ahora = [100.0]
+        for cubetas in (
+            limites.CubetasMemoria(10, reloj=lambda: ahora[0]),
+            limites.CubetasCache('default', reloj=lambda: ahora[0]),
+        ):
+            with self.subTest(backend=type(cubetas).__name__):
+                self.assertEqual([cubetas.consumir('k', 1, 3) for _ in range(3)], [0, 0, 0])
+                self.assertEqual(cubetas.consumir('k', 1, 3), 1)
+                ahora[0] += 0.5
+                self.assertEqual(cubetas.consumir('k', 1, 3), 0.5)
+                ahora[0] += 0.5
+                self.assertEqual(cubetas.consumir('k', 1, 3), 0)
+                # Otro cliente tiene su propia cubeta
+                self.assertEqual(cubetas.consumir('otra', 1, 3), 0)
+
+    def test_cache_compartida_entre_procesos(self):
+        ahora = [100.0]
+        worker_a = limites.CubetasCache('default', reloj=lambda: ahora[0])
+        worker_b = limites.CubetasCache('default', reloj=lambda: ahora[0])
+        self.assertEqual(worker_a.consumir('k', 1, 2), 0)
+        self.assertEqual(worker_b.consumir('k', 1, 2), 0)
+        self.assertEqual(worker_a.consumir('k', 1, 2), 1)
+
+    def test_memoria_descarta_los_clientes_mas_antiguos(self):
+        cubetas = limites.CubetasMemoria(2)
+        for clave in ('a', 'b', 'c'):
+            cubetas.consumir(clave, 1, 1)
+        self.assertEqual(list(cubetas.cubetas), ['b', 'c'])
+
+    def test_estampida_admite_solo_la_rafaga(self):
+        # 50 requests simultáneos de una IP: pasan exactamente los 3 de la ráfaga
+        request = APIRequestFactory().get(CATALOGO_URL, REMOTE_ADDR='10.0.0.1')
+        permitidos = rafaga(50, lambda i: limites.CatalogoThrottle().allow_request(Request(request), None))
+        self.assertEqual(sum(permitidos), 3)
+
+    def test_login_responde_429_con_retry_after(self):
+        datos = {'email': 'nadie@example.com', 'password': 'incorrecta'}
+        cliente = APIClient()
+        estados = [cliente.post('/ecommerce/api/v1/login/', datos, format='json').status_code for _ in range(3)]
+        self.assertEqual(estados, [401, 401, 429])
+        respuesta = cliente.post('/ecommerce/api/v1/login/', datos, format='json')
+        self.assertEqual(int(respuesta['Retry-After']), 60)
+        # Otra IP no comparte la cubeta
+        otra = cliente.post('/ecommerce/api/v1/login/', datos, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(otra.status_code, 401)
+
+    def test_usuario_autenticado_tiene_su_propia_cubeta(self):
+        usuario = Usuario.objects.create_user(
+            email='limite@example.com', password='Clave-Segura-123', nombre='Lia', apellido='Limite',
+        )
+        anonimo, autenticado = APIClient(), APIClient()
+        autenticado.force_authenticate(usuario)
+        self.assertEqual([anonimo.get(CATALOGO_URL).status_code for _ in range(4)], [200, 200, 200, 429])
+        self.assertEqual(autenticado.get(CATALOGO_URL).status_code, 200)
+
+    def test_vistas_async_consumen_la_misma_cubeta(self):
+        metricas.reiniciar()
+        consumir = limites.CubetasMemoria.consumir
+        with override_settings(ROOT_URLCONF='apiEcommerceComputer.urls_asgi'), \
+                patch.object(limites.CubetasMemoria, 'consumir', autospec=True, side_effect=consumir) as espia:
+            estados = [async_to_sync(self.async_client.get)(CATALOGO_URL).status_code for _ in range(3)]
+            respuesta = async_to_sync(self.async_client.get)(CATALOGO_URL)
+            # Delegados (404 y 429): la vista DRF no vuelve a consumir
+            detalle = async_to_sync(self.async_client.get)(f'{CATALOGO_URL}999999/')
+        self.assertEqual(estados, [200, 200, 200])
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertEqual(detalle.status_code, 429)
+        self.assertIn('Retry-After', respuesta)
+        self.assertEqual(espia.call_count, 5)
+        self.assertIn('throttled_requests_total{alcance="catalogo"} 2', metricas.exponer())
+
+
+class VistaLenta(APIView):
+    """
+    Vista de lectura cacheada que tarda en calcular (para la estampida).
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    calculos = 0
+    lock = threading.Lock()
+
+    @cache_respuestas.cachear_respuesta(modelos=())
+    def get(self, request):
+        time.sleep(0.3)
+        with self.lock:
+            VistaLenta.calculos += 1
+        return Response({'calculo': VistaLenta.calculos})
+
+
+class CoalescenciaTest(TestCase):
+    """
+    Requests idénticos simultáneos comparten un solo cálculo.
+    """
+
+    def setUp(self):
+        cache_respuestas.get_cache().clear()
+        cache_respuestas.reiniciar_estadisticas()
+        VistaLenta.calculos = 0
+
+    def test_estampida_sobre_la_cache_de_respuestas(self):
+        vista = VistaLenta.as_view()
+        respuestas = rafaga(20, lambda i: vista(APIRequestFactory().get('/lenta/')))
+        self.assertEqual(VistaLenta.calculos, 1)
+        self.assertEqual({respuesta.status_code for respuesta in respuestas}, {200})
+        self.assertEqual({respuesta.data['calculo'] for respuesta in respuestas}, {1})
+        self.assertEqual(sorted(respuesta['X-Cache'] for respuesta in respuestas), ['COALESCED'] * 19 + ['MISS'])
+        datos = cache_respuestas.estadisticas()['VistaLenta.get']
+        self.assertEqual((datos['misses'], datos['coalesced']), (1, 19))
+        self.assertEqual(coalescencia.vuelos.en_curso(), 0)
+        # Después, aciertos de cache
+        self.assertEqual(vista(APIRequestFactory().get('/lenta/'))['X-Cache'], 'HIT')
+
+    @override_settings(RESPONSE_CACHE={'COALESCER': False})
+    def test_sin_coalescencia_cada_request_calcula(self):
+        vista = VistaLenta.as_view()
+        rafaga(5, lambda i: vista(APIRequestFactory().get('/lenta/')))
+        self.assertEqual(VistaLenta.calculos, 5)
+
+    def test_si_el_lider_falla_los_seguidores_calculan(self):
+        vuelos = coalescencia.VueloUnico()
+        llamadas = []
+
+        def calcular():
+            llamadas.append(threading.get_ident())
+            if len(llamadas) == 1:
+                time.sleep(0.3)
+                raise RuntimeError('falla del líder')
+            return 'ok'
+
+        def ejecutar(i):
+            try:
+                return vuelos.ejecutar('clave', calcular)
+            except RuntimeError:
+                return 'error'
+
+        resultados = rafaga(5, ejecutar)
+        self.assertEqual(resultados.count('error'), 1)
+        self.assertEqual(resultados.count(('ok', False)), 4)
+        self.assertEqual(len(llamadas), 5)
+
+    def test_estampida_en_el_event_loop(self):
+        vuelos = coalescencia.VueloUnico()
+        llamadas = []
+
+        async def calcular():
+            llamadas.append(1)
+            await asyncio.sleep(0.05)
+            return {'datos': 1}
+
+        async def estampida():
+            return await asyncio.gather(*(vuelos.aejecutar('clave', calcular) for _ in range(20)))
+
+        resultados = asyncio.run(estampida())
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual(sum(coalescido for _, coalescido in resultados), 19)
+        self.assertEqual({datos['datos'] for datos, _ in resultados}, {1})
@@ -1,14 +1,25 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from .views import(
     ProductoViewSet, 
     CategoriaViewSet,
+    ReservaStockViewSet,
+    OrderViewSet,
+    ValoracionViewSet,
     RegistroUsuarioView,
     LoginView,
     LogoutView, 
     UserViewSet,
-    userProfileView
+    userProfileView,
+    MetricasView
+)
+from .vistas_async import (
+    CategoriaDetalleAsync,
+    CategoriasListaAsync,
+    FeedProductosAsync,
+    ProductoDetalleAsync,
+    ProductosListaAsync,
 )
 
 #api versioning
@@ -16,6 +27,30 @@ router = DefaultRouter()
 router.register(r'productos', ProductoViewSet, basename='producto')
 router.register(r'categorias', CategoriaViewSet, basename='categoria')
 router.register(r'usuarios', UserViewSet, basename='usuario')
+router.register(r'reservas', ReservaStockViewSet, basename='reserva')
+router.register(r'pedidos', OrderViewSet, basename='pedido')
+router.register(r'valoraciones', ValoracionViewSet, basename='valoracion')
+vistas_router = {ruta.name: ruta.callback for ruta in router.urls}
+
+# ===== CATÁLOGO ASYNC (solo bajo ASGI, ver apiEcommerceComputer/urls_asgi.py) =====
+# Van antes del router: lo que no atienden lo delegan en la vista del router
+rutas_catalogo_async = [
+    path('ecommerce/api/v1/productos/',
+         ProductosListaAsync.as_view(respaldo=vistas_router['producto-list'])),
+    path('ecommerce/api/v1/productos/nuevos/',
+         FeedProductosAsync.as_view(feed='nuevos', nombre='ProductoViewSet.nuevos',
+                                    respaldo=vistas_router['producto-nuevos'])),
+    path('ecommerce/api/v1/productos/mas_vendidos/',
+         FeedProductosAsync.as_view(feed='mas_vendidos', nombre='ProductoViewSet.mas_vendidos',
+                                    respaldo=vistas_router['producto-mas-vendidos'])),
+    # pk como texto (igual que el router): comparte las claves de cache
+    re_path(r'^ecommerce/api/v1/productos/(?P<pk>[0-9]+)/$',
+            ProductoDetalleAsync.as_view(respaldo=vistas_router['producto-detail'])),
+    path('ecommerce/api/v1/categorias/',
+         CategoriasListaAsync.as_view(respaldo=vistas_router['categoria-list'])),
+    re_path(r'^ecommerce/api/v1/categorias/(?P<pk>[0-9]+)/$',
+            CategoriaDetalleAsync.as_view(respaldo=vistas_router['categoria-detail'])),
+]
 
 
 urlpatterns = [
@@ -26,6 +61,8 @@ urlpatterns = [
     path('ecommerce/api/v1/login/', LoginView.as_view(), name='login'),    
     path('ecommerce/api/v1/logout/', LogoutView.as_view(), name='logout'),    
     path('ecommerce/api/v1/perfil/', userProfileView.as_view(), name='perfil'),    
+    # ===== MÉTRICAS (Prometheus) =====
+    path('metrics', MetricasView.as_view(), name='metricas'),
     # ===== DOCUMENTACIÓN (Swagger) =====
     path('ecommerce/api/v1/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('ecommerce/api/v1/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),        
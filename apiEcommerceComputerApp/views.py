@@ -1,43 +1,103 @@
-from rest_framework import viewsets, status, permissions
+import csv
+import hmac
+import io
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import mixins, viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import authenticate
 # from rest_framework.authtoken.models import Token
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import viewsets
-from django.db.models import Avg, Sum
-from django.db.models.functions import Coalesce
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from .models import Producto, Categoria, Usuario
+from .models import Producto, Categoria, Usuario, Order, ReservaStock, Valoracion, UMBRAL_MAS_VENDIDO
 from .serializers import (
     ProductoDetailSerializer, 
     ProductoListSerializer,
     CategoriaSerializer, 
     UsuarioSerializer,
     UsuarioRegistroSerializer,
-    CambiarPasswordSerializer    
+    CambiarPasswordSerializer,
+    ReservaStockSerializer,
+    OrderSerializer,
+    ValoracionSerializer
 )
 from rest_framework.pagination import PageNumberPagination
+from .pagination import KeysetPagination, iterar_por_keyset, limite_busqueda
+from .exportacion import FORMATOS as FORMATOS_EXPORTACION, respuesta_streaming
+from .importacion import FORMATOS as FORMATOS_IMPORTACION, ImportadorProductos, formato_desde_nombre, leer_filas
+from .busqueda import BusquedaTextoFilter
+from . import feeds
+from .cache import cachear_respuesta
+from .facetas import RANGOS_PRECIO, calcular_facetas
+from .filters import ProductoFilter
+from .autenticacion import RefreshTokenUsuario, cargar_usuario
+from .instrumentacion import medir
+from .limites import CatalogoThrottle, LoginThrottle, RegistroThrottle
+from . import metricas
+from .serializacion import SerializadorRapido
+from .pedidos import PedidoInvalido
 from .permissions import IsAdministrador
+from .reservas import ReservaNoActiva, StockInsuficiente, confirmar, liberar
 
 # Create your views here.
-@extend_schema_view(
-    list=extend_schema(
-        description="Lista todos los productos o crea un nuevo producto"),
-        retrieve=extend_schema(description="Obtiene los detalles de un producto específico por si ID"
-    )
-)
-
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 12
     page_size_query_param = 'page_size'
     max_page_size = 100
     schema = None
 
-class ProductoViewSet(viewsets.ModelViewSet):
+    def get_paginated_response(self, data):
+        respuesta = super().get_paginated_response(data)
+        limite_busqueda(self.request, respuesta.data)
+        return respuesta
+
+class SerializacionRapidaMixin:
+    """
+    Listados de solo lectura con SerializadorRapido: filas de .values() en
+    lugar de instancias de modelo, con la misma salida que el serializer.
+    Se desactiva con `serializacion_rapida = False`.
+    La serialización de listados y detalles se mide en la fase
+    "serializacion" de la instrumentación (instrumentacion.py).
+    """
+    serializacion_rapida = True
+
+    def listar(self, queryset, serializer_class, paginar=True):
+        if not self.serializacion_rapida:
+            serializer_kwargs = {'many': True, 'context': self.get_serializer_context()}
+            page = self.paginate_queryset(queryset) if paginar else None
+            with medir('serializacion'):
+                datos = serializer_class(page if page is not None else queryset, **serializer_kwargs).data
+            if page is not None:
+                return self.get_paginated_response(datos)
+            return Response(datos)
+
+        rapido = SerializadorRapido(serializer_class, self.get_serializer_context())
+        filas = rapido.filas(queryset)
+        page = self.paginate_queryset(filas) if paginar else None
+        with medir('serializacion'):
+            datos = rapido.serializar(page if page is not None else filas)
+        if page is not None:
+            return self.get_paginated_response(datos)
+        return Response(datos)
+
+    def retrieve(self, request, *args, **kwargs):
+        instancia = self.get_object()
+        with medir('serializacion'):
+            datos = self.get_serializer(instancia).data
+        return Response(datos)
+
+@extend_schema_view(
+    list=extend_schema(
+        description="Lista todos los productos o crea un nuevo producto"),
+        retrieve=extend_schema(description="Obtiene los detalles de un producto específico por si ID"
+    )
+)
+class ProductoViewSet(SerializacionRapidaMixin, viewsets.ModelViewSet):
     """
    ViewSet para gestionar productos.
     - Lista: Todos pueden ver
@@ -46,28 +106,51 @@ class ProductoViewSet(viewsets.ModelViewSet):
     queryset = Producto.objects.all()
     serializer_class = ProductoListSerializer
     permission_classes = [permissions.AllowAny]  # Lectura pública
+    throttle_classes = [CatalogoThrottle]  # por IP/usuario (ver limites.py)
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['categoria', 'tipo', 'es_nuevo']
-
-    # filtros
-    filterset_fields = {
-        'categoria': ['exact'], 
-        'tipo': ['exact'], 
-        'precio': ['gte', 'lte'],
-        'stock': ['gte', 'lte'],
-    }
+    # La búsqueda va al final: sin ?ordering= ordena por relevancia
+    filter_backends = [DjangoFilterBackend, OrderingFilter, BusquedaTextoFilter]
+    # filtros (ver filters.py)
+    filterset_class = ProductoFilter
     search_fields = ['nombre', 'descripcion']
-    ordering_fields = ['precio', 'fecha_creacion', 'nombre', 'cantidad_vendida']
-    ordering = ['-fecha_creacion']
+    ordering_fields = ['precio', 'created_at', 'nombre', 'cantidad_vendida']
+    ordering = ['-created_at']
+    # Acciones que usan el serializer ligero de listado
+    acciones_listado = ['list', 'por_tipo', 'agotados', 'stock_bajo', 'exportar']
+    # Filas por consulta al exportar el catálogo
+    exportar_chunk_size = 2000
+    # Límites de los rangos de precio de /productos/facetas/
+    facetas_rangos_precio = RANGOS_PRECIO
+
+    @property
+    def paginator(self):
+        """
+        Paginación por cursor opcional (sin OFFSET ni COUNT):
+        /productos/?paginacion=cursor y luego el link `next` (?cursor=...).
+        Por defecto se mantiene la paginación por número de página.
+        """
+        if not hasattr(self, '_paginator') and self.usa_paginacion_cursor():
+            self._paginator = KeysetPagination()
+        return super().paginator
+
+    def usa_paginacion_cursor(self):
+        params = self.request.query_params if self.request is not None else {}
+        return params.get('paginacion') == 'cursor' or 'cursor' in params
+
+    @property
+    def ordenar_por_relevancia(self):
+        """
+        El keyset (cursor y exportación) solo ordena por campos del modelo.
+        """
+        return self.action != 'exportar' and not self.usa_paginacion_cursor()
 
     def get_serializer_class(self):
         """
         Usa diferentes serializers según la acción.
-        - List: ProductoListSerializer (ligero)
-        - Retrieve: ProductoDetailSerializer (completo)
+        - List, por_tipo, agotados, stock_bajo, exportar: ProductoListSerializer (ligero)
+        - Retrieve y demás: ProductoDetailSerializer (completo)
         """
-        if self.action == 'list':
+        if self.action in self.acciones_listado:
             return ProductoListSerializer
         return ProductoDetailSerializer
 
@@ -75,71 +158,89 @@ class ProductoViewSet(viewsets.ModelViewSet):
         """
         Permisos personalizados según la acción.
         - Listar/Ver: Público
-        - Crear/Editar/Eliminar: Solo admin
+        - Crear/Editar/Eliminar/Importar: Solo admin
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'importar']:
             # Solo admin puede crear, actualizar o eliminar
             return [permissions.IsAuthenticated(), IsAdministrador()]
         return [permissions.AllowAny()]        
     
+    @cachear_respuesta()
+    def list(self, request, *args, **kwargs):
+        return self.listar(self.filter_queryset(self.get_queryset()), ProductoListSerializer)
+
+    @cachear_respuesta()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_queryset(self):
         """
-        Anotamos queryset con:
-          - average_rating: promedio de valoraciones (replace 'valoraciones' por tu related_name)
-          - cantidad_vendida: suma de cantidad en order items (replace 'order_items' por tu related_name)
+        Lee directamente las columnas del rollup (ver rollups.py):
+          - rating / total_reviews: promedio y cantidad de valoraciones
+          - cantidad_vendida: suma de cantidades en order items
+        Sin JOIN ni GROUP BY por request.
+        Cada serializer declara su carga anticipada (select_related /
+        prefetch_related / conteos anotados) para evitar consultas N+1.
         """
-        qs = Producto.objects.all()
-
-        # Ajusta los related_name 'valoraciones' y 'order_items' según tu proyecto
-        qs = qs.annotate(
-            average_rating=Coalesce(Avg('valoraciones__puntuacion'), 0.0),
-            cantidad_vendida=Coalesce(Sum('order_items__cantidad'), 0)
-        )
-
-        return qs
+        return self.get_serializer_class().optimizar_queryset(Producto.objects.all())
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    @cachear_respuesta()
     def nuevos(self, request):
         """
         Endpoint: /productos/nuevos/?categoria=<id_or_nombre>&limit=6
-        Retorna productos nuevos (últimos 30 días)
+        Retorna los productos más recientes de los últimos 30 días
+        (DIAS_PRODUCTO_NUEVO), leídos del feed materializado (ver feeds.py).
         """
-        categoria = request.query_params.get('categoria')
-        limit = int(request.query_params.get('limit', 6))
-
-        qs = self.get_queryset()
-        if categoria:
-            if categoria.isdigit():
-                qs = qs.filter(categoria__id=int(categoria))
-            else:
-                qs = qs.filter(categoria__nombre__iexact=categoria)
+        return self.responder_feed(request, 'nuevos')
 
-        qs = qs.order_by('-fecha_creacion')[:limit]
-        serializer = self.get_serializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
-    
-    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    @cachear_respuesta()
     def mas_vendidos(self, request):
         """
         Endpoint: /productos/mas_vendidos/?categoria=<id_or_nombre>&limit=6
-        Retorna los productos más vendidos (cantidad_vendida >= 10)
+        Retorna los productos más vendidos (cantidad_vendida y rating),
+        leídos del feed materializado (ver feeds.py).
+        """
+        return self.responder_feed(request, 'mas_vendidos')
+
+    def responder_feed(self, request, nombre):
+        """
+        Lee los ids del feed (global o de la categoría) y carga esos productos
+        por pk. Si `limit` supera el tamaño del feed usa la consulta ordenada;
+        se acota a feeds.LIMITE_MAXIMO.
         """
         categoria = request.query_params.get('categoria')
-        limit = int(request.query_params.get('limit', 6))
+        limit = feeds.leer_limite(request.query_params.get('limit'))
+        if limit is None:
+            return Response(
+                {'error': 'El parámetro "limit" debe ser un entero positivo'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        qs = self.get_queryset()
+        ambito = feeds.GLOBAL
         if categoria:
-            # Intentar filtrar por id si es numérico, si no por nombre (case-insensitive)
             if categoria.isdigit():
-                qs = qs.filter(categoria__id=int(categoria))
+                ambito = int(categoria)
             else:
-                qs = qs.filter(categoria__nombre__iexact=categoria)
+                ambito = Categoria.objects.filter(nombre__iexact=categoria).values_list('id', flat=True).first()
+                if ambito is None:
+                    return Response([])
 
-        qs = qs.order_by('-cantidad_vendida', '-average_rating')[:limit]
-        serializer = self.get_serializer(qs, many=True, context={'request': request})
+        qs = feeds.vigentes(nombre, self.get_queryset())
+        ids = feeds.ids(nombre, ambito, limit)
+        if ids is None:
+            if ambito != feeds.GLOBAL:
+                qs = qs.filter(categoria_id=ambito)
+            productos = qs.order_by(*feeds.orden(nombre))[:limit]
+        else:
+            posiciones = {producto_id: posicion for posicion, producto_id in enumerate(ids)}
+            productos = sorted(qs.filter(pk__in=ids), key=lambda producto: posiciones[producto.pk])
+        serializer = self.get_serializer(productos, many=True, context={'request': request})
         return Response(serializer.data)
-    
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    @cachear_respuesta()
     def por_tipo(self, request):
         """
         Endpoint: /productos/por_tipo/?tipo=portatil
@@ -153,9 +254,8 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        productos = Producto.objects.filter(tipo=tipo)
-        serializer = ProductoListSerializer(productos, many=True, context={'request': request})
-        return Response(serializer.data)
+        productos = self.get_queryset().filter(tipo=tipo)
+        return self.listar(productos, ProductoListSerializer, paginar=False)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def agotados(self, request):
@@ -163,9 +263,8 @@ class ProductoViewSet(viewsets.ModelViewSet):
         Endpoint: /productos/agotados/
         Retorna productos sin stock
         """
-        productos_agotados = Producto.objects.filter(stock=0)
-        serializer = ProductoListSerializer(productos_agotados, many=True, context={'request': request})
-        return Response(serializer.data)
+        productos_agotados = self.get_queryset().filter(stock=0)
+        return self.listar(productos_agotados, ProductoListSerializer, paginar=False)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def stock_bajo(self, request):
@@ -173,13 +272,102 @@ class ProductoViewSet(viewsets.ModelViewSet):
         Endpoint: /productos/stock_bajo/
         Retorna productos con stock bajo (1-4 unidades)
         """
-        productos_stock_bajo = Producto.objects.filter(stock__gt=0, stock__lt=5)
-        serializer = ProductoListSerializer(productos_stock_bajo, many=True, context={'request': request})
-        return Response(serializer.data)
+        productos_stock_bajo = self.get_queryset().filter(stock__gt=0, stock__lt=5)
+        return self.listar(productos_stock_bajo, ProductoListSerializer, paginar=False)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    @cachear_respuesta()
+    def facetas(self, request):
+        """
+        Endpoint: /productos/facetas/?<filtros del listado>
+        Retorna en una sola respuesta los conteos por categoría, tipo, rango de
+        precio y disponibilidad (en stock / agotado) de los productos que
+        cumplen los filtros y la búsqueda actuales.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(calcular_facetas(queryset, self.facetas_rangos_precio))
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    @cachear_respuesta(modelos=('valoracion',))
+    def valoraciones(self, request, pk=None):
+        """
+        Endpoint: /productos/{id}/valoraciones/
+        Valoraciones del producto, más recientes primero, paginadas por keyset
+        sobre el índice (producto, created_at).
+        """
+        if not Producto.objects.filter(pk=pk).exists():
+            return Response({'error': 'Producto no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        queryset = ValoracionSerializer.optimizar_queryset(Valoracion.objects.filter(producto_id=pk))
+        paginador = KeysetPagination()
+        page = paginador.paginate_queryset(queryset, request, view=self)
+        return paginador.get_paginated_response(ValoracionSerializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def exportar(self, request):
+        """
+        Endpoint: /productos/exportar/?formato=ndjson|json&<filtros del listado>
+        Exporta el catálogo completo en streaming, con los mismos filtros,
+        búsqueda y ordenamiento que el listado. Lee por bloques (keyset), así
+        la memoria no crece con el tamaño del catálogo.
+        """
+        formato = request.query_params.get('formato', 'ndjson')
+        if formato not in FORMATOS_EXPORTACION:
+            return Response(
+                {'error': 'El parámetro "formato" debe ser uno de: {}'.format(', '.join(FORMATOS_EXPORTACION))},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rapido = SerializadorRapido(ProductoListSerializer, self.get_serializer_context())
+        queryset = rapido.filas(self.filter_queryset(self.get_queryset()))
+        filas = iterar_por_keyset(queryset, chunk_size=self.exportar_chunk_size)
+        productos = (rapido.serializar_fila(fila) for fila in filas)
+        return respuesta_streaming(productos, formato, 'productos')
+
+    @action(detail=False, methods=['post'])
+    def importar(self, request):
+        """
+        Endpoint: /productos/importar/ (multipart, campo "archivo")
+        Importa productos en bloque desde CSV o NDJSON con las columnas
+        nombre, descripcion, precio, categoria (nombre o id), tipo, stock e id
+        opcional (si viene, actualiza ese producto). El formato se toma de
+        ?formato= o de la extensión del archivo.
+        Las filas inválidas se omiten y se reportan con su número de línea.
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response(
+                {'error': 'Debe enviar el archivo en el campo "archivo".'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        formato = request.query_params.get('formato') or formato_desde_nombre(archivo.name)
+        if formato not in FORMATOS_IMPORTACION:
+            return Response(
+                {'error': 'El parámetro "formato" debe ser uno de: {}'.format(', '.join(FORMATOS_IMPORTACION))},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        texto = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+        try:
+            resultado = ImportadorProductos(usuario=request.user).importar(leer_filas(texto, formato))
+        except (UnicodeDecodeError, csv.Error) as error:
+            return Response(
+                {'error': f'No se pudo leer el archivo: {error}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        estado = status.HTTP_201_CREATED if resultado['creados'] else status.HTTP_200_OK
+        return Response(resultado, status=estado)
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(SerializacionRapidaMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
+    throttle_classes = [CatalogoThrottle]
+
+    def get_queryset(self):
+        """
+        Categorías ordenadas por id; la cantidad de productos es una columna
+        (ver Categoria.cantidad_productos), sin COUNT por fila.
+        """
+        return CategoriaSerializer.optimizar_queryset(Categoria.objects.order_by('id'))
 
     def get_permissions(self):
         """
@@ -190,32 +378,51 @@ class CategoriaViewSet(viewsets.ModelViewSet):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [permissions.IsAuthenticated(), IsAdministrador()]
         return [permissions.AllowAny()]
+
+    @cachear_respuesta()
+    def list(self, request, *args, **kwargs):
+        return self.listar(self.filter_queryset(self.get_queryset()), CategoriaSerializer)
+
+    @cachear_respuesta()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
     
     @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    @cachear_respuesta()
     def productos(self, request, pk=None):
         """
         Endpoint: /categorias/{id}/productos/
         Retorna todos los productos de una categoría específica
         """
         categoria = self.get_object()
-        productos = categoria.productos.all()
-        serializer = ProductoListSerializer(productos, many=True, context={'request': request})
-        return Response(serializer.data)
+        productos = ProductoListSerializer.optimizar_queryset(categoria.productos.all())
+        return self.listar(productos, ProductoListSerializer, paginar=False)
 
 # Vistas específicas para la página principal
+def productos_del_feed(nombre):
+    """
+    Queryset con los productos del feed global, en el orden del feed.
+    """
+    ids = feeds.ids(nombre)
+    return ProductoDetailSerializer.optimizar_queryset(Producto.objects.filter(pk__in=ids)).order_by(
+        *feeds.orden(nombre)
+    )
+
 class ProductosNuevosViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ProductoDetailSerializer
     permission_classes = [permissions.AllowAny] # Permitir acceso público
     
     def get_queryset(self):
-        return Producto.objects.filter(es_nuevo=True)
+        # Rango sobre created_at: no depende de que es_nuevo esté al día
+        return ProductoDetailSerializer.optimizar_queryset(Producto.objects.nuevos()).order_by('-created_at', '-id')
 
 class MasVendidosViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ProductoDetailSerializer
     permission_classes = [permissions.AllowAny] # Permitir acceso público
     
     def get_queryset(self):
-        return Producto.objects.filter(es_mas_vendido=True)
+        # es_mas_vendido es una property: se filtra por su campo
+        return productos_del_feed('mas_vendidos').filter(cantidad_vendida__gte=UMBRAL_MAS_VENDIDO)
 
 class ProductosPorTipoViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ProductoDetailSerializer
@@ -223,8 +430,129 @@ class ProductosPorTipoViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         tipo = self.kwargs['tipo']
-        return Producto.objects.filter(tipo=tipo)
+        return ProductoDetailSerializer.optimizar_queryset(Producto.objects.filter(tipo=tipo))
     
+class ReservaStockViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                          mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Reservas de stock del checkout (ver reservas.py).
+    - POST /reservas/ {"items": [{"producto": id, "cantidad": n}]}: aparta
+      todas las líneas o ninguna (409 con los faltantes).
+    - POST /reservas/{token}/liberar/: devuelve el stock.
+    - POST /reservas/{token}/confirmar/: cierra la reserva (solo admin).
+    Cada usuario ve solo sus reservas; los admins ven todas.
+    """
+    serializer_class = ReservaStockSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
+    lookup_field = 'token'
+
+    def get_permissions(self):
+        if self.action == 'confirmar':
+            return [permissions.IsAuthenticated(), IsAdministrador()]
+        return [permissions.IsAuthenticated()]
+
+    def get_queryset(self):
+        queryset = ReservaStockSerializer.optimizar_queryset(ReservaStock.objects.order_by('-created_at', '-id'))
+        user = self.request.user
+        if user.is_staff or user.roles == 'admin':
+            return queryset
+        return queryset.filter(usuario=user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reserva = serializer.save()
+        except StockInsuficiente as error:
+            return Response(
+                {'error': 'No hay stock suficiente para reservar.', 'faltantes': error.faltantes},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(self.get_serializer(reserva).data, status=status.HTTP_201_CREATED)
+
+    def cambiar_estado(self, operacion):
+        reserva = self.get_object()
+        try:
+            operacion(reserva)
+        except ReservaNoActiva:
+            return Response(
+                {'error': 'La reserva ya no está activa.', 'estado': reserva.estado},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(self.get_serializer(reserva).data)
+
+    @action(detail=True, methods=['post'])
+    def liberar(self, request, token=None):
+        return self.cambiar_estado(liberar)
+
+    @action(detail=True, methods=['post'])
+    def confirmar(self, request, token=None):
+        return self.cambiar_estado(confirmar)
+
+class OrderViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                   mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Pedidos del usuario autenticado (ver pedidos.py).
+    - POST /pedidos/ {"items": [{"producto": id, "cantidad": n}]} o
+      {"reserva": token}: crea el pedido, descuenta el stock y suma las
+      ventas en una transacción.
+    - GET /pedidos/: historial paginado por keyset (created_at, id), cubierto
+      por el índice (usuario, created_at).
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return OrderSerializer.optimizar_queryset(Order.objects.filter(usuario=self.request.user))
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            pedido = serializer.save()
+        except PedidoInvalido as error:
+            return Response(error.errores, status=status.HTTP_400_BAD_REQUEST)
+        except StockInsuficiente as error:
+            return Response(
+                {'error': 'No hay stock suficiente para el pedido.', 'faltantes': error.faltantes},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ReservaNoActiva:
+            return Response({'error': 'La reserva ya no está activa.'}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(pedido).data, status=status.HTTP_201_CREATED)
+
+class ValoracionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
+                        mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Alta, edición y baja de valoraciones del usuario autenticado (los admins
+    pueden editar y borrar cualquiera). Cada escritura actualiza
+    Producto.rating y total_reviews en la misma transacción (signals.py).
+    El listado por producto está en /productos/{id}/valoraciones/.
+    """
+    serializer_class = ValoracionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = ValoracionSerializer.optimizar_queryset(Valoracion.objects.all())
+        user = self.request.user
+        if user.is_staff or user.roles == 'admin':
+            return queryset
+        return queryset.filter(usuario=user)
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        serializer.save(usuario=self.request.user)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
 #esto nos sirve para que podamos crear el crud completo de los usuarios
 class UserViewSet(viewsets.ModelViewSet):
     """
@@ -259,7 +587,7 @@ class UserViewSet(viewsets.ModelViewSet):
         Endpoint: /usuarios/me/
         Permite ver y editar el perfil del usuario actual
         """
-        user = request.user
+        user = cargar_usuario(request)
         
         if request.method == 'GET':
             serializer = UsuarioSerializer(user)
@@ -300,6 +628,7 @@ class RegistroUsuarioView(APIView):
     Permite registrar nuevos usuarios como clientes.
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegistroThrottle]
     
     def post(self, request):
         serializer = UsuarioRegistroSerializer(data=request.data)
@@ -309,7 +638,7 @@ class RegistroUsuarioView(APIView):
             
             # Obtiene el token creado automáticamente
             # token = Token.objects.get(user=usuario)
-            refresh = RefreshToken.for_user(usuario)
+            refresh = RefreshTokenUsuario.for_user(usuario)
             
             # return Response({
             #     'mensaje': 'Usuario registrado exitosamente',
@@ -338,7 +667,7 @@ class userProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        serializer = UsuarioSerializer(request.user)
+        serializer = UsuarioSerializer(cargar_usuario(request))
         return Response(serializer.data, status=status.HTTP_200_OK)    
 
 # Login del usuario
@@ -348,6 +677,7 @@ class LoginView(APIView):
     Autentica usuarios y retorna un token.
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginThrottle]
     
     def post(self, request):
         email = request.data.get('email')
@@ -355,7 +685,7 @@ class LoginView(APIView):
         usuario = authenticate(email=email, password=password)
 
         if usuario is not None:
-            refresh = RefreshToken.for_user(usuario)
+            refresh = RefreshTokenUsuario.for_user(usuario)
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -411,7 +741,7 @@ class LogoutView(APIView):
             #     status=status.HTTP_200_OK
             # )
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = RefreshTokenUsuario(refresh_token)
             token.blacklist()
             return Response({'message': 'Sesión cerrada exitosamente'}, 
                           status=status.HTTP_200_OK)
@@ -419,4 +749,24 @@ class LogoutView(APIView):
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+# Métricas para Prometheus
+class MetricasView(View):
+    """
+    Endpoint: GET /metrics
+    Métricas en formato de texto de Prometheus (ver metricas.py). Con
+    METRICAS['TOKEN'] exige "Authorization: Bearer <TOKEN>"; vista de Django
+    simple, sin autenticación JWT ni renderers de DRF.
+    """
+    http_method_names = ['get']
+
+    def get(self, request):
+        config = metricas.get_config()
+        if not config['ENABLED']:
+            raise Http404
+        if config['TOKEN']:
+            recibido = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(recibido.encode(), f"Bearer {config['TOKEN']}".encode()):
+                return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+        return HttpResponse(metricas.exponer(), content_type=metricas.CONTENT_TYPE)
@@ -0,0 +1,251 @@
+"""
+Vistas async (ASGI) para las lecturas públicas del catálogo: listado y
+detalle de productos, feeds `nuevos` y `mas_vendidos` y listado y detalle
+de categorías.
+
+Bajo ASGI Django ejecuta cada vista síncrona (todos los ViewSet de DRF)
+con sync_to_async en un hilo propio del request (ThreadSensitiveContext):
+la negociación, la vista, el render y los middlewares síncronos pasan por
+ese salto de hilo. Estas vistas atienden el caso común en el event loop:
+  - la cache de respuestas se lee con la API async (misma clave y mismo
+    contenido que cachear_respuesta, ver cache.py);
+  - en un fallo consultan con el ORM async (acount, aget, async for) y
+    serializan con los mismos serializers, paginadores y querysets que los
+    ViewSet; los fallos simultáneos de la misma clave se coalescen
+    (coalescencia.py);
+  - consumen la misma cubeta de límite que el ViewSet (limites.py).
+Todo lo demás va a la vista DRF del router (`respaldo`) igual que antes:
+otros métodos (POST, PUT...), requests con Authorization, query params que
+la vista async no atiende (filtros, búsqueda, orden, cursor, format),
+Accept distinto de JSON, errores (página inválida, 404) y requests sin
+tokens en la cubeta (429), para conservar las mismas respuestas y mensajes.
+
+Se enrutan con ROOT_URLCONF = 'apiEcommerceComputer.urls_asgi', que
+settings.py elige cuando CATALOGO_ASYNC=1 (asgi.py lo define por defecto).
+Bajo WSGI no conviene: cada vista async correría en un event loop propio.
+
+En Django 5.2 el ORM async y la API async de las caches locales todavía
+ejecutan la consulta en un hilo (sync_to_async); lo que se ahorra es el
+resto del request (negociación, render y middlewares en el event loop) y,
+en un acierto de cache, leer la respuesta sin pasar por la vista DRF.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from . import cache as cache_respuestas, feeds
+from .coalescencia import vuelos_async
+from .instrumentacion import medir
+from .limites import CatalogoThrottle
+from .models import Categoria, Producto
+from .serializacion import SerializadorRapido
+from .serializers import CategoriaSerializer, ProductoDetailSerializer, ProductoListSerializer
+from .views import CategoriaViewSet, ProductoViewSet
+
+
+class LecturaCatalogoAsync(View):
+    """
+    GET async con cache de respuestas; `calcular(request, **kwargs)` retorna
+    los datos de la respuesta o None para delegar en `respaldo`.
+    """
+    # Vista DRF (del router) para todo lo que esta vista no atiende
+    respaldo = None
+    # Nombre del endpoint en cachear_respuesta: "ViewSet.accion"
+    nombre = None
+    # Query params que calcular() sabe atender
+    parametros = ()
+    modelos = cache_respuestas.MODELOS_CATALOGO
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        vista = super().as_view(**initkwargs)
+        # Para la instrumentación y las métricas (instrumentacion.nombre_vista)
+        vista.respaldo = initkwargs.get('respaldo', cls.respaldo)
+        return csrf_exempt(vista)
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or 'HTTP_AUTHORIZATION' in request.META:
+            return await self.delegar(request, *args, **kwargs)
+        return await self.get(request, *args, **kwargs)
+
+    async def delegar(self, request, *args, **kwargs):
+        # Como Django con cualquier vista síncrona bajo ASGI
+        return await sync_to_async(self.respaldo)(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        drf_request = Request(request)
+        if set(request.GET) - set(self.parametros):
+            return await self.delegar(request, *args, **kwargs)
+        try:
+            renderer, media_type = DefaultContentNegotiation().select_renderer(
+                drf_request, [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES]
+            )
+        except NotAcceptable:
+            renderer = None
+        if not isinstance(renderer, JSONRenderer):
+            return await self.delegar(request, *args, **kwargs)
+        # Sin Authorization: la cubeta es la de la IP. Si se delega (429,
+        # 404...), la vista DRF usa este resultado en lugar de consumir otro token
+        throttle = CatalogoThrottle()
+        permitido = await throttle.apermitir(drf_request)
+        request.limite_verificado = (throttle.alcance, throttle.espera)
+        if not permitido:
+            return await self.delegar(request, *args, **kwargs)
+
+        config = cache_respuestas.get_config()
+        clave = None
+        if config['ENABLED']:
+            cache = cache_respuestas.get_cache()
+            clave = await cache_respuestas.aclave_respuesta(self.nombre, drf_request, kwargs, self.modelos)
+            datos = await cache.aget(clave)
+            if datos is not None:
+                cache_respuestas.registrar_resultado(self.nombre, acierto=True)
+                return self.responder(renderer, media_type, datos, 'HIT')
+
+        if clave is None:
+            datos = await self.calcular(drf_request, **kwargs)
+            if datos is None:
+                return await self.delegar(request, *args, **kwargs)
+            return self.responder(renderer, media_type, datos, None)
+
+        async def calcular():
+            datos = await self.calcular(drf_request, **kwargs)
+            if datos is not None:
+                await cache.aset(clave, datos, config['TIMEOUT'])
+            return datos
+
+        if config['COALESCER']:
+            datos, coalescida = await vuelos_async.aejecutar(
+                clave, calcular, timeout=config['ESPERA_COALESCER_S'],
+            )
+        else:
+            datos, coalescida = await calcular(), False
+        if datos is None:
+            return await self.delegar(request, *args, **kwargs)
+        cache_respuestas.registrar_resultado(self.nombre, acierto=False, coalescida=coalescida)
+        return self.responder(renderer, media_type, datos, 'COALESCED' if coalescida else 'MISS')
+
+    async def calcular(self, request, **kwargs):
+        raise NotImplementedError
+
+    @staticmethod
+    def responder(renderer, media_type, datos, estado_cache):
+        with medir('render'):
+            respuesta = HttpResponse(renderer.render(datos, media_type), content_type=renderer.media_type)
+        respuesta['Vary'] = 'Accept'
+        if estado_cache:
+            respuesta[cache_respuestas.HEADER] = estado_cache
+        return respuesta
+
+    @staticmethod
+    def contexto(request):
+        return {'request': request, 'format': None, 'view': None}
+
+    async def listar(self, request, queryset, serializer_class, clase_paginacion):
+        """
+        SerializacionRapidaMixin.listar con paginación por número de página:
+        el paginador de DRF calcula página y links sobre un range del total.
+        """
+        rapido = SerializadorRapido(serializer_class, self.contexto(request))
+        filas = rapido.filas(queryset)
+        paginador = clase_paginacion()
+        paginador.request = request
+        paginas = paginador.django_paginator_class(range(await filas.acount()), paginador.get_page_size(request))
+        try:
+            paginador.page = paginas.page(paginador.get_page_number(request, paginas))
+        except InvalidPage:
+            return None
+        rango = paginador.page.object_list
+        pagina = [fila async for fila in filas[rango.start:rango.stop]]
+        with medir('serializacion'):
+            datos = rapido.serializar(pagina)
+        return paginador.get_paginated_response(datos).data
+
+    async def detalle(self, request, queryset, serializer_class, pk):
+        try:
+            instancia = await queryset.aget(pk=pk)
+        except queryset.model.DoesNotExist:
+            return None
+        with medir('serializacion'):
+            return serializer_class(instancia, context=self.contexto(request)).data
+
+# ===== Productos =====
+
+class ProductosListaAsync(LecturaCatalogoAsync):
+    nombre = 'ProductoViewSet.list'
+    parametros = ('page', 'page_size')
+
+    async def calcular(self, request):
+        # Sin filtros: el orden por defecto de OrderingFilter
+        queryset = ProductoListSerializer.optimizar_queryset(Producto.objects.all()).order_by(*ProductoViewSet.ordering)
+        return await self.listar(request, queryset, ProductoListSerializer, ProductoViewSet.pagination_class)
+
+
+class ProductoDetalleAsync(LecturaCatalogoAsync):
+    nombre = 'ProductoViewSet.retrieve'
+
+    async def calcular(self, request, pk):
+        queryset = ProductoDetailSerializer.optimizar_queryset(Producto.objects.all())
+        return await self.detalle(request, queryset, ProductoDetailSerializer, pk)
+
+
+class FeedProductosAsync(LecturaCatalogoAsync):
+    """
+    ProductoViewSet.responder_feed: ids del feed y productos por pk.
+    """
+    parametros = ('categoria', 'limit')
+    feed = None
+
+    async def calcular(self, request):
+        categoria = request.query_params.get('categoria')
+        limit = feeds.leer_limite(request.query_params.get('limit'))
+        if limit is None:
+            return None
+
+        ambito = feeds.GLOBAL
+        if categoria:
+            if categoria.isdigit():
+                ambito = int(categoria)
+            else:
+                ambito = await Categoria.objects.filter(nombre__iexact=categoria).values_list('id', flat=True).afirst()
+                if ambito is None:
+                    return []
+
+        queryset = feeds.vigentes(self.feed, ProductoDetailSerializer.optimizar_queryset(Producto.objects.all()))
+        ids = await sync_to_async(feeds.ids)(self.feed, ambito, limit)
+        if ids is None:
+            if ambito != feeds.GLOBAL:
+                queryset = queryset.filter(categoria_id=ambito)
+            productos = [producto async for producto in queryset.order_by(*feeds.orden(self.feed))[:limit]]
+        else:
+            posiciones = {producto_id: posicion for posicion, producto_id in enumerate(ids)}
+            productos = sorted(
+                [producto async for producto in queryset.filter(pk__in=ids)],
+                key=lambda producto: posiciones[producto.pk],
+            )
+        with medir('serializacion'):
+            return ProductoDetailSerializer(productos, many=True, context={'request': request}).data
+
+# ===== Categorías =====
+
+class CategoriasListaAsync(LecturaCatalogoAsync):
+    nombre = 'CategoriaViewSet.list'
+    parametros = ('page',)
+
+    async def calcular(self, request):
+        queryset = CategoriaSerializer.optimizar_queryset(Categoria.objects.order_by('id'))
+        return await self.listar(request, queryset, CategoriaSerializer, CategoriaViewSet.pagination_class)
+
+
+class CategoriaDetalleAsync(LecturaCatalogoAsync):
+    nombre = 'CategoriaViewSet.retrieve'
+
+    async def calcular(self, request, pk):
+        queryset = CategoriaSerializer.optimizar_queryset(Categoria.objects.order_by('id'))
+        return await self.detalle(request, queryset, CategoriaSerializer, pk)